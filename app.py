@@ -1,11 +1,29 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory, make_response
+from flask import Flask, g, render_template, request, jsonify, send_from_directory, make_response, Response, stream_with_context, redirect, url_for
 from werkzeug.utils import secure_filename
 import os
+import io
+import csv
 import json
+import time
+import hashlib
+import mimetypes
+from functools import wraps
 import requests
-from datetime import datetime
-from models import init_db, get_db, produto_para_dict, venda_para_dict, DATABASE_TYPE
-from db_helper import get_placeholder, get_cursor
+from datetime import datetime, timedelta
+from models import init_db, get_db, mapeador_produtos, mapeador_vendas, mapear_linhas, DATABASE_TYPE
+from models import colunas_produtos, colunas_vendas
+from models import indexar_produto_busca, remover_produto_busca, sql_busca_produtos, termos_busca
+from models import indexar_venda_busca, indexar_vendas_busca, remover_venda_busca, sql_filtro_busca_vendas
+from models import acumular_resumo_venda, expressao_mes_venda, mes_da_data, ler_versoes_tabelas, registrar_exclusao
+from models import SUPORTA_RETURNING, ErroIntegridade
+from importar_produtos import importar_produtos, detectar_formato
+from provedor_json import ProvedorJSON
+from assets import ManifestoAssets
+from compressao import escolher_encoding, tipo_compressivel, comprimir, comprimir_blocos, MINIMO_BYTES
+from eventos import BarramentoEventos
+from cache_respostas import CacheRespostas
+from invalidacao import notificar_alteracao, OuvinteAlteracoes, VerificadorSQLite, TAGS_POR_TABELA, origem_processo
+from db_helper import get_placeholder, get_cursor, get_cursor_tuplas, codificar_cursor, decodificar_cursor
 
 # Tentar importar storage (opcional)
 STORAGE_CLOUD_DISPONIVEL = False
@@ -35,11 +53,32 @@ except (ImportError, Exception) as e:
     except (ImportError, Exception):
         pass
 
+# MessagePack nas listagens: Accept: application/x-msgpack (msgpack está no requirements.txt;
+# sem o pacote, as listagens respondem 406 a quem prefere MessagePack)
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 app = Flask(__name__, static_folder='static', template_folder='templates')
+# jsonify/get_json com orjson quando instalado (mesma saída com o json padrão)
+app.json = ProvedorJSON(app)
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
+# Versão do deploy no Vercel (vazia fora dele): a mesma em todo lugar que depende do deploy
+# (ETags das leituras, versão da página principal e do version.js)
+VERSAO_DEPLOY = (os.getenv('VERCEL_DEPLOYMENT_ID') or os.getenv('VERCEL_GIT_COMMIT_SHA') or '')[:16]
+
+# Arquivos de static/ com o hash do conteúdo no nome (assets.py): templates usam asset_url()
+manifesto_assets = ManifestoAssets(app.static_folder)
+
+@app.template_global()
+def asset_url(caminho):
+    """URL do arquivo de static/ com o hash do conteúdo ('css/style.css' -> '/static/css/style.<hash>.css')"""
+    return url_for('static', filename=manifesto_assets.caminho_com_hash(caminho))
+
 # Configurar Flask para retornar JSON em caso de erro
 app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
 
@@ -99,7 +138,7 @@ def not_found(error):
     if request.path.startswith('/api/'):
         return jsonify({'erro': 'Rota não encontrada'}), 404
     # Caso contrário, retornar HTML normal (para páginas)
-    return render_template('index.html'), 404
+    return render_template('index.html', versao_app=versao_aplicacao()), 404
 
 @app.errorhandler(500)
 def internal_error(error):
@@ -125,8 +164,8 @@ def handle_exception(e):
 # Middleware para adicionar headers anti-cache em respostas HTML
 @app.after_request
 def add_no_cache_headers(response):
-    """Adiciona headers para desabilitar cache do navegador e CDN em HTML"""
-    if response.content_type and 'text/html' in response.content_type:
+    """Adiciona headers para desabilitar cache do navegador e CDN em HTML (exceto se a rota já definiu Cache-Control)"""
+    if response.content_type and 'text/html' in response.content_type and 'Cache-Control' not in response.headers:
         # Headers para desabilitar cache completamente (browser e CDN)
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0, s-maxage=0'
         response.headers['CDN-Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
@@ -135,88 +174,522 @@ def add_no_cache_headers(response):
         response.headers['Expires'] = '0'
     return response
 
+# Compressão das respostas (compressao.py), negociada pelo Accept-Encoding. A variante
+# comprimida leva ETag fraco (os bytes mudam com o encoding) e todas as respostas
+# compressíveis levam Vary: Accept-Encoding para os caches guardarem uma variante por encoding.
+def encoding_da_requisicao():
+    """Encoding a usar nesta requisição (None: sem compressão)"""
+    return escolher_encoding(request.accept_encodings)
+
+def aplicar_compressao(response):
+    """Comprime a resposta no lugar, se compensar (não faz nada se já tiver Content-Encoding)"""
+    etag, fraco = response.get_etag()
+    if response.status_code == 304:
+        # Revalidação da variante comprimida: devolver o ETag na forma que o cliente guardou
+        if etag and not fraco and request.if_none_match.is_weak(etag) and not request.if_none_match.is_strong(etag):
+            response.set_etag(etag, weak=True)
+        return response
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or not tipo_compressivel(response.mimetype)):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = encoding_da_requisicao()
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = comprimir_blocos(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        dados = response.get_data()
+        if len(dados) < MINIMO_BYTES:
+            return response
+        response.set_data(comprimir(dados, encoding))
+    response.headers['Content-Encoding'] = encoding
+    if etag and not fraco:
+        response.set_etag(etag, weak=True)
+    return response
+
+@app.after_request
+def comprimir_resposta(response):
+    """Comprime JSON/HTML/texto maiores que COMPRESSAO_MINIMO_BYTES (inclusive em streaming)"""
+    return aplicar_compressao(response)
+
+# Página principal e version.js: só mudam com o deploy (template + URLs com hash dos assets),
+# então são renderizados uma vez por versão e servidos da memória. O ETag forte é a própria
+# versão: o navegador revalida a cada uso (no-cache) e recebe 304 enquanto o deploy não mudar.
+_conteudos_por_versao = {}  # versão -> {'gerada_em': ..., nome: bytes}
+
+def versao_aplicacao():
+    """Versão do deploy (Vercel) ou, fora dele, hash do manifesto de assets e dos templates"""
+    if VERSAO_DEPLOY:
+        return VERSAO_DEPLOY
+    if _conteudos_por_versao and not app.debug:
+        return next(iter(_conteudos_por_versao))
+    if app.debug:
+        # Em desenvolvimento, editar um arquivo ou um template já troca a versão
+        manifesto_assets.montar()
+    marcador = json.dumps(manifesto_assets.como_dict(), sort_keys=True)
+    for template in ('index.html', 'version.js'):
+        marcador += str(os.stat(os.path.join(app.template_folder, template)).st_mtime_ns)
+    return hashlib.sha1(marcador.encode('utf-8')).hexdigest()[:16]
+
+def conteudos_da_versao():
+    """(versão, dict dos conteúdos já gerados nesta versão)"""
+    versao = versao_aplicacao()
+    conteudos = _conteudos_por_versao.get(versao)
+    if conteudos is None:
+        conteudos = {'gerada_em': str(int(time.time()))}
+        _conteudos_por_versao.clear()
+        _conteudos_por_versao[versao] = conteudos
+    return versao, conteudos
+
+def resposta_versionada(nome, gerar, content_type):
+    """
+    Resposta com o conteúdo `nome` da versão atual (gerar(versao) -> bytes, chamado uma vez
+    por versão), ETag igual à versão e 304 para If-None-Match. A variante comprimida também é
+    gerada uma vez por versão e encoding.
+    """
+    versao, conteudos = conteudos_da_versao()
+    if request.if_none_match.contains_weak(versao):
+        response = make_response('', 304)
+        response.set_etag(versao)
+    else:
+        corpo = conteudos.get(nome)
+        if corpo is None:
+            # Corrida entre threads só gera duas vezes o mesmo conteúdo
+            corpo = conteudos[nome] = gerar(versao)
+        encoding = encoding_da_requisicao() if len(corpo) >= MINIMO_BYTES else None
+        if encoding:
+            comprimido = conteudos.get((nome, encoding))
+            if comprimido is None:
+                comprimido = conteudos[(nome, encoding)] = comprimir(corpo, encoding, maximo=True)
+            response = make_response(comprimido)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = make_response(corpo)
+        response.content_type = content_type
+        response.set_etag(versao, weak=bool(encoding))
+    # Navegador e CDN podem guardar, mas precisam revalidar a cada uso
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 @app.route('/')
 def index():
     """Página principal"""
     # Não inicializar banco na página principal para evitar erros
     # O banco será inicializado quando necessário nas rotas de API
-    # Cache busting agressivo: timestamp que muda a cada minuto para forçar atualização
-    import time
-    from flask import redirect, url_for
-    
-    # Se não tiver query parameter de versão, redirecionar com versão única
-    # Isso força navegador mobile a buscar HTML novo mesmo com cache
-    if not request.args.get('_v'):
-        deploy_timestamp = os.getenv('VERCEL_DEPLOYMENT_ID') or os.getenv('VERCEL_GIT_COMMIT_SHA') or 'stable'
-        if deploy_timestamp == 'stable':
-            version_param = str(int(time.time()) // 60)
-        else:
-            version_param = f"{str(int(time.time()) // 60)}-{deploy_timestamp[:8]}"
-        return redirect(f'/?_v={version_param}', code=302)
-    
-    # Usar timestamp arredondado para minutos (muda a cada minuto)
-    # Isso força atualização mesmo sem mudanças no código
-    # Adicionar timestamp de deploy para forçar atualização após purge
-    # IMPORTANTE: Se VERCEL_DEPLOYMENT_ID não existir, usar hash do commit ou timestamp estável
-    deploy_timestamp = os.getenv('VERCEL_DEPLOYMENT_ID') or os.getenv('VERCEL_GIT_COMMIT_SHA') or 'stable'
-    # Se não tiver deploy ID, usar apenas timestamp de minutos (estável por minuto)
-    if deploy_timestamp == 'stable':
-        cache_version = str(int(time.time()) // 60)  # Muda apenas a cada minuto
-    else:
-        cache_version = f"{str(int(time.time()) // 60)}-{deploy_timestamp[:8]}"  # Muda a cada minuto + deploy
-    # HTML timestamp muda a cada requisição para detectar atualizações mais rapidamente
-    html_timestamp = str(int(time.time()))  # Timestamp único por requisição
     
-    # Se for check de versão, retornar apenas a versão
-    # IMPORTANTE: Ignorar redirecionamento para check_version
+    # Check de versão das abas abertas antes de /api/versao existir
     if request.args.get('check_version'):
+        versao, conteudos = conteudos_da_versao()
         response = jsonify({
-            'app_version': cache_version,
-            'html_timestamp': html_timestamp,
+            'app_version': versao,
+            'html_timestamp': conteudos['gerada_em'],
             'timestamp': int(time.time())
         })
-        # Headers anti-cache para garantir que não seja cacheado
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0, s-maxage=0'
-        response.headers['CDN-Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-        response.headers['Vercel-CDN-Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
         return response
     
-    # Adicionar timestamp único para forçar atualização do HTML
-    html_timestamp = str(int(time.time()))
-    response = make_response(render_template('index.html', cache_version=cache_version, html_timestamp=html_timestamp))
-    # Headers ULTRA agressivos para forçar navegador mobile a buscar HTML novo
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0, s-maxage=0, private'
-    response.headers['CDN-Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-    response.headers['Vercel-CDN-Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
-    # Headers adicionais para mobile
+    response = resposta_versionada(
+        'index.html',
+        lambda versao: render_template('index.html', versao_app=versao).encode('utf-8'),
+        'text/html; charset=utf-8'
+    )
     response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['Last-Modified'] = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime())
-    # ETag único que muda sempre para forçar revalidação
-    deploy_timestamp_for_etag = os.getenv('VERCEL_DEPLOYMENT_ID') or os.getenv('VERCEL_GIT_COMMIT_SHA') or 'stable'
-    if deploy_timestamp_for_etag != 'stable':
-        response.headers['ETag'] = f'"{html_timestamp}-{deploy_timestamp_for_etag[:8]}"'
+    return response
+
+# Paginação por cursor (keyset): ?limit=N&cursor=<opaco>
+# Sem limit, as listagens continuam retornando tudo (compatibilidade)
+LIMITE_PAGINA_MAXIMO = 500
+
+def ler_paginacao(quantidade_chaves):
+    """
+    Lê ?limit= e ?cursor= da requisição.
+    Retorna (limite, chaves_do_cursor); limite é None quando a listagem não é paginada.
+    Levanta ValueError com mensagem para o usuário se os parâmetros forem inválidos.
+    """
+    limite = request.args.get('limit')
+    cursor_pagina = request.args.get('cursor')
+    if limite is None:
+        if cursor_pagina:
+            raise ValueError('Parâmetro cursor exige limit')
+        return None, None
+    try:
+        limite = int(limite)
+    except ValueError:
+        raise ValueError('Parâmetro limit deve ser um número')
+    if limite <= 0:
+        raise ValueError('Parâmetro limit deve ser maior que zero')
+    limite = min(limite, LIMITE_PAGINA_MAXIMO)
+    chaves = decodificar_cursor(cursor_pagina, quantidade_chaves) if cursor_pagina else None
+    return limite, chaves
+
+def resposta_paginada(itens, proximo_cursor):
+    """Resposta JSON da lista; o cursor da próxima página vai no header X-Proximo-Cursor"""
+    response = jsonify(itens)
+    if proximo_cursor:
+        response.headers['X-Proximo-Cursor'] = proximo_cursor
+    response.vary.add('Accept')
+    return response
+
+# Formato colunar das listagens: {"total": N, "colunas": {"campo": [valores]}}, cada nome de
+# campo uma vez por resposta em vez de uma vez por linha. ?formato=colunar devolve esse
+# formato em JSON; Accept: application/x-msgpack devolve em MessagePack.
+MIMETYPE_MSGPACK = 'application/x-msgpack'
+
+def prefere_msgpack():
+    """True se o cliente prefere MessagePack a JSON"""
+    return request.accept_mimetypes.best_match(('application/json', MIMETYPE_MSGPACK)) == MIMETYPE_MSGPACK
+
+def msgpack_indisponivel():
+    """Resposta 406 se o cliente prefere MessagePack e o pacote msgpack não está instalado"""
+    if msgpack is None and prefere_msgpack():
+        response = jsonify({'erro': 'MessagePack indisponível no servidor (pacote msgpack não instalado)'})
+        response.vary.add('Accept')
+        return response, 406
+    return None
+
+def formato_lista():
+    """'msgpack', 'colunar' ou None (array de objetos). Levanta ValueError se ?formato= for inválido."""
+    formato = request.args.get('formato', '').strip().lower()
+    if formato not in ('', 'colunar'):
+        raise ValueError('Parâmetro formato deve ser colunar')
+    if msgpack is not None and prefere_msgpack():
+        return 'msgpack'
+    return formato or None
+
+def resposta_colunar(colunas, total, proximo_cursor, formato):
+    """Resposta da lista no formato colunar (JSON ou MessagePack)"""
+    corpo = {'total': total, 'colunas': colunas}
+    if formato == 'msgpack':
+        response = make_response(msgpack.packb(corpo, use_bin_type=True))
+        response.mimetype = MIMETYPE_MSGPACK
     else:
-        response.headers['ETag'] = f'"{html_timestamp}"'
-    # Vary header para garantir que cache seja específico
-    response.headers['Vary'] = 'Accept, Accept-Encoding'
+        response = jsonify(corpo)
+    if proximo_cursor:
+        response.headers['X-Proximo-Cursor'] = proximo_cursor
+    response.vary.add('Accept')
     return response
 
+# GET condicional (ETag / If-None-Match) nas leituras de produtos e vendas.
+# Conexão das rotas GET: com_etag abre para ler as versões das tabelas e a rota usa a mesma,
+# então cada requisição ocupa uma única conexão do pool; devolvida no fim da requisição
+# (nas respostas em streaming, quando o stream termina).
+def conexao_requisicao():
+    """Conexão da requisição atual (aberta na primeira chamada)"""
+    if 'conexao' not in g:
+        g.conexao = get_db()
+    return g.conexao
+
+@app.teardown_request
+def fechar_conexao_requisicao(erro):
+    conn = g.pop('conexao', None)
+    if conn is not None:
+        conn.close()
+
+# O ETag vem do contador de versão das tabelas (versoes_tabelas, mantido por triggers),
+# da URL com a query string e da versão do deploy: se nada mudou, a rota responde 304
+# sem executar a consulta nem serializar a resposta.
+
+def com_etag(*tabelas):
+    """Decorador das rotas GET cujo conteúdo só depende das tabelas informadas"""
+    def decorador(rota):
+        @wraps(rota)
+        def rota_condicional(*args, **kwargs):
+            ensure_db_initialized()
+            versoes = ler_versoes_tabelas(tabelas, conexao_requisicao())
+            marcador = f"{VERSAO_DEPLOY}|{','.join(map(str, versoes))}|{request.full_path}|{prefere_msgpack()}"
+            etag = hashlib.sha1(marcador.encode('utf-8')).hexdigest()[:24]
+            
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(rota(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # O navegador pode guardar, mas precisa revalidar sempre
+            response.headers['Cache-Control'] = 'no-cache, private'
+            return response
+        return rota_condicional
+    return decorador
+
+# Cache em memória das respostas GET (cache_respostas.py), por fora do com_etag: um acerto
+# responde 200 ou 304 sem tocar no banco. As rotas de escrita invalidam as tags que alteraram;
+# o TTL limita quanto tempo uma escrita feita fora deste processo fica invisível.
+cache_respostas = CacheRespostas(
+    limite_bytes=int(float(os.getenv('CACHE_RESPOSTAS_MB', '32')) * 1024 * 1024),
+    ttl=float(os.getenv('CACHE_RESPOSTAS_TTL', '60'))
+)
+CABECALHOS_CACHEADOS = ('Content-Type', 'Content-Encoding', 'Vary', 'ETag', 'Cache-Control', 'X-Proximo-Cursor')
+
+def com_cache(*tags):
+    """Decorador das rotas GET cacheadas. As tags podem usar os parâmetros da rota: 'produto:{produto_id}'"""
+    def decorador(rota):
+        @wraps(rota)
+        def rota_cacheada(*args, **kwargs):
+            if not cache_respostas.ativo:
+                return rota(*args, **kwargs)
+            sincronizar_cache()
+            # Uma entrada por encoding: o acerto já sai comprimido, sem comprimir de novo
+            chave = f"{request.full_path}|{encoding_da_requisicao() or 'identity'}|{'msgpack' if prefere_msgpack() else 'json'}"
+            entrada = cache_respostas.obter(chave)
+            if entrada is not None:
+                response = make_response(entrada.corpo)
+                response.headers.update(entrada.cabecalhos)
+                etag, _ = response.get_etag()
+                if etag and request.if_none_match.contains_weak(etag):
+                    response = make_response('', 304)
+                    response.headers.update((nome, valor) for nome, valor in entrada.cabecalhos
+                                            if nome in ('Vary', 'ETag', 'Cache-Control'))
+                response.headers['X-Cache'] = 'HIT'
+                return response
+            
+            geracao = cache_respostas.geracao()
+            response = make_response(rota(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                aplicar_compressao(response)
+                cabecalhos = [(nome, response.headers[nome]) for nome in CABECALHOS_CACHEADOS if nome in response.headers]
+                cache_respostas.guardar(chave, response.get_data(), cabecalhos,
+                                        [tag.format(**kwargs) for tag in tags], geracao)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return rota_cacheada
+    return decorador
+
+# Listagem completa em streaming (?stream=1, sem limit): o array JSON é enviado em blocos
+# lidos com fetchmany, então a memória fica limitada ao tamanho do bloco e não ao da tabela
+LINHAS_POR_LOTE_STREAMING = 500
+
+def pediu_streaming():
+    """True se a requisição pediu ?stream=1"""
+    return request.args.get('stream', '').lower() in ('1', 'true', 'sim')
+
+def linhas_em_lotes(sql, params, criar_mapeador, nome_cursor, tamanho_lote):
+    """
+    Executa a consulta e gera as linhas, já convertidas pelo mapeador, em lotes de fetchmany.
+    Usa a conexão da requisição. No PostgreSQL usa um cursor nomeado (server-side);
+    o cursor do SQLite já lê sob demanda.
+    """
+    conn = conexao_requisicao()
+    if DATABASE_TYPE == 'postgresql':
+        cursor = conn.cursor(name=nome_cursor)
+        cursor.itersize = tamanho_lote
+    else:
+        cursor = get_cursor_tuplas(conn)
+    try:
+        cursor.execute(sql, params)
+        mapear = None
+        while True:
+            linhas = cursor.fetchmany(tamanho_lote)
+            if not linhas:
+                break
+            if mapear is None:
+                # No cursor nomeado, description só existe depois da primeira leitura
+                mapear = criar_mapeador(cursor.description)
+            yield [mapear(linha) for linha in linhas]
+    finally:
+        cursor.close()
+
+def resposta_json_streaming(sql, params, criar_mapeador, nome_cursor):
+    """Resposta com um array JSON gerado aos poucos (criar_mapeador: mapeador_produtos/mapeador_vendas)"""
+    def gerar():
+        separador = '['
+        for itens in linhas_em_lotes(sql, params, criar_mapeador, nome_cursor, LINHAS_POR_LOTE_STREAMING):
+            yield separador + ','.join(app.json.dumps(item, separators=(',', ':')) for item in itens)
+            separador = ','
+        yield '[]' if separador == '[' else ']'
+    return Response(stream_with_context(gerar()), mimetype='application/json')
+
+def agora_banco():
+    """Data/hora atual no formato das colunas de data (datetime no PostgreSQL, texto ISO no SQLite)"""
+    return datetime.now() if DATABASE_TYPE == 'postgresql' else datetime.now().isoformat()
+
+# Sincronização incremental (?since=<marca>): linhas alteradas depois da marca e ids excluídos.
+# A nova marca fica MARGEM_SINCRONIZACAO atrás do relógio, porque uma transação que ainda não
+# fez commit pode gravar data_atualizacao menor que a de linhas já visíveis; as linhas dessa
+# janela voltam na próxima sincronização (o cliente aplica como upsert, sem duplicar).
+MARGEM_SINCRONIZACAO = timedelta(seconds=30)
+
+def ler_marca_sincronizacao():
+    """Marca ?since= como datetime local (None se ausente). Levanta ValueError se inválida."""
+    valor = request.args.get('since', '').strip()
+    if not valor:
+        return None
+    try:
+        marca = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError('Parâmetro since deve ser uma data ISO 8601 (use a marca devolvida pela API)')
+    if marca.tzinfo:
+        marca = marca.astimezone().replace(tzinfo=None)
+    return marca
+
+def sql_sincronizacao(tabela):
+    """SELECT de ?since= da tabela: linhas com data_atualizacao depois da marca (placeholder)"""
+    placeholder = get_placeholder()
+    if tabela == 'vendas':
+        return f'''
+            {SELECT_VENDAS}
+            WHERE v.data_atualizacao > {placeholder}
+            ORDER BY v.data_atualizacao, v.id
+        '''
+    return f'''
+        SELECT * FROM produtos
+        WHERE data_atualizacao > {placeholder}
+        ORDER BY data_atualizacao, id
+    '''
+
+def sql_exclusoes():
+    """SELECT dos ids excluídos de uma tabela depois da marca (params: tabela, marca)"""
+    placeholder = get_placeholder()
+    return f'''
+        SELECT registro_id, data_exclusao FROM exclusoes
+        WHERE tabela = {placeholder} AND data_exclusao > {placeholder}
+        ORDER BY data_exclusao, id
+    '''
+
+def resposta_sincronizacao(tabela, sql, marca, criar_mapeador):
+    """
+    Resposta de ?since=: {'itens': alterados desde a marca, 'excluidos': ids, 'marca': próxima marca}.
+    `sql` deve filtrar data_atualizacao > placeholder. O cliente aplica os excluídos antes dos itens.
+    """
+    parametro = marca if DATABASE_TYPE == 'postgresql' else marca.isoformat()
+    
+    conn = conexao_requisicao()
+    cursor = get_cursor_tuplas(conn)
+    cursor.execute(sql, (parametro,))
+    linhas = cursor.fetchall()
+    indice_data = [coluna[0] for coluna in cursor.description].index('data_atualizacao')
+    datas = [linha[indice_data] for linha in linhas]
+    itens = mapear_linhas(cursor, criar_mapeador, linhas)
+    cursor.execute(sql_exclusoes(), (tabela, parametro))
+    exclusoes = cursor.fetchall()
+    cursor.close()
+    
+    datas.extend(exclusao[1] for exclusao in exclusoes)
+    nova_marca = marca
+    if datas:
+        mais_recente = max(data if isinstance(data, datetime) else datetime.fromisoformat(data) for data in datas)
+        nova_marca = max(marca, min(mais_recente, datetime.now() - MARGEM_SINCRONIZACAO))
+    
+    return jsonify({
+        'itens': itens,
+        'excluidos': [exclusao[0] for exclusao in exclusoes],
+        'marca': nova_marca.isoformat()
+    })
+
+# ?ordem= da listagem de produtos: (expressão SQL, direção). Cada uma tem índice (expressão, id)
+# em models.INDICES, e o cursor da próxima página guarda a ordem para não misturar ordenações.
+ORDENACOES_PRODUTOS = {
+    'recente': ('data_atualizacao', 'DESC'),
+    'nome': ('LOWER(titulo)', 'ASC'),
+    'nome-desc': ('LOWER(titulo)', 'DESC'),
+    'quantidade': ('quantidade', 'DESC'),
+    'quantidade-asc': ('quantidade', 'ASC'),
+}
+
+def _data_do_cursor(valor):
+    """True se o valor de um cursor é uma data/hora ISO (o PostgreSQL recusaria outro texto com erro)"""
+    if not isinstance(valor, str):
+        return False
+    try:
+        datetime.fromisoformat(valor)
+    except ValueError:
+        return False
+    return True
+
+def ler_ordem_produtos(chaves):
+    """
+    Lê ?ordem= (padrão: recente) e confere o cursor da página com a ordem pedida.
+    Retorna (ordem, chaves_do_keyset); levanta ValueError se a ordem ou o cursor forem inválidos.
+    """
+    ordem = request.args.get('ordem', 'recente')
+    if ordem not in ORDENACOES_PRODUTOS:
+        raise ValueError(f"Parâmetro ordem deve ser um de: {', '.join(ORDENACOES_PRODUTOS)}")
+    if not chaves:
+        return ordem, None
+    ordem_cursor, chave, id_produto = chaves
+    if ordem.startswith('quantidade'):
+        chave_valida = isinstance(chave, int)
+    elif ordem == 'recente':
+        chave_valida = _data_do_cursor(chave)
+    else:
+        chave_valida = isinstance(chave, str)
+    if ordem_cursor != ordem or not chave_valida or not isinstance(id_produto, int):
+        raise ValueError('Cursor inválido')
+    return ordem, [chave, id_produto]
+
+def sql_listar_produtos(ordem, chaves=None, limite=None):
+    """
+    SELECT de GET /api/produtos na `ordem`, continuando depois de `chaves` (keyset) e com
+    uma linha a mais que `limite` (para saber se há próxima página). Retorna (sql, params).
+    """
+    placeholder = get_placeholder()
+    expressao, direcao = ORDENACOES_PRODUTOS[ordem]
+    # chave_ordem: valor da ordenação calculado pelo banco (LOWER do SQLite e do PostgreSQL
+    # diferem do str.lower() do Python), usado no cursor da próxima página
+    sql = f'SELECT *, {expressao} AS chave_ordem FROM produtos'
+    params = []
+    if chaves:
+        # Keyset: continua exatamente depois da última linha da página anterior (usa o índice).
+        # Sem row value: o SQLite não faz busca no índice de expressão com (LOWER(titulo), id) > (?, ?)
+        comparacao = '<' if direcao == 'DESC' else '>'
+        sql += (f' WHERE {expressao} {comparacao}= {placeholder}'
+                f' AND ({expressao} {comparacao} {placeholder} OR id {comparacao} {placeholder})')
+        params.extend([chaves[0], chaves[0], chaves[1]])
+    sql += f' ORDER BY {expressao} {direcao}, id {direcao}'
+    if limite:
+        sql += f' LIMIT {placeholder}'
+        params.append(limite + 1)
+    return sql, params
+
 @app.route('/api/produtos', methods=['GET'])
+@com_cache('produtos')
+@com_etag('produtos')
 def listar_produtos():
-    """Lista todos os produtos"""
+    """
+    Lista os produtos na ?ordem= pedida (padrão: mais recente primeiro), com paginação
+    opcional por cursor. Sem paginação, ?stream=1 envia a lista em streaming.
+    Com ?since=<marca>, devolve só as alterações desde a marca (resposta_sincronizacao).
+    """
     ensure_db_initialized()
-    conn = get_db()
-    cursor = get_cursor(conn)
-    cursor.execute('SELECT * FROM produtos ORDER BY data_atualizacao DESC')
+    try:
+        limite, chaves = ler_paginacao(3)
+        ordem, chaves = ler_ordem_produtos(chaves)
+        marca = ler_marca_sincronizacao()
+        formato = formato_lista()
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    erro = msgpack_indisponivel()
+    if erro:
+        return erro
+    
+    if marca:
+        return resposta_sincronizacao('produtos', sql_sincronizacao('produtos'), marca, mapeador_produtos)
+    sql, params = sql_listar_produtos(ordem, chaves, limite)
+    if not limite and not formato and pediu_streaming():
+        return resposta_json_streaming(sql, params, mapeador_produtos, 'listar_produtos')
+    
+    conn = conexao_requisicao()
+    cursor = get_cursor_tuplas(conn)
+    cursor.execute(sql, params)
     produtos = cursor.fetchall()
+    tem_proxima = bool(limite) and len(produtos) > limite
+    proximo_cursor = None
+    if tem_proxima:
+        produtos = produtos[:limite]
+        ultimo = produtos[-1]
+        indice_id = [coluna[0] for coluna in cursor.description].index('id')
+        proximo_cursor = codificar_cursor(ordem, ultimo[-1], ultimo[indice_id])
+    if formato:
+        colunas = colunas_produtos(cursor.description, produtos)
+        cursor.close()
+        return resposta_colunar(colunas, len(produtos), proximo_cursor, formato)
+    produtos = mapear_linhas(cursor, mapeador_produtos, produtos)
     cursor.close()
-    conn.close()
     
-    return jsonify([produto_para_dict(p) for p in produtos])
+    return resposta_paginada(produtos, proximo_cursor)
 
 @app.route('/api/produtos', methods=['POST'])
 def criar_produto():
@@ -248,11 +721,17 @@ def criar_produto():
             especificacoes = json.dumps({}, ensure_ascii=False)
         
         ensure_db_initialized()
+        conn = get_db()
+        cursor = get_cursor(conn)
+        cursor.execute(sql_titulo_em_uso(), (titulo, 0))
+        if cursor.fetchone():
+            cursor.close()
+            conn.close()
+            return jsonify({'erro': ERRO_TITULO_DUPLICADO}), 409
+        
         if DATABASE_TYPE == 'postgresql':
             from datetime import datetime as dt
             data_atual = dt.now()
-            conn = get_db()
-            cursor = get_cursor(conn)
             cursor.execute('''
                 INSERT INTO produtos (titulo, descricao, quantidade, valor_compra, imagem, especificacoes, data_criacao, data_atualizacao)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
@@ -261,39 +740,126 @@ def criar_produto():
             produto_id = cursor.fetchone()['id']
         else:
             data_atual = datetime.now().isoformat()
-            conn = get_db()
-            cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO produtos (titulo, descricao, quantidade, valor_compra, imagem, especificacoes, data_criacao, data_atualizacao)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (titulo, descricao, quantidade, valor_compra, imagem, especificacoes, data_atual, data_atual))
             produto_id = cursor.lastrowid
         
+        indexar_produto_busca(cursor, produto_id, titulo, descricao, especificacoes)
+        tags, evento = ('produtos',), ('produto_criado', {'id': produto_id})
+        avisar_outros_processos(cursor, tags, evento)
         conn.commit()
         cursor.close()
         conn.close()
+        aplicar_alteracao(tags, evento)
         
         return jsonify({'id': produto_id, 'mensagem': 'Produto criado com sucesso'}), 201
         
+    except ErroIntegridade:
+        return jsonify({'erro': ERRO_TITULO_DUPLICADO}), 409
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+@app.route('/api/produtos/importar', methods=['POST'])
+def importar_produtos_arquivo():
+    """
+    Importa produtos de um arquivo CSV ou NDJSON (upsert pelo título).
+    Aceita upload multipart (campo "arquivo") ou o arquivo direto no corpo da requisição.
+    Formato pela extensão/Content-Type ou por ?formato=csv|ndjson.
+    """
+    ensure_db_initialized()
+    arquivo = request.files.get('arquivo')
+    if arquivo:
+        stream = arquivo.stream
+        formato = detectar_formato(arquivo.filename, arquivo.mimetype)
+    else:
+        stream = request.stream
+        formato = detectar_formato(tipo_conteudo=request.mimetype)
+    formato = request.args.get('formato', formato)
+    if formato not in ('csv', 'ndjson'):
+        return jsonify({'erro': 'Formato deve ser "csv" ou "ndjson"'}), 400
+    
+    try:
+        resumo = importar_produtos(stream, formato)
     except Exception as e:
+        import traceback
+        traceback.print_exc()
         return jsonify({'erro': str(e)}), 500
+    
+    if resumo['linhas'] == 0:
+        return jsonify({'erro': 'Arquivo vazio'}), 400
+    if resumo['inseridos'] or resumo['atualizados']:
+        tags = TAGS_POR_TABELA['produtos']
+        evento = ('produtos_importados', {'inseridos': resumo['inseridos'], 'atualizados': resumo['atualizados']})
+        if DATABASE_TYPE == 'postgresql':
+            # A importação faz os próprios commits por lote: avisar numa transação separada
+            conn = get_db()
+            cursor = conn.cursor()
+            avisar_outros_processos(cursor, tags, evento)
+            conn.commit()
+            cursor.close()
+            conn.close()
+        aplicar_alteracao(tags, evento)
+    elif resumo['lotes_com_erro']:
+        # Nenhum lote gravado: o resumo diz quais linhas falharam no banco
+        return jsonify({'erro': 'Nenhum produto foi gravado', **resumo}), 500
+    return jsonify(resumo), 200
+
+@app.route('/api/produtos/busca', methods=['GET'])
+@com_cache('produtos')
+@com_etag('produtos')
+def buscar_produtos():
+    """Busca textual de produtos (título, descrição e especificações), ordenada por relevância"""
+    ensure_db_initialized()
+    termos = termos_busca(request.args.get('q', ''))
+    if not termos:
+        return jsonify([])
+    try:
+        limite = min(max(int(request.args.get('limit', 50)), 1), LIMITE_PAGINA_MAXIMO)
+    except ValueError:
+        return jsonify({'erro': 'Parâmetro limit deve ser um número'}), 400
+    
+    sql, params = sql_busca_produtos(termos, limite)
+    conn = conexao_requisicao()
+    cursor = get_cursor_tuplas(conn)
+    cursor.execute(sql, params)
+    produtos = mapear_linhas(cursor, mapeador_produtos, cursor.fetchall())
+    cursor.close()
+    
+    return jsonify(produtos)
 
 @app.route('/api/produtos/<int:produto_id>', methods=['GET'])
+@com_cache('produto:{produto_id}', 'produto:*')
+@com_etag('produtos')
 def obter_produto(produto_id):
     """Obtém um produto específico"""
     ensure_db_initialized()
-    conn = get_db()
-    cursor = get_cursor(conn)
+    conn = conexao_requisicao()
+    cursor = get_cursor_tuplas(conn)
     placeholder = get_placeholder()
     cursor.execute(f'SELECT * FROM produtos WHERE id = {placeholder}', (produto_id,))
-    produto = cursor.fetchone()
+    produto = mapear_linhas(cursor, mapeador_produtos, cursor.fetchall())
     cursor.close()
-    conn.close()
     
     if produto:
-        return jsonify(produto_para_dict(produto))
+        return jsonify(produto[0])
     return jsonify({'erro': 'Produto não encontrado'}), 404
 
+def sql_titulo_em_uso():
+    """Outro produto com o mesmo título (params: titulo, id do produto; 0 na criação)"""
+    placeholder = get_placeholder()
+    return f'SELECT id FROM produtos WHERE titulo = {placeholder} AND id != {placeholder} LIMIT 1'
+
+# O título é a chave natural dos produtos (importação por planilha): índice UNIQUE na
+# migração 14. As rotas conferem antes de gravar e respondem 409; o índice cobre a corrida.
+ERRO_TITULO_DUPLICADO = 'Já existe um produto com este título'
+
+def sql_imagem_em_uso():
+    """COUNT dos outros produtos com a mesma imagem (params: imagem, id do produto)"""
+    placeholder = get_placeholder()
+    return f'SELECT COUNT(*) as total FROM produtos WHERE imagem = {placeholder} AND id != {placeholder}'
+
 @app.route('/api/produtos/<int:produto_id>', methods=['PUT'])
 def atualizar_produto(produto_id):
     """Atualiza um produto existente"""
@@ -319,6 +885,11 @@ def atualizar_produto(produto_id):
             cursor.close()
             conn.close()
             return jsonify({'erro': 'Título é obrigatório'}), 400
+        cursor.execute(sql_titulo_em_uso(), (titulo, produto_id))
+        if cursor.fetchone():
+            cursor.close()
+            conn.close()
+            return jsonify({'erro': ERRO_TITULO_DUPLICADO}), 409
         
         descricao = data.get('descricao', produto['descricao'])
         
@@ -343,10 +914,7 @@ def atualizar_produto(produto_id):
             # Verificar se a imagem antiga não é uma URL externa (Unsplash, etc)
             if not imagem_antiga.startswith('https://source.unsplash.com') and not imagem_antiga.startswith('http://source.unsplash.com'):
                 # Verificar se a imagem está sendo usada por outro produto
-                if DATABASE_TYPE == 'postgresql':
-                    cursor.execute('SELECT COUNT(*) as total FROM produtos WHERE imagem = %s AND id != %s', (imagem_antiga, produto_id))
-                else:
-                    cursor.execute('SELECT COUNT(*) as total FROM produtos WHERE imagem = ? AND id != ?', (imagem_antiga, produto_id))
+                cursor.execute(sql_imagem_em_uso(), (imagem_antiga, produto_id))
                 resultado = cursor.fetchone()
                 # Extrair o valor do COUNT de forma compatível
                 if isinstance(resultado, dict):
@@ -411,15 +979,40 @@ def atualizar_produto(produto_id):
                 WHERE id = ?
             ''', (titulo, descricao, quantidade, valor_compra, imagem, especificacoes, data_atual, produto_id))
         
+        indexar_produto_busca(cursor, produto_id, titulo, descricao, especificacoes)
+        tags, evento = ('produtos', f'produto:{produto_id}'), ('produto_atualizado', {'id': produto_id})
+        avisar_outros_processos(cursor, tags, evento)
         conn.commit()
         cursor.close()
         conn.close()
+        aplicar_alteracao(tags, evento)
         
         return jsonify({'mensagem': 'Produto atualizado com sucesso'})
         
+    except ErroIntegridade:
+        return jsonify({'erro': ERRO_TITULO_DUPLICADO}), 409
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
+def sql_preencher_titulo_vendas():
+    """UPDATE que copia o título do produto para as vendas sem produto_titulo (params: data, produto_id)"""
+    if DATABASE_TYPE == 'postgresql':
+        return '''
+            UPDATE vendas v
+            SET produto_titulo = p.titulo, data_atualizacao = %s
+            FROM produtos p
+            WHERE v.produto_id = p.id 
+            AND v.produto_id = %s
+            AND (v.produto_titulo IS NULL OR v.produto_titulo = '')
+        '''
+    return '''
+        UPDATE vendas 
+        SET produto_titulo = (SELECT titulo FROM produtos WHERE produtos.id = vendas.produto_id),
+            data_atualizacao = ?
+        WHERE produto_id = ?
+        AND (produto_titulo IS NULL OR produto_titulo = '')
+    '''
+
 @app.route('/api/produtos/<int:produto_id>', methods=['DELETE'])
 def deletar_produto(produto_id):
     """Deleta um produto"""
@@ -440,22 +1033,7 @@ def deletar_produto(produto_id):
         
         # Antes de deletar, garantir que produto_titulo esteja salvo em todas as vendas
         # (caso ainda não esteja por algum motivo)
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('''
-                UPDATE vendas v
-                SET produto_titulo = p.titulo
-                FROM produtos p
-                WHERE v.produto_id = p.id 
-                AND v.produto_id = %s
-                AND (v.produto_titulo IS NULL OR v.produto_titulo = '')
-            ''', (produto_id,))
-        else:
-            cursor.execute('''
-                UPDATE vendas 
-                SET produto_titulo = (SELECT titulo FROM produtos WHERE produtos.id = vendas.produto_id)
-                WHERE produto_id = ?
-                AND (produto_titulo IS NULL OR produto_titulo = '')
-            ''', (produto_id,))
+        cursor.execute(sql_preencher_titulo_vendas(), (agora_banco(), produto_id))
         
         # Deletar imagem se existir e não estiver sendo usada por outro produto
         imagem_para_deletar = produto['imagem'] if DATABASE_TYPE == 'postgresql' else produto.get('imagem', '')
@@ -465,10 +1043,7 @@ def deletar_produto(produto_id):
                 print(f"ℹ️  Imagem é URL externa (Unsplash), não será deletada: {imagem_para_deletar}")
             else:
                 # Verificar se a imagem está sendo usada por outro produto
-                if DATABASE_TYPE == 'postgresql':
-                    cursor.execute('SELECT COUNT(*) as total FROM produtos WHERE imagem = %s AND id != %s', (imagem_para_deletar, produto_id))
-                else:
-                    cursor.execute('SELECT COUNT(*) as total FROM produtos WHERE imagem = ? AND id != ?', (imagem_para_deletar, produto_id))
+                cursor.execute(sql_imagem_em_uso(), (imagem_para_deletar, produto_id))
                 resultado = cursor.fetchone()
                 # Extrair o valor do COUNT de forma compatível
                 if isinstance(resultado, dict):
@@ -506,9 +1081,16 @@ def deletar_produto(produto_id):
         
         # Deletar produto
         cursor.execute(f'DELETE FROM produtos WHERE id = {placeholder}', (produto_id,))
+        remover_produto_busca(cursor, produto_id)
+        registrar_exclusao(cursor, 'produtos', produto_id, agora_banco())
+        # As vendas do produto podem ter recebido produto_titulo
+        tags = ('produtos', f'produto:{produto_id}', 'vendas', 'venda:*')
+        evento = ('produto_excluido', {'id': produto_id})
+        avisar_outros_processos(cursor, tags, evento)
         conn.commit()
         cursor.close()
         conn.close()
+        aplicar_alteracao(tags, evento)
         
         return jsonify({'mensagem': 'Produto deletado com sucesso'})
         
@@ -562,27 +1144,43 @@ def uploaded_file(filename):
         return redirect(filename)
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
-@app.route('/static/css/<filename>')
-def serve_css(filename):
-    """Serve arquivos CSS com headers anti-cache"""
-    response = send_from_directory(os.path.join(app.static_folder, 'css'), filename)
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0, s-maxage=0'
-    response.headers['CDN-Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-    response.headers['Vercel-CDN-Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+def enviar_arquivo_static(caminho, cache_control):
+    """Arquivo de static/, pré-comprimido da memória quando há variante para o Accept-Encoding"""
+    encoding = encoding_da_requisicao()
+    comprimido = manifesto_assets.variante_comprimida(caminho, encoding)
+    if comprimido is None:
+        response = send_from_directory(app.static_folder, caminho)
+    else:
+        response = Response(comprimido, mimetype=mimetypes.guess_type(caminho)[0])
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(manifesto_assets.hash_de(caminho), weak=True)
+        response.make_conditional(request)
+    if manifesto_assets.tem_variantes(caminho):
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = cache_control
     return response
 
-@app.route('/static/js/<filename>')
-def serve_js(filename):
-    """Serve arquivos JS com headers anti-cache"""
-    response = send_from_directory(os.path.join(app.static_folder, 'js'), filename)
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0, s-maxage=0'
-    response.headers['CDN-Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-    response.headers['Vercel-CDN-Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
-    return response
+def servir_static(filename):
+    """
+    Arquivos de static/. Com o hash do conteúdo no nome: cache de um ano (a URL muda quando o
+    arquivo muda). Hash antigo (HTML de um deploy anterior): redireciona para a URL atual.
+    Sem hash: o navegador revalida a cada uso (ETag/Last-Modified).
+    """
+    resolvido = manifesto_assets.resolver(filename)
+    if resolvido is None:
+        return enviar_arquivo_static(filename, 'no-cache')
+    
+    original, atual = resolvido
+    if not atual:
+        if manifesto_assets.hash_de(original) is None:
+            return jsonify({'erro': 'Arquivo não encontrado'}), 404
+        response = redirect(asset_url(original), code=302)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return enviar_arquivo_static(original, 'public, max-age=31536000, immutable')
+
+# Substitui a view padrão do Flask para /static/<path:filename> (url_for('static', ...) continua igual)
+app.view_functions['static'] = servir_static
 
 @app.route('/api/debug/cache')
 def debug_cache():
@@ -590,230 +1188,545 @@ def debug_cache():
     import time
     cache_info = {
         'timestamp': int(time.time()),
-        'cache_version': str(int(time.time()) // 60),
+        'cache_version': versao_aplicacao(),
         'headers_received': dict(request.headers),
-        'recommendation': 'Verifique o header x-vercel-cache na resposta. MISS = do origin, HIT = do cache'
+        'recommendation': 'Verifique o header x-vercel-cache na resposta. MISS = do origin, HIT = do cache',
+        'cache_respostas': cache_respostas.estatisticas()
     }
     return jsonify(cache_info)
 
+@app.route('/api/debug/pool')
+def debug_pool():
+    """Estatísticas do pool de conexões PostgreSQL (em uso, aguardando, criadas, recicladas)"""
+    if DATABASE_TYPE != 'postgresql':
+        return jsonify({'pool': None, 'mensagem': 'Pool de conexões só é usado com PostgreSQL'})
+    from db_pool import estatisticas_pool
+    return jsonify({'pool': estatisticas_pool()})
+
+# Eventos de alteração (Server-Sent Events): as rotas de escrita publicam depois do commit e
+# cada conexão aberta recebe sem consultar o banco. O buffer guarda os últimos eventos para
+# o EventSource retomar com Last-Event-ID; a conexão é encerrada depois de
+# DURACAO_MAXIMA_EVENTOS e o navegador reconecta sozinho, do ponto onde parou.
+# Cada conexão aberta ocupa um worker (ou uma função serverless) durante toda a duração:
+# com EVENTOS_SSE=0 a rota responde 503 e a página consulta as listas por ETag periodicamente.
+# No Vercel o padrão é desligado.
+barramento_eventos = BarramentoEventos()
+EVENTOS_SSE_ATIVOS = os.getenv('EVENTOS_SSE', '0' if os.getenv('VERCEL') else '1').lower() in ('1', 'true')
+INTERVALO_HEARTBEAT_EVENTOS = 15
+DURACAO_MAXIMA_EVENTOS = int(os.getenv('EVENTOS_DURACAO_MAXIMA', '300'))
+RECONEXAO_EVENTOS_MS = 3000
+
+def publicar_evento(tipo, dados):
+    """Publica um evento para as conexões de /api/eventos (chamar depois do commit)"""
+    barramento_eventos.publicar(tipo, dados)
+
+# Alterações feitas pelas rotas de escrita: `tags` do cache de respostas e `evento` (tipo, dados)
+# de /api/eventos. Este processo aplica depois do commit; os outros recebem pelo invalidacao.py.
+def avisar_outros_processos(cursor, tags, evento):
+    """Antes do commit: no PostgreSQL, NOTIFY para os outros workers (entregue só se o commit ocorrer)"""
+    if DATABASE_TYPE == 'postgresql':
+        notificar_alteracao(cursor, tags, evento)
+
+def aplicar_alteracao(tags, evento):
+    """Depois do commit: invalida o cache deste processo e publica o evento"""
+    cache_respostas.invalidar(*tags)
+    publicar_evento(*evento)
+
+def _alteracao_recebida(alteracao):
+    """Aviso de outro processo (thread do LISTEN)"""
+    if alteracao.get('origem') == origem_processo():
+        return
+    cache_respostas.invalidar(*alteracao['tags'])
+    if alteracao.get('evento'):
+        publicar_evento(*alteracao['evento'])
+
+def _tabelas_alteradas(tabelas):
+    """SQLite: outra conexão alterou as tabelas, sem dizer quais linhas"""
+    cache_respostas.invalidar(*[tag for tabela in tabelas for tag in TAGS_POR_TABELA.get(tabela, ())])
+
+if DATABASE_TYPE == 'postgresql':
+    from models import DATABASE_CONFIG
+    ouvinte_alteracoes = OuvinteAlteracoes(DATABASE_CONFIG, _alteracao_recebida, cache_respostas.limpar)
+else:
+    from models import DATABASE
+    verificador_alteracoes = VerificadorSQLite(DATABASE, _tabelas_alteradas)
+
+@app.before_request
+def iniciar_ouvinte_alteracoes():
+    """
+    PostgreSQL: inicia a thread de LISTEN na primeira requisição do worker, qualquer que seja a
+    rota (um worker que só atende /api/eventos também precisa receber as escritas dos outros)
+    """
+    if DATABASE_TYPE == 'postgresql':
+        ouvinte_alteracoes.iniciar()
+
+def sincronizar_cache():
+    """Antes de ler o cache: garante que as escritas de outros processos já foram aplicadas"""
+    if DATABASE_TYPE != 'postgresql':
+        verificador_alteracoes.verificar()
+
+def _formatar_evento(numero, tipo, dados):
+    return (f'id: {barramento_eventos.id_evento(numero)}\n'
+            f'event: {tipo}\n'
+            f'data: {app.json.dumps(dados, separators=(",", ":"))}\n\n')
+
+@app.route('/api/eventos')
+def eventos():
+    """
+    Stream SSE com produto_criado/atualizado/excluido, produtos_importados e
+    venda_criada/atualizada/excluida, vendas_criadas. Se os eventos desde o Last-Event-ID
+    não estão mais disponíveis, envia "recarregar".
+    Com EVENTOS_SSE desligado responde 503: o EventSource não reconecta e a página passa a
+    consultar as listas por ETag.
+    """
+    if not EVENTOS_SSE_ATIVOS:
+        return jsonify({'erro': 'Eventos em tempo real desativados neste servidor'}), 503
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('ultimo_id')
+    numero = barramento_eventos.numero_do_id(last_event_id) if last_event_id else None
+    
+    def gerar():
+        ultimo = numero
+        yield f'retry: {RECONEXAO_EVENTOS_MS}\n\n'
+        if ultimo is None:
+            # Conexão nova: começa do evento atual
+            ultimo = barramento_eventos.ultimo_numero
+            if last_event_id:
+                yield _formatar_evento(ultimo, 'recarregar', {})
+        fim = time.monotonic() + DURACAO_MAXIMA_EVENTOS
+        while time.monotonic() < fim:
+            pendentes = barramento_eventos.eventos_apos(ultimo)
+            if pendentes is None:
+                ultimo = barramento_eventos.ultimo_numero
+                yield _formatar_evento(ultimo, 'recarregar', {})
+                continue
+            if pendentes:
+                yield ''.join(_formatar_evento(*evento) for evento in pendentes)
+                ultimo = pendentes[-1].numero
+                continue
+            if not barramento_eventos.aguardar(ultimo, min(INTERVALO_HEARTBEAT_EVENTOS, fim - time.monotonic())):
+                # Comentário SSE: mantém a conexão viva em proxies que cortam conexões ociosas
+                yield ': ping\n\n'
+    
+    response = Response(gerar(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/version.js')
 def version_js():
-    """Arquivo JavaScript que sempre verifica versão - carregado sem cache"""
-    import time
-    cache_version = str(int(time.time()) // 60)
-    html_timestamp = str(int(time.time()))
-    
-    js_content = f"""
-(function() {{
-    const currentVersion = '{cache_version}';
-    const htmlTimestamp = '{html_timestamp}';
-    
-    // Verificar versão armazenada
-    const storedVersion = localStorage.getItem('app_version');
-    const storedHtmlTimestamp = localStorage.getItem('html_timestamp');
-    
-    // Se detectar versão diferente, mostrar aviso
-    if (storedVersion && storedVersion !== currentVersion) {{
-        if (!document.getElementById('version-update-banner')) {{
-            const banner = document.createElement('div');
-            banner.id = 'version-update-banner';
-            banner.style.cssText = 'position: fixed; top: 0; left: 0; right: 0; background: #ff9800; color: white; padding: 12px; text-align: center; z-index: 10000; box-shadow: 0 2px 4px rgba(0,0,0,0.2);';
-            banner.innerHTML = `
-                <span>🔄 Nova versão disponível!</span>
-                <button onclick="location.reload(true)" style="margin-left: 15px; padding: 6px 12px; background: white; color: #ff9800; border: none; border-radius: 4px; cursor: pointer; font-weight: bold;">Atualizar Agora</button>
-                <button onclick="this.parentElement.remove()" style="margin-left: 10px; background: transparent; color: white; border: 1px solid white; padding: 6px 12px; border-radius: 4px; cursor: pointer;">✕</button>
-            `;
-            document.body.insertBefore(banner, document.body.firstChild);
-        }}
-    }}
-    
-    // Salvar versões atuais
-    localStorage.setItem('app_version', currentVersion);
-    localStorage.setItem('html_timestamp', htmlTimestamp);
-    
-    // Verificar periodicamente (a cada 60 segundos)
-    setInterval(function() {{
-        fetch('/?check_version=1&_=' + Date.now(), {{ 
-            cache: 'no-store',
-            headers: {{ 
-                'Cache-Control': 'no-cache',
-                'Pragma': 'no-cache'
-            }}
-        }})
-            .then(response => {{
-                if (!response.ok) return null;
-                return response.json();
-            }})
-            .then(data => {{
-                if (data && data.app_version) {{
-                    const storedVersion = localStorage.getItem('app_version');
-                    if (storedVersion && storedVersion !== data.app_version) {{
-                        if (!document.getElementById('version-update-banner')) {{
-                            const banner = document.createElement('div');
-                            banner.id = 'version-update-banner';
-                            banner.style.cssText = 'position: fixed; top: 0; left: 0; right: 0; background: #ff9800; color: white; padding: 12px; text-align: center; z-index: 10000; box-shadow: 0 2px 4px rgba(0,0,0,0.2);';
-                            banner.innerHTML = `
-                                <span>🔄 Nova versão disponível!</span>
-                                <button onclick="location.reload(true)" style="margin-left: 15px; padding: 6px 12px; background: white; color: #ff9800; border: none; border-radius: 4px; cursor: pointer; font-weight: bold;">Atualizar Agora</button>
-                                <button onclick="this.parentElement.remove()" style="margin-left: 10px; background: transparent; color: white; border: 1px solid white; padding: 6px 12px; border-radius: 4px; cursor: pointer;">✕</button>
-                            `;
-                            document.body.insertBefore(banner, document.body.firstChild);
-                        }}
-                        localStorage.setItem('app_version', data.app_version);
-                    }}
-                }}
-            }})
-            .catch(() => {{}});
-    }}, 60000);
-}})();
-"""
-    response = make_response(js_content, 200)
-    response.headers['Content-Type'] = 'application/javascript; charset=utf-8'
-    # Headers anti-cache para garantir que sempre seja buscado
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0, s-maxage=0'
-    response.headers['CDN-Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-    response.headers['Vercel-CDN-Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
-    return response
+    """Script que avisa quando há um deploy novo (consulta /api/versao a cada minuto)"""
+    return resposta_versionada(
+        'version.js',
+        lambda versao: render_template('version.js', versao_app=versao).encode('utf-8'),
+        'application/javascript; charset=utf-8'
+    )
+
+@app.route('/api/versao')
+def versao_api():
+    """Versão atual da aplicação; com If-None-Match da versão atual responde 304 vazio"""
+    return resposta_versionada(
+        'versao.json',
+        lambda versao: json.dumps({'versao': versao}).encode('utf-8'),
+        'application/json'
+    )
+
+def _ler_data_filtro(nome):
+    valor = request.args.get(nome, '').strip()
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'Parâmetro {nome} deve estar no formato AAAA-MM-DD')
+
+def _ler_numero_filtro(nome, tipo=float):
+    valor = request.args.get(nome, '').strip()
+    if not valor:
+        return None
+    try:
+        return tipo(valor.replace(',', '.')) if tipo is float else tipo(valor)
+    except ValueError:
+        raise ValueError(f'Parâmetro {nome} deve ser um número')
+
+def filtros_vendas():
+    """
+    Monta as condições WHERE dos filtros de GET /api/vendas:
+    de, ate (data_venda), onde_vendeu, produto_id, lucro_min, lucro_max,
+    valor_min, valor_max (valor_venda) e q (texto em produto_titulo/observações).
+    Retorna (condicoes, params). Levanta ValueError se algum filtro for inválido.
+    """
+    placeholder = get_placeholder()
+    condicoes = []
+    params = []
+    
+    de = _ler_data_filtro('de')
+    if de:
+        condicoes.append(f'v.data_venda >= {placeholder}')
+        params.append(de)
+    ate = _ler_data_filtro('ate')
+    if ate:
+        condicoes.append(f'v.data_venda <= {placeholder}')
+        params.append(ate)
+    
+    onde_vendeu = request.args.get('onde_vendeu', '').strip()
+    if onde_vendeu:
+        if onde_vendeu not in ['mercado_livre', 'shopee']:
+            raise ValueError('Onde vendeu deve ser "mercado_livre" ou "shopee"')
+        condicoes.append(f'v.onde_vendeu = {placeholder}')
+        params.append(onde_vendeu)
+    
+    produto_id = _ler_numero_filtro('produto_id', int)
+    if produto_id is not None:
+        condicoes.append(f'v.produto_id = {placeholder}')
+        params.append(produto_id)
+    
+    for nome, expressao, operador in (
+        ('lucro_min', 'v.valor_venda - v.valor_compra', '>='),
+        ('lucro_max', 'v.valor_venda - v.valor_compra', '<='),
+        ('valor_min', 'v.valor_venda', '>='),
+        ('valor_max', 'v.valor_venda', '<='),
+    ):
+        valor = _ler_numero_filtro(nome)
+        if valor is not None:
+            condicoes.append(f'{expressao} {operador} {placeholder}')
+            params.append(valor)
+    
+    termos = termos_busca(request.args.get('q', ''))
+    if termos:
+        condicao, params_busca = sql_filtro_busca_vendas(termos)
+        condicoes.append(condicao)
+        params.extend(params_busca)
+    
+    return condicoes, params
+
+# Vendas com o título do produto (o de vendas.produto_titulo se o produto foi deletado)
+SELECT_VENDAS = '''
+    SELECT v.*,
+           COALESCE(v.produto_titulo, p.titulo, 'Produto Deletado') as produto_titulo_final
+    FROM vendas v
+    LEFT JOIN produtos p ON v.produto_id = p.id
+'''
+
+def conferir_cursor_vendas(chaves):
+    """Chaves do cursor de GET /api/vendas: (data_venda, data_criacao, id). Levanta ValueError se inválidas."""
+    if chaves:
+        data_venda, data_criacao, id_venda = chaves
+        if not (_data_do_cursor(data_venda) and _data_do_cursor(data_criacao) and isinstance(id_venda, int)):
+            raise ValueError('Cursor inválido')
+    return chaves
+
+def sql_listar_vendas(condicoes, params, chaves=None, limite=None):
+    """
+    SELECT de GET /api/vendas com as condições de filtros_vendas(), continuando depois de
+    `chaves` (keyset) e com uma linha a mais que `limite`. Retorna (sql, params).
+    """
+    placeholder = get_placeholder()
+    condicoes, params = list(condicoes), list(params)
+    if chaves:
+        condicoes.append(f'(v.data_venda, v.data_criacao, v.id) < ({placeholder}, {placeholder}, {placeholder})')
+        params.extend(chaves)
+    sql = SELECT_VENDAS
+    if condicoes:
+        sql += ' WHERE ' + ' AND '.join(condicoes)
+    sql += ' ORDER BY v.data_venda DESC, v.data_criacao DESC, v.id DESC'
+    if limite:
+        sql += f' LIMIT {placeholder}'
+        params.append(limite + 1)
+    return sql, params
 
 @app.route('/api/vendas', methods=['GET'])
+@com_cache('vendas', 'produtos')
+@com_etag('vendas', 'produtos')
 def listar_vendas():
-    """Lista todas as vendas ordenadas por data (mais recente primeiro)"""
+    """
+    Lista as vendas ordenadas por data (mais recente primeiro).
+    Aceita os filtros de filtros_vendas() e paginação opcional por cursor.
+    Sem paginação, ?stream=1 envia a lista em streaming.
+    Com ?since=<marca>, devolve só as alterações desde a marca (sem os filtros).
+    """
     ensure_db_initialized()
-    conn = get_db()
-    cursor = get_cursor(conn)
+    try:
+        limite, chaves = ler_paginacao(3)
+        chaves = conferir_cursor_vendas(chaves)
+        condicoes, params = filtros_vendas()
+        marca = ler_marca_sincronizacao()
+        formato = formato_lista()
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    erro = msgpack_indisponivel()
+    if erro:
+        return erro
     
-    # Buscar vendas (usar produto_titulo da tabela vendas se produto foi deletado)
-    if DATABASE_TYPE == 'postgresql':
-        cursor.execute('''
-            SELECT v.*, 
-                   COALESCE(v.produto_titulo, p.titulo, 'Produto Deletado') as produto_titulo_final
-            FROM vendas v
-            LEFT JOIN produtos p ON v.produto_id = p.id
-            ORDER BY v.data_venda DESC, v.data_criacao DESC
-        ''')
-    else:
-        cursor.execute('''
-            SELECT v.*, 
-                   COALESCE(v.produto_titulo, p.titulo, 'Produto Deletado') as produto_titulo_final
-            FROM vendas v
-            LEFT JOIN produtos p ON v.produto_id = p.id
-            ORDER BY v.data_venda DESC, v.data_criacao DESC
-        ''')
+    if marca:
+        return resposta_sincronizacao('vendas', sql_sincronizacao('vendas'), marca, mapeador_vendas)
+    sql, params = sql_listar_vendas(condicoes, params, chaves, limite)
+    if not limite and not formato and pediu_streaming():
+        return resposta_json_streaming(sql, params, mapeador_vendas, 'listar_vendas')
     
+    conn = conexao_requisicao()
+    cursor = get_cursor_tuplas(conn)
+    cursor.execute(sql, params)
     vendas = cursor.fetchall()
+    
+    proximo_cursor = None
+    if limite and len(vendas) > limite:
+        vendas = vendas[:limite]
+        # Chaves do cursor com os valores crus do banco (data_venda sem a normalização da API)
+        colunas = [coluna[0] for coluna in cursor.description]
+        ultima = dict(zip(colunas, vendas[-1]))
+        proximo_cursor = codificar_cursor(ultima['data_venda'], ultima['data_criacao'], ultima['id'])
+    
+    if formato:
+        colunas = colunas_vendas(cursor.description, vendas)
+        cursor.close()
+        return resposta_colunar(colunas, len(vendas), proximo_cursor, formato)
+    vendas = mapear_linhas(cursor, mapeador_vendas, vendas)
     cursor.close()
-    conn.close()
     
-    # Converter para dict com informações do produto
-    vendas_dict = []
-    for venda in vendas:
-        if DATABASE_TYPE == 'postgresql':
-            produto_titulo = venda.get('produto_titulo_final', venda.get('produto_titulo', 'Produto Deletado'))
-        else:
-            produto_titulo = venda.get('produto_titulo_final', venda.get('produto_titulo', 'Produto Deletado'))
-        vendas_dict.append(venda_para_dict(venda, produto_titulo))
+    return resposta_paginada(vendas, proximo_cursor)
+
+# Colunas de GET /api/vendas/export (mesmas chaves de mapeador_vendas)
+COLUNAS_EXPORTACAO_VENDAS = [
+    'id', 'data_venda', 'produto_id', 'produto_titulo', 'onde_vendeu',
+    'valor_venda', 'valor_compra', 'lucro', 'porcentagem_lucro', 'observacoes', 'data_criacao'
+]
+LINHAS_POR_LOTE_EXPORTACAO = 1000
+
+def sql_exportar_vendas(condicoes):
+    """SELECT de GET /api/vendas/export (ordem cronológica) com as condições de filtros_vendas()"""
+    sql = SELECT_VENDAS
+    if condicoes:
+        sql += ' WHERE ' + ' AND '.join(condicoes)
+    return sql + ' ORDER BY v.data_venda, v.data_criacao, v.id'
+
+@app.route('/api/vendas/export', methods=['GET'])
+def exportar_vendas():
+    """
+    Exporta o histórico de vendas em CSV ou NDJSON (?formato=csv|ndjson), em ordem cronológica.
+    Aceita os filtros de filtros_vendas() (de, ate, onde_vendeu, ...).
+    A resposta é gerada em streaming: cursor nomeado (server-side) no PostgreSQL e fetchmany
+    no SQLite, então a memória não cresce com o número de vendas.
+    """
+    ensure_db_initialized()
+    formato = request.args.get('formato', request.args.get('format', 'csv')).lower()
+    if formato not in ('csv', 'ndjson'):
+        return jsonify({'erro': 'Formato deve ser "csv" ou "ndjson"'}), 400
+    try:
+        condicoes, params = filtros_vendas()
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    
+    sql = sql_exportar_vendas(condicoes)
+    
+    def gerar():
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        if formato == 'csv':
+            escritor.writerow(COLUNAS_EXPORTACAO_VENDAS)
+            yield buffer.getvalue()
+        for vendas in linhas_em_lotes(sql, params, mapeador_vendas, 'exportar_vendas', LINHAS_POR_LOTE_EXPORTACAO):
+            buffer.seek(0)
+            buffer.truncate()
+            for venda in vendas:
+                if formato == 'csv':
+                    escritor.writerow([venda[coluna] for coluna in COLUNAS_EXPORTACAO_VENDAS])
+                else:
+                    buffer.write(json.dumps(venda, ensure_ascii=False))
+                    buffer.write('\n')
+            yield buffer.getvalue()
+    
+    nome_arquivo = f'vendas.{formato}'
+    resposta = Response(
+        stream_with_context(gerar()),
+        mimetype='text/csv' if formato == 'csv' else 'application/x-ndjson'
+    )
+    resposta.headers['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    # Não deixar proxies (nginx) acumularem a resposta inteira antes de repassar
+    resposta.headers['X-Accel-Buffering'] = 'no'
+    return resposta
+
+# Filtros de /api/vendas/resumo que a tabela agregada vendas_resumo_mensal consegue responder
+PARAMETROS_RESUMO_AGREGADO = {'por_canal', 'onde_vendeu', 'produto_id'}
+
+def sql_resumo_vendas(condicoes, por_canal, usar_agregado):
+    """
+    SELECT de GET /api/vendas/resumo: por mês (e canal, se por_canal), na tabela agregada
+    vendas_resumo_mensal ou agregando as vendas com as condições de filtros_vendas()
+    """
+    if usar_agregado:
+        # Mesmas condições (onde_vendeu/produto_id) sobre a tabela agregada, que também usa o alias v
+        expressao_mes = 'v.mes'
+        tabela = 'vendas_resumo_mensal v'
+        colunas_valores = 'SUM(v.quantidade) AS quantidade, SUM(v.receita) AS receita, SUM(v.custo) AS custo'
+    else:
+        expressao_mes = expressao_mes_venda('v')
+        tabela = 'vendas v'
+        colunas_valores = 'COUNT(*) AS quantidade, SUM(v.valor_venda) AS receita, SUM(v.valor_compra) AS custo'
+    
+    colunas_grupo = [f'{expressao_mes} AS mes']
+    agrupamento = [expressao_mes]
+    if por_canal:
+        colunas_grupo.append('v.onde_vendeu')
+        agrupamento.append('v.onde_vendeu')
     
-    return jsonify(vendas_dict)
+    sql = f"SELECT {', '.join(colunas_grupo)}, {colunas_valores} FROM {tabela}"
+    if condicoes:
+        sql += ' WHERE ' + ' AND '.join(condicoes)
+    sql += f" GROUP BY {', '.join(agrupamento)} ORDER BY mes DESC"
+    if por_canal:
+        sql += ', v.onde_vendeu'
+    return sql
+
+@app.route('/api/vendas/resumo', methods=['GET'])
+@com_cache('vendas')
+@com_etag('vendas')
+def resumo_vendas():
+    """
+    Resumo mensal das vendas calculado no banco.
+    Aceita os mesmos filtros de GET /api/vendas; ?por_canal=1 separa por onde_vendeu.
+    Sem filtros de data/valor/texto, lê a tabela agregada vendas_resumo_mensal (O(meses));
+    caso contrário agrega as vendas com GROUP BY.
+    """
+    ensure_db_initialized()
+    try:
+        condicoes, params = filtros_vendas()
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    por_canal = request.args.get('por_canal', '').lower() in ('1', 'true', 'sim')
+    usar_agregado = set(k for k, v in request.args.items() if v) <= PARAMETROS_RESUMO_AGREGADO
+    sql = sql_resumo_vendas(condicoes, por_canal, usar_agregado)
+    
+    conn = conexao_requisicao()
+    cursor = get_cursor(conn)
+    cursor.execute(sql, params)
+    linhas = cursor.fetchall()
+    cursor.close()
+    
+    resumo = []
+    for linha in linhas:
+        receita = float(linha['receita'] or 0)
+        custo = float(linha['custo'] or 0)
+        lucro = receita - custo
+        item = {
+            'mes': linha['mes'],
+            'quantidade': int(linha['quantidade']),
+            'receita': round(receita, 2),
+            'custo': round(custo, 2),
+            'lucro': round(lucro, 2),
+            'margem': round(lucro / receita * 100, 2) if receita > 0 else 0,
+            'porcentagem_lucro': round(lucro / custo * 100, 2) if custo > 0 else 0
+        }
+        if por_canal:
+            item['onde_vendeu'] = linha['onde_vendeu']
+        resumo.append(item)
+    
+    return jsonify(resumo)
+
+def ler_dados_venda(data):
+    """
+    Valida os campos de uma nova venda.
+    Retorna (produto_id, valor_venda, data_venda, onde_vendeu, observacoes); levanta ValueError se inválida.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Venda inválida')
+    try:
+        produto_id = int(data.get('produto_id', 0) or 0)
+        valor_venda = float(data.get('valor_venda', 0) or 0)
+    except (TypeError, ValueError):
+        raise ValueError('Produto e valor de venda devem ser numéricos')
+    data_venda = (data.get('data_venda') or '').strip()
+    onde_vendeu = (data.get('onde_vendeu') or '').strip()
+    observacoes = (data.get('observacoes') or '').strip()
+    
+    if produto_id <= 0:
+        raise ValueError('Produto é obrigatório')
+    if valor_venda <= 0:
+        raise ValueError('Valor de venda deve ser maior que zero')
+    if not data_venda:
+        raise ValueError('Data da venda é obrigatória')
+    if onde_vendeu not in ['mercado_livre', 'shopee']:
+        raise ValueError('Onde vendeu deve ser "mercado_livre" ou "shopee"')
+    return produto_id, valor_venda, data_venda, onde_vendeu, observacoes
 
 @app.route('/api/vendas', methods=['POST'])
 def criar_venda():
     """Cria uma nova venda e diminui o estoque do produto"""
     ensure_db_initialized()
     try:
-        data = request.get_json()
-        
-        produto_id = int(data.get('produto_id', 0))
-        valor_venda = float(data.get('valor_venda', 0) or 0)
-        data_venda = data.get('data_venda', '').strip()
-        onde_vendeu = data.get('onde_vendeu', '').strip()
-        observacoes = data.get('observacoes', '').strip()
-        
-        # Validações
-        if produto_id <= 0:
-            return jsonify({'erro': 'Produto é obrigatório'}), 400
-        
-        if valor_venda <= 0:
-            return jsonify({'erro': 'Valor de venda deve ser maior que zero'}), 400
-        
-        if not data_venda:
-            return jsonify({'erro': 'Data da venda é obrigatória'}), 400
-        
-        if onde_vendeu not in ['mercado_livre', 'shopee']:
-            return jsonify({'erro': 'Onde vendeu deve ser "mercado_livre" ou "shopee"'}), 400
+        try:
+            produto_id, valor_venda, data_venda, onde_vendeu, observacoes = ler_dados_venda(request.get_json())
+        except ValueError as e:
+            return jsonify({'erro': str(e)}), 400
         
         conn = get_db()
         cursor = get_cursor(conn)
         placeholder = get_placeholder()
         
-        # Buscar produto para obter valor_compra e verificar estoque
-        cursor.execute(f'SELECT * FROM produtos WHERE id = {placeholder}', (produto_id,))
-        produto = cursor.fetchone()
-        
-        if not produto:
-            cursor.close()
-            conn.close()
-            return jsonify({'erro': 'Produto não encontrado'}), 404
-        
-        # Obter valor de compra, quantidade e título do produto
+        # Baixar o estoque e ler valor_compra/título em um único comando condicional:
+        # duas vendas simultâneas (Mercado Livre e Shopee) nunca consomem a mesma unidade
         if DATABASE_TYPE == 'postgresql':
-            valor_compra = float(produto.get('valor_compra', 0) or 0)
-            quantidade = int(produto.get('quantidade', 0) or 0)
-            produto_titulo = produto.get('titulo', '')
+            from datetime import datetime as dt
+            data_atual = dt.now()
         else:
-            valor_compra = float(produto['valor_compra'] if produto['valor_compra'] is not None else 0)
-            try:
-                quantidade = int(produto['quantidade'] if produto['quantidade'] is not None else 0)
-            except (KeyError, ValueError, TypeError):
-                quantidade = 0
-            produto_titulo = produto.get('titulo', '') or ''
+            data_atual = datetime.now().isoformat()
+        sql_baixa = f'''
+            UPDATE produtos
+            SET quantidade = quantidade - 1, data_atualizacao = {placeholder}
+            WHERE id = {placeholder} AND quantidade > 0
+        '''
+        if SUPORTA_RETURNING:
+            cursor.execute(sql_baixa + ' RETURNING valor_compra, titulo', (data_atual, produto_id))
+            produto = cursor.fetchone()
+        else:
+            # SQLite < 3.35: o UPDATE segura o lock de escrita até o commit, então ler a linha
+            # logo depois, na mesma transação, continua atômico
+            cursor.execute(sql_baixa, (data_atual, produto_id))
+            produto = None
+            if cursor.rowcount == 1:
+                cursor.execute(f'SELECT valor_compra, titulo FROM produtos WHERE id = {placeholder}', (produto_id,))
+                produto = cursor.fetchone()
         
-        # Verificar se há estoque disponível
-        if quantidade <= 0:
+        if not produto:
+            # Nenhuma linha alterada: produto inexistente ou sem estoque
+            cursor.execute(f'SELECT id FROM produtos WHERE id = {placeholder}', (produto_id,))
+            existe = cursor.fetchone()
+            conn.rollback()
             cursor.close()
             conn.close()
+            if not existe:
+                return jsonify({'erro': 'Produto não encontrado'}), 404
             return jsonify({'erro': 'Estoque insuficiente'}), 400
         
-        # Diminuir estoque
-        nova_quantidade = quantidade - 1
-        if DATABASE_TYPE == 'postgresql':
-            from datetime import datetime as dt
-            data_atual = dt.now()
-            cursor.execute('''
-                UPDATE produtos 
-                SET quantidade = %s, data_atualizacao = %s
-                WHERE id = %s
-            ''', (nova_quantidade, data_atual, produto_id))
-        else:
-            data_atual = datetime.now().isoformat()
-            cursor.execute('''
-                UPDATE produtos 
-                SET quantidade = ?, data_atualizacao = ?
-                WHERE id = ?
-            ''', (nova_quantidade, data_atual, produto_id))
+        valor_compra = float(produto['valor_compra'] or 0)
+        produto_titulo = produto['titulo'] or ''
         
         # Criar venda (salvar produto_titulo para preservar mesmo se produto for deletado)
         if DATABASE_TYPE == 'postgresql':
             from datetime import datetime as dt
             data_criacao = dt.now()
             cursor.execute('''
-                INSERT INTO vendas (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                INSERT INTO vendas (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao, data_atualizacao)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING id
-            ''', (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao))
+            ''', (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao, data_criacao))
             venda_id = cursor.fetchone()['id']
         else:
             data_criacao = datetime.now().isoformat()
             cursor.execute('''
-                INSERT INTO vendas (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao))
+                INSERT INTO vendas (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao, data_atualizacao)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao, data_criacao))
             venda_id = cursor.lastrowid
         
+        indexar_venda_busca(cursor, venda_id, produto_titulo, observacoes)
+        acumular_resumo_venda(cursor, data_venda, onde_vendeu, produto_id, valor_venda, valor_compra)
+        tags = ('vendas', 'produtos', f'produto:{produto_id}')
+        evento = ('venda_criada', {'id': venda_id, 'produto_id': produto_id})
+        avisar_outros_processos(cursor, tags, evento)
         conn.commit()
         cursor.close()
         conn.close()
+        aplicar_alteracao(tags, evento)
         
         return jsonify({'id': venda_id, 'mensagem': 'Venda registrada com sucesso'}), 201
         
@@ -823,25 +1736,195 @@ def criar_venda():
         return jsonify({'erro': str(e)}), 500
 
 @app.route('/api/vendas/<int:venda_id>', methods=['GET'])
+@com_cache('venda:{venda_id}', 'venda:*')
+@com_etag('vendas')
 def obter_venda(venda_id):
     """Obtém uma venda específica por ID"""
     ensure_db_initialized()
-    conn = get_db()
-    cursor = get_cursor(conn)
+    conn = conexao_requisicao()
+    cursor = get_cursor_tuplas(conn)
     placeholder = get_placeholder()
     
     cursor.execute(f'SELECT * FROM vendas WHERE id = {placeholder}', (venda_id,))
-    venda = cursor.fetchone()
+    venda = mapear_linhas(cursor, mapeador_vendas, cursor.fetchall())
     
     cursor.close()
-    conn.close()
     
     if not venda:
         return jsonify({'erro': 'Venda não encontrada'}), 404
     
-    # Converter para dict
-    venda_dict = venda_para_dict(venda)
-    return jsonify(venda_dict)
+    return jsonify(venda[0])
+
+# Máximo de vendas aceitas em uma chamada de POST /api/vendas/lote
+LIMITE_LOTE_VENDAS = 1000
+
+@app.route('/api/vendas/lote', methods=['POST'])
+def criar_vendas_lote():
+    """
+    Registra várias vendas em uma única transação.
+    Corpo: lista de vendas (mesmos campos de POST /api/vendas) ou {"vendas": [...]}.
+    Todas são validadas antes de gravar; se alguma for inválida nada é gravado (400).
+    O estoque é baixado com um UPDATE por produto; vendas sem estoque (na ordem da lista)
+    ou de produtos inexistentes são rejeitadas individualmente em "resultados".
+    Status: 201 se todas foram registradas, 207 se só parte, 422 se nenhuma.
+    """
+    ensure_db_initialized()
+    try:
+        data = request.get_json()
+        itens = data.get('vendas') if isinstance(data, dict) else data
+        if not isinstance(itens, list) or not itens:
+            return jsonify({'erro': 'Envie uma lista de vendas'}), 400
+        if len(itens) > LIMITE_LOTE_VENDAS:
+            return jsonify({'erro': f'Máximo de {LIMITE_LOTE_VENDAS} vendas por lote'}), 400
+        
+        vendas = []
+        erros = []
+        for indice, item in enumerate(itens):
+            try:
+                vendas.append(ler_dados_venda(item))
+            except ValueError as e:
+                erros.append({'indice': indice, 'erro': str(e)})
+        if erros:
+            return jsonify({'erro': 'Há vendas inválidas no lote', 'erros': erros}), 400
+        
+        # Vendas por produto, na ordem em que chegaram
+        por_produto = {}
+        for indice, venda in enumerate(vendas):
+            por_produto.setdefault(venda[0], []).append(indice)
+        
+        conn = get_db()
+        cursor = get_cursor(conn)
+        placeholder = get_placeholder()
+        
+        # Ler estoque de todos os produtos de uma vez e baixar com um UPDATE por produto.
+        # O UPDATE só passa se o estoque ainda for o suficiente; se outra venda concorrente
+        # consumiu o estoque entre a leitura e o UPDATE, o lote é refeito do início.
+        for tentativa in range(3):
+            ids = list(por_produto)
+            marcadores = ', '.join([placeholder] * len(ids))
+            cursor.execute(f'SELECT id, quantidade, valor_compra, titulo FROM produtos WHERE id IN ({marcadores})', ids)
+            produtos = {row['id']: row for row in cursor.fetchall()}
+            
+            if DATABASE_TYPE == 'postgresql':
+                from datetime import datetime as dt
+                data_atual = dt.now()
+            else:
+                data_atual = datetime.now().isoformat()
+            
+            aceitas = {}
+            concorrencia = False
+            for produto_id, indices in por_produto.items():
+                produto = produtos.get(produto_id)
+                if not produto:
+                    continue
+                baixa = min(int(produto['quantidade'] or 0), len(indices))
+                if baixa <= 0:
+                    continue
+                cursor.execute(f'''
+                    UPDATE produtos
+                    SET quantidade = quantidade - {placeholder}, data_atualizacao = {placeholder}
+                    WHERE id = {placeholder} AND quantidade >= {placeholder}
+                ''', (baixa, data_atual, produto_id, baixa))
+                if cursor.rowcount != 1:
+                    concorrencia = True
+                    break
+                aceitas[produto_id] = indices[:baixa]
+            
+            if not concorrencia:
+                break
+            conn.rollback()
+        else:
+            cursor.close()
+            conn.close()
+            return jsonify({'erro': 'Estoque alterado durante o registro do lote, tente novamente'}), 409
+        
+        resultados = [None] * len(vendas)
+        novas = []
+        for produto_id, indices in por_produto.items():
+            produto = produtos.get(produto_id)
+            aceitos = aceitas.get(produto_id, [])
+            for indice in indices[len(aceitos):]:
+                erro = 'Estoque insuficiente' if produto else 'Produto não encontrado'
+                resultados[indice] = {'indice': indice, 'erro': erro}
+            for indice in aceitos:
+                novas.append(indice)
+        novas.sort()
+        
+        if DATABASE_TYPE == 'postgresql':
+            from datetime import datetime as dt
+            data_criacao = dt.now()
+        else:
+            data_criacao = datetime.now().isoformat()
+        linhas = []
+        for indice in novas:
+            produto_id, valor_venda, data_venda, onde_vendeu, observacoes = vendas[indice]
+            produto = produtos[produto_id]
+            linhas.append((produto_id, produto['titulo'] or '', valor_venda, float(produto['valor_compra'] or 0),
+                           data_venda, onde_vendeu, observacoes, data_criacao, data_criacao))
+        
+        venda_ids = []
+        if linhas:
+            if DATABASE_TYPE == 'postgresql':
+                from psycopg2.extras import execute_values
+                retorno = execute_values(cursor, '''
+                    INSERT INTO vendas (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao, data_atualizacao)
+                    VALUES %s
+                    RETURNING id
+                ''', linhas, page_size=len(linhas), fetch=True)
+                venda_ids = [row['id'] for row in retorno]
+            else:
+                cursor.executemany('''
+                    INSERT INTO vendas (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao, data_atualizacao)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', linhas)
+                # A transação já segura o lock de escrita (UPDATE acima), então os ids são sequenciais
+                cursor.execute('SELECT last_insert_rowid() AS id')
+                ultimo_id = cursor.fetchone()['id']
+                venda_ids = list(range(ultimo_id - len(linhas) + 1, ultimo_id + 1))
+            
+            indexar_vendas_busca(cursor, [(venda_id, linha[1], linha[6]) for venda_id, linha in zip(venda_ids, linhas)])
+            
+            # Resumo mensal: um upsert por (mês, canal, produto)
+            resumo = {}
+            for linha in linhas:
+                chave = (mes_da_data(linha[4]), linha[5], linha[0])
+                total = resumo.setdefault(chave, [0, 0.0, 0.0])
+                total[0] += 1
+                total[1] += linha[2]
+                total[2] += linha[3]
+            for (mes, onde_vendeu, produto_id), (quantidade, receita, custo) in resumo.items():
+                acumular_resumo_venda(cursor, mes, onde_vendeu, produto_id, receita, custo, quantidade=quantidade)
+        
+        if venda_ids:
+            produto_ids = sorted({linha[0] for linha in linhas})
+            tags = ('vendas', 'produtos', *[f'produto:{produto_id}' for produto_id in produto_ids])
+            # Um evento para o lote inteiro, para não esvaziar o buffer de replay
+            evento = ('vendas_criadas', {'ids': venda_ids, 'produto_ids': produto_ids})
+            avisar_outros_processos(cursor, tags, evento)
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        if venda_ids:
+            aplicar_alteracao(tags, evento)
+        
+        for indice, venda_id in zip(novas, venda_ids):
+            resultados[indice] = {'indice': indice, 'id': venda_id}
+        
+        resposta = {
+            'registradas': len(venda_ids),
+            'rejeitadas': len(vendas) - len(venda_ids),
+            'resultados': resultados
+        }
+        if not venda_ids:
+            return jsonify({'erro': 'Nenhuma venda do lote foi registrada', **resposta}), 422
+        # 207: parte registrada, parte rejeitada (ver "resultados")
+        return jsonify(resposta), 201 if len(venda_ids) == len(vendas) else 207
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'erro': str(e)}), 500
 
 @app.route('/api/vendas/<int:venda_id>', methods=['PUT'])
 def atualizar_venda(venda_id):
@@ -890,19 +1973,28 @@ def atualizar_venda(venda_id):
         if DATABASE_TYPE == 'postgresql':
             cursor.execute('''
                 UPDATE vendas 
-                SET valor_venda = %s, data_venda = %s, onde_vendeu = %s, observacoes = %s
+                SET valor_venda = %s, data_venda = %s, onde_vendeu = %s, observacoes = %s, data_atualizacao = %s
                 WHERE id = %s
-            ''', (valor_venda, data_venda, onde_vendeu, observacoes, venda_id))
+            ''', (valor_venda, data_venda, onde_vendeu, observacoes, datetime.now(), venda_id))
         else:
             cursor.execute('''
                 UPDATE vendas 
-                SET valor_venda = ?, data_venda = ?, onde_vendeu = ?, observacoes = ?
+                SET valor_venda = ?, data_venda = ?, onde_vendeu = ?, observacoes = ?, data_atualizacao = ?
                 WHERE id = ?
-            ''', (valor_venda, data_venda, onde_vendeu, observacoes, venda_id))
+            ''', (valor_venda, data_venda, onde_vendeu, observacoes, datetime.now().isoformat(), venda_id))
         
+        indexar_venda_busca(cursor, venda_id, venda_atual.get('produto_titulo'), observacoes)
+        # Mover a venda no resumo mensal (pode ter mudado de mês, canal ou valor)
+        acumular_resumo_venda(cursor, venda_atual['data_venda'], venda_atual['onde_vendeu'], produto_id_antigo,
+                              venda_atual['valor_venda'], valor_compra, sinal=-1)
+        acumular_resumo_venda(cursor, data_venda, onde_vendeu, produto_id_antigo, valor_venda, valor_compra)
+        tags = ('vendas', f'venda:{venda_id}')
+        evento = ('venda_atualizada', {'id': venda_id, 'produto_id': produto_id_antigo})
+        avisar_outros_processos(cursor, tags, evento)
         conn.commit()
         cursor.close()
         conn.close()
+        aplicar_alteracao(tags, evento)
         
         return jsonify({'id': venda_id, 'mensagem': 'Venda atualizada com sucesso'}), 200
         
@@ -920,52 +2012,49 @@ def deletar_venda(venda_id):
         cursor = get_cursor(conn)
         placeholder = get_placeholder()
         
-        # Buscar venda
-        cursor.execute(f'SELECT * FROM vendas WHERE id = {placeholder}', (venda_id,))
-        venda = cursor.fetchone()
+        # Deletar e ler a venda no mesmo comando: se duas requisições apagarem a mesma
+        # venda ao mesmo tempo, só a que removeu a linha restaura o estoque
+        if SUPORTA_RETURNING:
+            cursor.execute(f'DELETE FROM vendas WHERE id = {placeholder} RETURNING *', (venda_id,))
+            venda = cursor.fetchone()
+        else:
+            # SQLite < 3.35: ler e apagar na mesma transação; rowcount diz se foi este DELETE
+            # que removeu a linha
+            cursor.execute(f'SELECT * FROM vendas WHERE id = {placeholder}', (venda_id,))
+            venda = cursor.fetchone()
+            cursor.execute(f'DELETE FROM vendas WHERE id = {placeholder}', (venda_id,))
+            if cursor.rowcount != 1:
+                venda = None
         
         if not venda:
+            conn.rollback()
             cursor.close()
             conn.close()
             return jsonify({'erro': 'Venda não encontrada'}), 404
         
-        # Obter produto_id da venda
-        if DATABASE_TYPE == 'postgresql':
-            produto_id = venda.get('produto_id')
-        else:
-            produto_id = venda.get('produto_id')
+        produto_id = venda.get('produto_id')
+        data_atual = agora_banco()
         
-        # Se a venda tinha um produto associado (não foi deletado), restaurar estoque
+        # Se a venda tinha um produto associado, restaurar 1 unidade (se o produto foi deletado, nada muda)
         if produto_id:
-            cursor.execute(f'SELECT * FROM produtos WHERE id = {placeholder}', (produto_id,))
-            produto = cursor.fetchone()
-            
-            if produto:
-                # Restaurar 1 unidade no estoque
-                if DATABASE_TYPE == 'postgresql':
-                    quantidade_atual = int(produto.get('quantidade', 0) or 0)
-                    from datetime import datetime as dt
-                    data_atual = dt.now()
-                    cursor.execute('''
-                        UPDATE produtos 
-                        SET quantidade = %s, data_atualizacao = %s
-                        WHERE id = %s
-                    ''', (quantidade_atual + 1, data_atual, produto_id))
-                else:
-                    quantidade_atual = int(produto.get('quantidade', 0) or 0)
-                    data_atual = datetime.now().isoformat()
-                    cursor.execute('''
-                        UPDATE produtos 
-                        SET quantidade = ?, data_atualizacao = ?
-                        WHERE id = ?
-                    ''', (quantidade_atual + 1, data_atual, produto_id))
+            cursor.execute(f'''
+                UPDATE produtos
+                SET quantidade = quantidade + 1, data_atualizacao = {placeholder}
+                WHERE id = {placeholder}
+            ''', (data_atual, produto_id))
         
-        # Deletar venda
-        cursor.execute(f'DELETE FROM vendas WHERE id = {placeholder}', (venda_id,))
+        remover_venda_busca(cursor, venda_id)
+        registrar_exclusao(cursor, 'vendas', venda_id, data_atual)
+        acumular_resumo_venda(cursor, venda['data_venda'], venda['onde_vendeu'], produto_id,
+                              venda['valor_venda'], venda['valor_compra'], sinal=-1)
+        tags = ('vendas', f'venda:{venda_id}', 'produtos', f'produto:{produto_id}')
+        evento = ('venda_excluida', {'id': venda_id, 'produto_id': produto_id})
+        avisar_outros_processos(cursor, tags, evento)
         
         conn.commit()
         cursor.close()
         conn.close()
+        aplicar_alteracao(tags, evento)
         
         return jsonify({'mensagem': 'Venda deletada com sucesso'}), 200
         
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Fingerprint dos arquivos de static/ pelo conteúdo
+
+Cada arquivo ganha uma URL com o hash do conteúdo no nome (css/style.css ->
+css/style.3f2a9c1b5d7e.css), servida com cache de um ano (immutable). Um deploy que muda
+o arquivo muda a URL, então o navegador busca a versão nova na hora sem revalidar as outras.
+
+O manifesto é montado na inicialização (poucos arquivos, alguns milissegundos) e cada entrada
+é refeita se o mtime do arquivo mudar, então editar um arquivo em desenvolvimento já troca a URL.
+Na mesma hora os arquivos de texto (CSS, JS, SVG) são comprimidos no nível máximo de cada
+encoding disponível (compressao.py) e as variantes ficam em memória.
+Para gerar static/manifest.json (conferência, upload para CDN):
+
+    python3 assets.py
+"""
+import os
+import re
+import sys
+import json
+import hashlib
+import threading
+import mimetypes
+
+from werkzeug.security import safe_join
+from compressao import ENCODINGS_DISPONIVEIS, MINIMO_BYTES, comprimir, tipo_compressivel
+
+TAMANHO_HASH = 12
+ARQUIVO_MANIFESTO = 'manifest.json'
+# uploads: imagens enviadas pelos usuários; sw.js: o service worker precisa de URL fixa
+IGNORAR = ('uploads/', 'sw.js', ARQUIVO_MANIFESTO)
+
+_PADRAO_COM_HASH = re.compile(r'^(?P<base>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % TAMANHO_HASH)
+
+
+def _hash_arquivo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(65536), b''):
+            sha.update(bloco)
+    return sha.hexdigest()[:TAMANHO_HASH]
+
+
+def _variantes_comprimidas(caminho):
+    """{encoding: bytes} do arquivo, só para tipos compressíveis e encodings que reduzem o tamanho"""
+    if not tipo_compressivel(mimetypes.guess_type(caminho)[0]):
+        return {}
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    if len(dados) < MINIMO_BYTES:
+        return {}
+    variantes = {}
+    for encoding in ENCODINGS_DISPONIVEIS:
+        comprimido = comprimir(dados, encoding, maximo=True)
+        if len(comprimido) < len(dados):
+            variantes[encoding] = comprimido
+    return variantes
+
+
+def nome_com_hash(caminho, hash_conteudo):
+    """'css/style.css' -> 'css/style.<hash>.css'"""
+    base, ext = os.path.splitext(caminho)
+    return f'{base}.{hash_conteudo}{ext}'
+
+
+class ManifestoAssets:
+    """Mapa caminho -> hash do conteúdo dos arquivos de uma pasta static"""
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self._entradas = {}  # caminho relativo -> (mtime, hash, {encoding: bytes comprimidos})
+        self._lock = threading.Lock()
+        self.montar()
+
+    def montar(self):
+        """Calcula o hash de todos os arquivos da pasta"""
+        for raiz, _, arquivos in os.walk(self.pasta):
+            for arquivo in arquivos:
+                relativo = os.path.relpath(os.path.join(raiz, arquivo), self.pasta).replace(os.sep, '/')
+                if not relativo.startswith(IGNORAR):
+                    self.hash_de(relativo)
+
+    def _entrada(self, caminho):
+        """(mtime, hash, variantes) atual do arquivo (None se não existe ou é ignorado)"""
+        if caminho.startswith(IGNORAR):
+            return None
+        # Caminho vem da URL: nada fora da pasta (../)
+        completo = safe_join(self.pasta, caminho)
+        if completo is None:
+            return None
+        try:
+            mtime = os.stat(completo).st_mtime_ns
+        except OSError:
+            return None
+        entrada = self._entradas.get(caminho)
+        if entrada is None or entrada[0] != mtime:
+            entrada = (mtime, _hash_arquivo(completo), _variantes_comprimidas(completo))
+            with self._lock:
+                self._entradas[caminho] = entrada
+        return entrada
+
+    def hash_de(self, caminho):
+        """Hash atual do arquivo (None se não existe ou é ignorado)"""
+        entrada = self._entrada(caminho)
+        return entrada[1] if entrada else None
+
+    def variante_comprimida(self, caminho, encoding):
+        """Bytes pré-comprimidos do arquivo no encoding (None se não há essa variante)"""
+        entrada = self._entrada(caminho)
+        return entrada[2].get(encoding) if entrada and encoding else None
+
+    def tem_variantes(self, caminho):
+        """True se o arquivo é servido comprimido (a resposta varia com o Accept-Encoding)"""
+        entrada = self._entrada(caminho)
+        return bool(entrada and entrada[2])
+
+    def caminho_com_hash(self, caminho):
+        """Caminho relativo com o hash no nome (o próprio caminho se não houver hash)"""
+        hash_conteudo = self.hash_de(caminho)
+        return nome_com_hash(caminho, hash_conteudo) if hash_conteudo else caminho
+
+    def resolver(self, caminho):
+        """
+        Para um caminho com hash, retorna (caminho original, hash confere).
+        Retorna None se o nome não tem hash.
+        """
+        diretorio, nome = os.path.split(caminho)
+        correspondencia = _PADRAO_COM_HASH.match(nome)
+        if not correspondencia:
+            return None
+        original = os.path.join(diretorio, correspondencia['base'] + correspondencia['ext']).replace(os.sep, '/')
+        return original, self.hash_de(original) == correspondencia['hash']
+
+    def como_dict(self):
+        with self._lock:
+            return {caminho: nome_com_hash(caminho, entrada[1]) for caminho, entrada in sorted(self._entradas.items())}
+
+
+def main():
+    pasta = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    manifesto = ManifestoAssets(pasta).como_dict()
+    destino = os.path.join(pasta, ARQUIVO_MANIFESTO)
+    with open(destino, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    print(f"✅ {len(manifesto)} arquivo(s) em {destino}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark do formato colunar das listagens (?formato=colunar / Accept: application/x-msgpack)
+Para páginas de produtos e vendas de vários tamanhos, compara com o formato atual (array de
+objetos) o tempo de montar + serializar a resposta a partir das tuplas do cursor, o tamanho
+do payload (cru e em gzip) e o tempo de decodificar no cliente (json.loads / msgpack.unpackb,
+uma aproximação do JSON.parse do celular). Confere também que o formato colunar, remontado em
+objetos, é igual ao array de objetos.
+
+Não precisa de banco: as linhas são as mesmas de benchmark_mapeadores.py.
+
+Uso:
+    python3 benchmark_colunar.py [--tamanhos 50,500,10000] [--banco sqlite|postgresql]
+"""
+
+import gzip
+import json
+import time
+import argparse
+
+from flask import Flask
+
+import models
+from provedor_json import ProvedorJSON, ORJSON_DISPONIVEL
+from benchmark_mapeadores import COLUNAS_PRODUTOS, COLUNAS_VENDAS, linhas_produtos, linhas_vendas
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _cronometrar(funcao, repeticoes):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempo = time.perf_counter() - inicio
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor, resultado
+
+
+def _como_banco(tipo, funcao):
+    """Executa funcao() como se o banco configurado fosse `tipo`"""
+    tipo_original = models.DATABASE_TYPE
+    models.DATABASE_TYPE = tipo
+    try:
+        return funcao()
+    finally:
+        models.DATABASE_TYPE = tipo_original
+
+
+def _itens_de_colunas(corpo):
+    """Mesma remontagem do itensDeColunas() de static/js/app.js"""
+    colunas = corpo['colunas']
+    return [{campo: valores[i] for campo, valores in colunas.items()} for i in range(corpo['total'])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do formato colunar das listagens')
+    parser.add_argument('--tamanhos', default='50,500,10000')
+    parser.add_argument('--banco', default='sqlite', choices=('sqlite', 'postgresql'))
+    args = parser.parse_args()
+
+    provedor = ProvedorJSON(Flask(__name__))
+    serializar = lambda obj: provedor.dumps(obj, separators=(',', ':')).encode('utf-8')
+    if not ORJSON_DISPONIVEL:
+        print("ℹ️  orjson não instalado: serializando com o json padrão")
+    if msgpack is None:
+        print("ℹ️  msgpack não instalado: medindo só o JSON colunar (pip install msgpack)")
+    print()
+
+    formatos = [
+        ('objetos', lambda description, linhas, criar_mapeador, colunas_de:
+            serializar(models.mapear_linhas(_Cursor(description), criar_mapeador, linhas)), json.loads),
+        ('colunar', lambda description, linhas, criar_mapeador, colunas_de:
+            serializar({'total': len(linhas), 'colunas': colunas_de(description, linhas)}), json.loads),
+    ]
+    if msgpack is not None:
+        formatos.append(('msgpack', lambda description, linhas, criar_mapeador, colunas_de:
+            msgpack.packb({'total': len(linhas), 'colunas': colunas_de(description, linhas)}, use_bin_type=True),
+            msgpack.unpackb))
+
+    print(f"{'tabela':<9} {'itens':>6} {'formato':<8} {'codificar':>11} {'bytes':>10} {'gzip':>9} {'decodificar':>12}")
+    iguais = True
+    for tamanho in [int(t) for t in args.tamanhos.split(',') if t.strip()]:
+        repeticoes = 50 if tamanho <= 1000 else 5
+        for tabela, gerar, colunas, criar_mapeador, colunas_de in (
+            ('produtos', linhas_produtos, COLUNAS_PRODUTOS, models.mapeador_produtos, models.colunas_produtos),
+            ('vendas', linhas_vendas, COLUNAS_VENDAS, models.mapeador_vendas, models.colunas_vendas),
+        ):
+            linhas = gerar(args.banco, tamanho)
+            description = [(coluna,) for coluna in colunas]
+            referencia = None
+            for nome, codificar, decodificar in formatos:
+                tempo, corpo = _cronometrar(lambda: _como_banco(
+                    args.banco, lambda: codificar(description, linhas, criar_mapeador, colunas_de)), repeticoes)
+                tempo_decodificar, decodificado = _cronometrar(lambda: decodificar(corpo), repeticoes)
+                itens = decodificado if nome == 'objetos' else _itens_de_colunas(decodificado)
+                if referencia is None:
+                    referencia = itens
+                elif itens != referencia:
+                    print(f"❌ {tabela} {tamanho} {nome}: itens diferentes do array de objetos")
+                    iguais = False
+                print(f"{tabela:<9} {tamanho:>6} {nome:<8} {tempo * 1000:>9.2f}ms {len(corpo) / 1024:>8.1f}KB "
+                      f"{len(gzip.compress(corpo, 6)) / 1024:>7.1f}KB {tempo_decodificar * 1000:>10.2f}ms")
+
+    if not iguais:
+        raise SystemExit(1)
+
+
+class _Cursor:
+    """Só o description, que é o que mapear_linhas usa do cursor"""
+
+    def __init__(self, description):
+        self.description = description
+
+
+if __name__ == '__main__':
+    main()
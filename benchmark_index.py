@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark do tempo até o primeiro byte (TTFB) da página principal
+
+Sobe a aplicação num servidor HTTP local e mede, por visita:
+- primeira visita: GET / seguindo redirecionamentos, até o primeiro byte da página final
+- revalidação: GET / com o If-None-Match devolvido na visita anterior (quando há ETag)
+
+O servidor é local, então cada ida e volta custa quase nada. Em rede móvel, cada
+redirecionamento soma um RTT inteiro; --rtt-ms mostra o TTFB estimado com esse RTT.
+
+Uso:
+    python3 benchmark_index.py [--visitas 200] [--rtt-ms 150]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+import http.client
+from urllib.parse import urljoin, urlsplit
+
+# Banco temporário: a página não usa o banco, mas o import de app não deve tocar o database.db local
+if not (os.getenv('DATABASE_URL') or os.getenv('DATABASE_TYPE', '').lower() == 'postgresql' or os.getenv('DB_HOST')):
+    os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.gettempdir(), 'benchmark_index.db'))
+
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+
+class _HandlerSilencioso(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def visitar(porta, caminho='/', if_none_match=None, limite_redirecionamentos=5):
+    """
+    Faz GET seguindo redirecionamentos (uma conexão nova por requisição, como numa primeira visita).
+    Retorna (ttfb_segundos, total_segundos, redirecionamentos, status, bytes, etag).
+    """
+    inicio = time.perf_counter()
+    redirecionamentos = 0
+    while True:
+        conn = http.client.HTTPConnection('127.0.0.1', porta)
+        cabecalhos = {'Accept': 'text/html'}
+        if if_none_match:
+            cabecalhos['If-None-Match'] = if_none_match
+        conn.request('GET', caminho, headers=cabecalhos)
+        resposta = conn.getresponse()  # Retorna ao receber a linha de status e os cabeçalhos
+        ttfb = time.perf_counter() - inicio
+        corpo = resposta.read()
+        conn.close()
+        if resposta.status in (301, 302, 303, 307, 308) and redirecionamentos < limite_redirecionamentos:
+            redirecionamentos += 1
+            destino = urlsplit(urljoin(f'http://127.0.0.1:{porta}{caminho}', resposta.getheader('Location')))
+            caminho = destino.path + (f'?{destino.query}' if destino.query else '')
+            continue
+        return (ttfb, time.perf_counter() - inicio, redirecionamentos, resposta.status,
+                len(corpo), resposta.getheader('ETag'))
+
+
+def _resumo(valores):
+    valores = sorted(valores)
+    p95 = valores[min(len(valores) - 1, int(len(valores) * 0.95))]
+    return statistics.median(valores) * 1000, p95 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do TTFB da página principal')
+    parser.add_argument('--visitas', type=int, default=200)
+    parser.add_argument('--rtt-ms', type=float, default=150, help='RTT de rede móvel para a estimativa')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import app
+    servidor = make_server('127.0.0.1', 0, app, threaded=True, request_handler=_HandlerSilencioso)
+    porta = servidor.server_port
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    try:
+        visitar(porta)  # Aquecimento (templates, manifesto)
+        primeiras = [visitar(porta) for _ in range(args.visitas)]
+        etag = primeiras[-1][5]
+        revalidacoes = [visitar(porta, if_none_match=etag) for _ in range(args.visitas)] if etag else []
+    finally:
+        servidor.shutdown()
+
+    ttfb_mediana, ttfb_p95 = _resumo([v[0] for v in primeiras])
+    redirecionamentos = primeiras[-1][2]
+    viagens = redirecionamentos + 1
+    print(f"Primeira visita: {viagens} requisição(ões) ({redirecionamentos} redirecionamento(s)), "
+          f"status final {primeiras[-1][3]}, {primeiras[-1][4]} bytes")
+    print(f"  TTFB local: mediana {ttfb_mediana:.2f}ms, p95 {ttfb_p95:.2f}ms")
+    print(f"  TTFB estimado com RTT de {args.rtt_ms:.0f}ms: {ttfb_mediana + viagens * args.rtt_ms:.0f}ms")
+
+    if revalidacoes:
+        status = {v[3] for v in revalidacoes}
+        mediana, p95 = _resumo([v[0] for v in revalidacoes])
+        print(f"Revalidação (If-None-Match): status {sorted(status)}, {revalidacoes[-1][4]} bytes")
+        print(f"  TTFB local: mediana {mediana:.2f}ms, p95 {p95:.2f}ms")
+        if status != {304}:
+            print("  ℹ️  O ETag muda a cada requisição: a revalidação sempre baixa a página de novo")
+    else:
+        print("Revalidação: sem ETag na resposta")
+
+
+if __name__ == '__main__':
+    main()
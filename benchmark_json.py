@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark da serialização JSON das respostas (app.json)
+Mede o tempo de serializar listas de vendas e produtos de vários tamanhos com:
+- o provedor padrão do Flask (json da biblioteca padrão, usado antes)
+- ProvedorJSON sem orjson (fallback)
+- ProvedorJSON com orjson (se instalado)
+e confere que o fallback e o orjson geram exatamente os mesmos bytes, e que o resultado
+decodificado é igual ao do provedor padrão.
+
+Uso:
+    python3 benchmark_json.py [--tamanhos 100,1000,10000,100000]
+"""
+
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from provedor_json import ProvedorJSON, ORJSON_DISPONIVEL
+
+
+def gerar_vendas(total):
+    agora = datetime(2024, 5, 10, 14, 30, 15, 123456)
+    return [{
+        'id': i + 1,
+        'produto_id': (i % 50) + 1 if i % 17 else None,
+        'produto_titulo': f'Caneca Cerâmica {i}',
+        'valor_venda': 59.9,
+        'valor_compra': 21.35,
+        'lucro': 59.9 - 21.35,
+        'porcentagem_lucro': 180.56,
+        'data_venda': (agora - timedelta(days=i % 365)).strftime('%Y-%m-%d'),
+        'onde_vendeu': 'shopee' if i % 2 else 'mercado_livre',
+        'observacoes': 'Embalar para presente' if i % 5 else '',
+        'data_criacao': (agora - timedelta(minutes=i)).isoformat(),
+    } for i in range(total)]
+
+
+def gerar_produtos(total):
+    agora = datetime(2024, 5, 10, 14, 30, 15, 123456)
+    return [{
+        'id': i + 1,
+        'titulo': f'Produto {i}',
+        'descricao': 'Descrição com acentuação',
+        'quantidade': i % 10,
+        'valor_compra': 12.5,
+        'imagem': f'https://exemplo.supabase.co/storage/v1/object/public/produtos/{i}.jpg',
+        'especificacoes': '{"cor": "azul", "tamanho": "M"}',
+        'data_criacao': (agora - timedelta(minutes=i)).isoformat(),
+        'data_atualizacao': (agora - timedelta(minutes=i)).isoformat(),
+    } for i in range(total)]
+
+
+def _cronometrar(funcao, repeticoes):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempo = time.perf_counter() - inicio
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da serialização JSON')
+    parser.add_argument('--tamanhos', default='100,1000,10000,100000')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    padrao = DefaultJSONProvider(app)
+    fallback = ProvedorJSON(app)
+    fallback.usar_orjson = False
+    provedores = [('padrão', padrao), ('fallback', fallback)]
+    if ORJSON_DISPONIVEL:
+        provedores.append(('orjson', ProvedorJSON(app)))
+    else:
+        print("ℹ️  orjson não instalado: medindo só o json padrão\n")
+
+    print(f"{'payload':<9} {'itens':>7} " + ' '.join(f'{nome:>10}' for nome, _ in provedores) + f" {'tamanho':>9}")
+    ok = True
+    for tamanho in [int(t) for t in args.tamanhos.split(',') if t.strip()]:
+        repeticoes = 20 if tamanho <= 10000 else 3
+        for nome_payload, gerar in (('vendas', gerar_vendas), ('produtos', gerar_produtos)):
+            dados = gerar(tamanho)
+            tempos = []
+            saidas = {}
+            for nome, provedor in provedores:
+                # Mesmos argumentos que o jsonify usa fora do modo debug
+                tempo, saida = _cronometrar(lambda: provedor.dumps(dados, separators=(',', ':')), repeticoes)
+                tempos.append(tempo)
+                saidas[nome] = saida
+            if ORJSON_DISPONIVEL and saidas['orjson'] != saidas['fallback']:
+                print(f"❌ {nome_payload} {tamanho}: orjson e fallback geraram bytes diferentes")
+                ok = False
+            if json.loads(saidas['fallback']) != json.loads(saidas['padrão']):
+                print(f"❌ {nome_payload} {tamanho}: conteúdo diferente do provedor padrão")
+                ok = False
+            print(f"{nome_payload:<9} {tamanho:>7} " + ' '.join(f'{t * 1000:>8.2f}ms' for t in tempos) +
+                  f" {len(saidas['fallback'].encode('utf-8')) / 1024:>7.0f}KB")
+
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark dos mapeadores de linhas (models.mapeador_produtos / mapeador_vendas)
+Compara o custo por linha com a conversão anterior (cursor de dicts + produto_para_dict /
+venda_para_dict), nos formatos de linha do SQLite e do PostgreSQL, e confere que as duas
+produzem exatamente o mesmo JSON (inclusive em linhas com NULL, datas com hora e
+produto deletado).
+
+Não precisa de banco: as linhas são geradas em memória.
+
+Uso:
+    python3 benchmark_mapeadores.py [--linhas 100000]
+"""
+
+import json
+import time
+import argparse
+from decimal import Decimal
+from datetime import datetime, date, timedelta
+
+import models
+
+COLUNAS_PRODUTOS = ('id', 'titulo', 'descricao', 'quantidade', 'valor_compra', 'imagem',
+                    'especificacoes', 'data_criacao', 'data_atualizacao')
+COLUNAS_VENDAS = ('id', 'produto_id', 'valor_venda', 'data_venda', 'onde_vendeu', 'observacoes',
+                  'data_criacao', 'valor_compra', 'produto_titulo', 'produto_titulo_final')
+
+
+# ---- Conversão anterior (cópia de models.py antes dos mapeadores) ----
+
+def produto_para_dict_antigo(produto, tipo):
+    """Implementação anterior de models.produto_para_dict"""
+    if tipo == 'postgresql':
+        # PostgreSQL retorna dict-like object
+        quantidade = int(produto.get('quantidade', 0) or 0)
+        return {
+            'id': produto['id'],
+            'titulo': produto['titulo'],
+            'descricao': produto['descricao'],
+            'quantidade': quantidade,
+            'valor_compra': float(produto.get('valor_compra', 0) or 0),
+            'imagem': produto['imagem'],
+            'especificacoes': produto['especificacoes'],
+            'data_criacao': produto['data_criacao'].isoformat() if produto['data_criacao'] else '',
+            'data_atualizacao': produto['data_atualizacao'].isoformat() if produto['data_atualizacao'] else ''
+        }
+    else:
+        # SQLite
+        try:
+            quantidade = int(produto['quantidade'] if produto['quantidade'] is not None else 0)
+        except (KeyError, ValueError, TypeError):
+            quantidade = 0
+        
+        # Obter valor_compra de forma segura (SQLite Row não tem .get())
+        try:
+            valor_compra = float(produto['valor_compra'] if produto['valor_compra'] is not None else 0)
+        except (KeyError, ValueError, TypeError):
+            valor_compra = 0.0
+        
+        return {
+            'id': produto['id'],
+            'titulo': produto['titulo'],
+            'descricao': produto['descricao'],
+            'quantidade': quantidade,
+            'valor_compra': valor_compra,
+            'imagem': produto['imagem'],
+            'especificacoes': produto['especificacoes'],
+            'data_criacao': produto['data_criacao'],
+            'data_atualizacao': produto['data_atualizacao']
+        }
+
+def venda_para_dict_antigo(venda, tipo, produto_titulo=None):
+    """Implementação anterior de models.venda_para_dict"""
+    if tipo == 'postgresql':
+        valor_venda = float(venda.get('valor_venda', 0) or 0)
+        valor_compra = float(venda.get('valor_compra', 0) or 0)
+        lucro = valor_venda - valor_compra
+        porcentagem_lucro = (lucro / valor_compra * 100) if valor_compra > 0 else 0
+        
+        # Usar produto_titulo da tabela vendas se disponível, senão usar o passado como parâmetro
+        titulo_final = venda.get('produto_titulo') or produto_titulo or 'Produto Deletado'
+        
+        return {
+            'id': venda['id'],
+            'produto_id': venda.get('produto_id'),  # Pode ser NULL se produto foi deletado
+            'produto_titulo': titulo_final,
+            'valor_venda': valor_venda,
+            'valor_compra': valor_compra,
+            'lucro': lucro,
+            'porcentagem_lucro': round(porcentagem_lucro, 2),
+            'data_venda': venda['data_venda'].strftime('%Y-%m-%d') if hasattr(venda['data_venda'], 'strftime') else str(venda['data_venda']).split('T')[0].split(' ')[0],
+            'onde_vendeu': venda['onde_vendeu'],
+            'observacoes': venda.get('observacoes', ''),
+            'data_criacao': venda['data_criacao'].isoformat() if hasattr(venda['data_criacao'], 'isoformat') else str(venda['data_criacao'])
+        }
+    else:
+        # SQLite
+        try:
+            valor_venda = float(venda['valor_venda'] if venda['valor_venda'] is not None else 0)
+        except (KeyError, ValueError, TypeError):
+            valor_venda = 0.0
+        
+        try:
+            valor_compra = float(venda['valor_compra'] if venda['valor_compra'] is not None else 0)
+        except (KeyError, ValueError, TypeError):
+            valor_compra = 0.0
+        
+        lucro = valor_venda - valor_compra
+        porcentagem_lucro = (lucro / valor_compra * 100) if valor_compra > 0 else 0
+        
+        # Usar produto_titulo da tabela vendas se disponível, senão usar o passado como parâmetro
+        titulo_final = venda.get('produto_titulo') or produto_titulo or 'Produto Deletado'
+        
+        return {
+            'id': venda['id'],
+            'produto_id': venda.get('produto_id'),  # Pode ser NULL se produto foi deletado
+            'produto_titulo': titulo_final,
+            'valor_venda': valor_venda,
+            'valor_compra': valor_compra,
+            'lucro': lucro,
+            'porcentagem_lucro': round(porcentagem_lucro, 2),
+            'data_venda': venda['data_venda'].split('T')[0].split(' ')[0] if isinstance(venda['data_venda'], str) else str(venda['data_venda']).split('T')[0].split(' ')[0],
+            'onde_vendeu': venda['onde_vendeu'],
+            'observacoes': venda.get('observacoes', '') or '',
+            'data_criacao': venda['data_criacao']
+        }
+
+
+# ---- Linhas de teste ----
+
+def linhas_produtos(tipo, total):
+    agora = datetime(2024, 5, 10, 14, 30, 15, 123456)
+    linhas = []
+    for i in range(total):
+        data = agora - timedelta(minutes=i)
+        linhas.append((
+            i + 1, f'Produto {i}', 'Descrição', i % 10 if i % 97 else None,
+            (Decimal('12.50') if tipo == 'postgresql' else 12.5) if i % 89 else None,
+            f'imagem_{i}.jpg', '{"cor": "azul"}',
+            data if tipo == 'postgresql' else data.isoformat(),
+            (data if tipo == 'postgresql' else data.isoformat()) if i % 83 else None,
+        ))
+    return linhas
+
+
+def linhas_vendas(tipo, total):
+    agora = datetime(2024, 5, 10, 14, 30, 15, 123456)
+    linhas = []
+    for i in range(total):
+        criacao = agora - timedelta(minutes=i)
+        dia = (agora - timedelta(days=i % 365)).date()
+        if tipo == 'postgresql':
+            data_venda = dia
+            valores = (Decimal('59.90'), Decimal('21.35') if i % 71 else Decimal('0'))
+        else:
+            # Algumas vendas antigas foram gravadas com hora junto da data
+            data_venda = dia.isoformat() + ('T10:00:00' if i % 7 == 0 else '')
+            valores = (59.9, 21.35 if i % 71 else 0.0)
+        titulo = f'Produto {i}' if i % 13 else None
+        linhas.append((
+            i + 1, (i % 50) + 1 if i % 17 else None, valores[0], data_venda,
+            'shopee' if i % 2 else 'mercado_livre', 'Observação' if i % 5 else None,
+            criacao if tipo == 'postgresql' else criacao.isoformat(), valores[1],
+            titulo, titulo or ('Produto Deletado' if i % 3 else f'Atual {i}'),
+        ))
+    return linhas
+
+
+# ---- Medição ----
+
+def _mapeador(criar_mapeador, colunas, tipo):
+    """Monta o mapeador como se o banco configurado fosse `tipo`"""
+    tipo_original = models.DATABASE_TYPE
+    models.DATABASE_TYPE = tipo
+    try:
+        return criar_mapeador([(coluna,) for coluna in colunas])
+    finally:
+        models.DATABASE_TYPE = tipo_original
+
+
+def converter_antigo_produtos(linhas, tipo):
+    # O cursor de dicts montava um dict por linha antes da conversão
+    return [produto_para_dict_antigo(dict(zip(COLUNAS_PRODUTOS, linha)), tipo) for linha in linhas]
+
+
+def converter_antigo_vendas(linhas, tipo):
+    resultado = []
+    for linha in linhas:
+        venda = dict(zip(COLUNAS_VENDAS, linha))
+        produto_titulo = venda.get('produto_titulo_final', venda.get('produto_titulo', 'Produto Deletado'))
+        resultado.append(venda_para_dict_antigo(venda, tipo, produto_titulo))
+    return resultado
+
+
+def _cronometrar(funcao, repeticoes=3):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempo = time.perf_counter() - inicio
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark dos mapeadores de linhas')
+    parser.add_argument('--linhas', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'tabela':<9} {'banco':<11} {'anterior':>12} {'mapeador':>12} {'ganho':>7}  saída")
+    iguais = True
+    for tabela, gerar, criar_mapeador, colunas, antigo in (
+        ('produtos', linhas_produtos, models.mapeador_produtos, COLUNAS_PRODUTOS, converter_antigo_produtos),
+        ('vendas', linhas_vendas, models.mapeador_vendas, COLUNAS_VENDAS, converter_antigo_vendas),
+    ):
+        for tipo in ('sqlite', 'postgresql'):
+            linhas = gerar(tipo, args.linhas)
+            tempo_antigo, saida_antiga = _cronometrar(lambda: antigo(linhas, tipo))
+
+            def novo():
+                mapear = _mapeador(criar_mapeador, colunas, tipo)
+                return [mapear(linha) for linha in linhas]
+            tempo_novo, saida_nova = _cronometrar(novo)
+
+            # Mesma serialização do jsonify (chaves ordenadas)
+            igual = json.dumps(saida_antiga, sort_keys=True) == json.dumps(saida_nova, sort_keys=True)
+            iguais = iguais and igual
+            por_linha = lambda t: t / args.linhas * 1e6
+            print(f"{tabela:<9} {tipo:<11} {por_linha(tempo_antigo):>8.2f} µs {por_linha(tempo_novo):>8.2f} µs "
+                  f"{tempo_antigo / tempo_novo:>6.1f}x  {'idêntica' if igual else 'DIFERENTE'}")
+
+    if not iguais:
+        print("\n❌ Os mapeadores geram JSON diferente da conversão anterior")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória das listagens GET /api/produtos e GET /api/vendas
+Compara a resposta completa (lista de linhas -> lista de dicts -> string JSON) com ?stream=1
+(array JSON gerado em blocos de fetchmany) em bancos SQLite temporários de vários tamanhos.
+
+Cada medição roda em um processo separado e reporta o pico de memória residente (RSS)
+acima do que o processo usava antes da requisição, que é o que derruba a função serverless.
+
+Uso:
+    python3 benchmark_memoria_listas.py                      # 10k, 100k e 1M linhas
+    python3 benchmark_memoria_listas.py --tamanhos 10000,50000
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+
+ROTAS = ('/api/produtos', '/api/vendas')
+MODOS = ('completo', 'stream')
+
+
+def _rss_atual_mb():
+    """RSS atual do processo em MB (Linux: /proc; outros: pico até agora)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        return _rss_pico_mb()
+
+
+def _rss_pico_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024
+
+
+def popular(caminho, total):
+    """Cria o banco (migrações) e insere `total` produtos e `total` vendas"""
+    os.environ['DATABASE_PATH'] = caminho
+    from datetime import datetime, timedelta
+    from models import init_db, get_db
+    init_db()
+    conn = get_db()
+    cursor = conn.cursor()
+    agora = datetime.now()
+    lote = 50000
+    for inicio in range(0, total, lote):
+        fim = min(inicio + lote, total)
+        cursor.executemany('''
+            INSERT INTO produtos (titulo, descricao, quantidade, valor_compra, imagem, especificacoes, data_criacao, data_atualizacao)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(f'Produto {i}', 'Descrição do produto de teste', i % 10, 10.0, '',
+               '{"cor": "azul", "tamanho": "M"}', (agora - timedelta(seconds=i)).isoformat(),
+               (agora - timedelta(seconds=i)).isoformat()) for i in range(inicio, fim)])
+        cursor.executemany('''
+            INSERT INTO vendas (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(i % total + 1, f'Produto {i}', 20.0, 10.0, (agora - timedelta(days=i % 365)).strftime('%Y-%m-%d'),
+               'shopee' if i % 2 else 'mercado_livre', 'Observação', (agora - timedelta(seconds=i)).isoformat())
+              for i in range(inicio, fim)])
+        conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def medir(caminho, rota, modo):
+    """Executado no processo filho: faz uma requisição e imprime 'pico_mb segundos bytes'"""
+    os.environ['DATABASE_PATH'] = caminho
+    import app as aplicacao
+    cliente = aplicacao.app.test_client()
+    aplicacao.ensure_db_initialized()
+    base = _rss_atual_mb()
+    inicio = time.perf_counter()
+    url = rota + ('?stream=1' if modo == 'stream' else '')
+    resposta = cliente.get(url, buffered=False)
+    # Consumir como um servidor WSGI faria: enviar cada bloco e descartar
+    total_bytes = 0
+    for bloco in resposta.response:
+        total_bytes += len(bloco)
+    resposta.close()
+    segundos = time.perf_counter() - inicio
+    print(f'{_rss_pico_mb() - base:.1f} {segundos:.2f} {total_bytes}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de memória das listagens')
+    parser.add_argument('--tamanhos', default='10000,100000,1000000',
+                        help='quantidades de linhas separadas por vírgula')
+    parser.add_argument('--interno', nargs=3, metavar=('BANCO', 'ROTA', 'MODO'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        medir(*args.interno)
+        return
+
+    tamanhos = [int(t) for t in args.tamanhos.split(',') if t.strip()]
+    print(f"{'rota':<15} {'linhas':>9} {'modo':<9} {'pico RSS':>10} {'tempo':>8} {'resposta':>10}")
+    for total in tamanhos:
+        arquivo = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        arquivo.close()
+        try:
+            subprocess.run([sys.executable, '-c',
+                            f'import benchmark_memoria_listas as b; b.popular({arquivo.name!r}, {total})'],
+                           check=True, stdout=subprocess.DEVNULL,
+                           cwd=os.path.dirname(os.path.abspath(__file__)))
+            for rota in ROTAS:
+                for modo in MODOS:
+                    saida = subprocess.run([sys.executable, os.path.abspath(__file__), '--interno',
+                                            arquivo.name, rota, modo],
+                                           check=True, capture_output=True, text=True).stdout
+                    pico, segundos, total_bytes = saida.strip().splitlines()[-1].split()
+                    print(f"{rota:<15} {total:>9} {modo:<9} {float(pico):>8.1f}MB {float(segundos):>7.2f}s "
+                          f"{int(total_bytes) / 1024 / 1024:>8.1f}MB")
+        finally:
+            os.unlink(arquivo.name)
+
+
+if __name__ == '__main__':
+    main()
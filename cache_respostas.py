@@ -0,0 +1,149 @@
+"""
+Cache em memória das respostas GET de produtos e vendas (read-through)
+
+Guarda o JSON já serializado (bytes) e os cabeçalhos da resposta, então um acerto não
+consulta o banco nem serializa nada. Despejo por LRU dentro de um orçamento de bytes e por
+TTL. Cada entrada tem tags ('produtos', 'produto:12', ...) e as rotas de escrita invalidam
+exatamente as tags que alteraram.
+
+Uma leitura que começou antes de uma invalidação não grava o resultado (pode ser anterior à
+escrita): guardar() recebe a geração lida com geracao() antes da consulta. A geração de cada
+tag invalidada fica guardada por um TTL (e no máximo LIMITE_TAGS_INVALIDADAS tags); ao sair,
+ela sobe o piso de geração, então leituras mais antigas que isso também não gravam.
+"""
+import time
+import threading
+from collections import OrderedDict, namedtuple
+
+# Custo aproximado de uma entrada além do corpo (chave, cabeçalhos, objetos Python)
+OVERHEAD_ENTRADA = 512
+LIMITE_TAGS_INVALIDADAS = 10000
+
+Entrada = namedtuple('Entrada', ['corpo', 'cabecalhos', 'tags', 'expira_em', 'tamanho'])
+
+
+class CacheRespostas:
+    """Cache LRU + TTL com limite de memória e invalidação por tag"""
+
+    def __init__(self, limite_bytes, ttl, fracao_maxima_entrada=0.25):
+        self.limite_bytes = limite_bytes
+        self.ttl = ttl
+        # Uma resposta enorme (lista completa) não pode expulsar todo o resto
+        self.limite_entrada = int(limite_bytes * fracao_maxima_entrada)
+        self._entradas = OrderedDict()
+        self._por_tag = {}
+        self._lock = threading.Lock()
+        self._geracao = 0
+        self._geracao_minima = 0  # Leituras de gerações anteriores não gravam
+        self._invalidada_em = OrderedDict()  # tag -> (geração, instante), mais antiga primeiro
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+        self.expiracoes = 0
+        self.invalidacoes = 0
+
+    @property
+    def ativo(self):
+        return self.limite_bytes > 0 and self.ttl > 0
+
+    def obter(self, chave):
+        """Entrada válida para a chave (ou None), marcada como usada recentemente"""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.faltas += 1
+                return None
+            if entrada.expira_em <= time.monotonic():
+                self._remover(chave)
+                self.expiracoes += 1
+                self.faltas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada
+
+    def geracao(self):
+        """Marcador a ler antes de consultar o banco e passar para guardar()"""
+        with self._lock:
+            return self._geracao
+
+    def guardar(self, chave, corpo, cabecalhos, tags, geracao):
+        """Guarda a resposta; retorna False se não cabe no orçamento ou se foi invalidada durante a leitura"""
+        tamanho = len(corpo) + len(chave) + OVERHEAD_ENTRADA
+        if tamanho > self.limite_entrada:
+            return False
+        with self._lock:
+            if self._geracao_minima > geracao or any(self._invalidada_em.get(tag, (0,))[0] > geracao for tag in tags):
+                return False
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = Entrada(corpo, cabecalhos, frozenset(tags), time.monotonic() + self.ttl, tamanho)
+            for tag in tags:
+                self._por_tag.setdefault(tag, set()).add(chave)
+            self.bytes_usados += tamanho
+            while self.bytes_usados > self.limite_bytes:
+                self._remover(next(iter(self._entradas)))
+                self.despejos += 1
+        return True
+
+    def invalidar(self, *tags):
+        """Remove todas as entradas com alguma das tags"""
+        with self._lock:
+            self._geracao += 1
+            agora = time.monotonic()
+            for tag in tags:
+                self._invalidada_em[tag] = (self._geracao, agora)
+                self._invalidada_em.move_to_end(tag)
+                for chave in list(self._por_tag.get(tag, ())):
+                    self._remover(chave)
+                    self.invalidacoes += 1
+            self._podar_invalidacoes(agora)
+
+    def _podar_invalidacoes(self, agora):
+        """Esquece invalidações mais antigas que o TTL ou além do limite, subindo o piso (chamar com o lock)"""
+        while self._invalidada_em:
+            geracao, instante = next(iter(self._invalidada_em.values()))
+            if instante > agora - self.ttl and len(self._invalidada_em) <= LIMITE_TAGS_INVALIDADAS:
+                break
+            self._invalidada_em.popitem(last=False)
+            self._geracao_minima = max(self._geracao_minima, geracao)
+
+    def limpar(self):
+        with self._lock:
+            self._geracao += 1
+            self._geracao_minima = self._geracao
+            self._invalidada_em.clear()
+            self.invalidacoes += len(self._entradas)
+            self._entradas.clear()
+            self._por_tag.clear()
+            self.bytes_usados = 0
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                'entradas': len(self._entradas),
+                'bytes_usados': self.bytes_usados,
+                'limite_bytes': self.limite_bytes,
+                'ttl_segundos': self.ttl,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else 0.0,
+                'despejos': self.despejos,
+                'expiracoes': self.expiracoes,
+                'invalidacoes': self.invalidacoes
+            }
+
+    def _remover(self, chave):
+        """Remove a entrada e suas referências nas tags (chamar com o lock)"""
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return
+        self.bytes_usados -= entrada.tamanho
+        for tag in entrada.tags:
+            chaves = self._por_tag.get(tag)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_tag[tag]
@@ -0,0 +1,101 @@
+"""
+Compressão HTTP das respostas (gzip; brotli e zstd se os pacotes estiverem instalados)
+
+O encoding é negociado pelo Accept-Encoding da requisição. Respostas dinâmicas usam níveis
+rápidos (o custo é pago a cada requisição que não vem do cache de respostas); os arquivos de
+static/ são comprimidos uma vez no nível máximo (ver assets.py).
+
+Respostas em streaming são comprimidas bloco a bloco: cada bloco gerado pela rota é enviado
+com flush, então o cliente continua recebendo os dados aos poucos.
+"""
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Ordem de preferência do servidor quando o cliente aceita vários com a mesma qualidade
+ENCODINGS_DISPONIVEIS = tuple(
+    encoding for encoding, modulo in (('br', brotli), ('zstd', zstandard), ('gzip', zlib)) if modulo is not None
+)
+
+# Respostas menores que isso não compensam (cabeçalhos e CPU custam mais que os bytes poupados)
+MINIMO_BYTES = int(os.getenv('COMPRESSAO_MINIMO_BYTES', '1024'))
+
+# (rápido, máximo): dinâmico usa o rápido, arquivos estáticos pré-comprimidos usam o máximo
+NIVEIS = {
+    'br': (4, 11),
+    'zstd': (3, 19),
+    'gzip': (6, 9),
+}
+
+TIPOS_COMPRESSIVEIS = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/manifest+json',
+    'application/x-msgpack',
+    'image/svg+xml',
+    'text/',
+)
+
+
+def tipo_compressivel(mimetype):
+    """True para texto/JSON/JS/SVG (text/event-stream não: o SSE precisa de cada evento na hora)"""
+    if not mimetype or mimetype == 'text/event-stream':
+        return False
+    return mimetype.startswith(TIPOS_COMPRESSIVEIS)
+
+
+def escolher_encoding(accept_encodings):
+    """Melhor encoding disponível para o Accept-Encoding (werkzeug) da requisição, ou None"""
+    for encoding in sorted(ENCODINGS_DISPONIVEIS, key=lambda e: -accept_encodings.quality(e)):
+        if accept_encodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def comprimir(dados, encoding, maximo=False):
+    """Comprime os bytes de uma vez (maximo=True: nível dos arquivos pré-comprimidos)"""
+    nivel = NIVEIS[encoding][1 if maximo else 0]
+    if encoding == 'br':
+        return brotli.compress(dados, quality=nivel)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=nivel).compress(dados)
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # wbits 31: formato gzip
+    return compressor.compress(dados) + compressor.flush()
+
+
+def comprimir_blocos(blocos, encoding):
+    """Gera os blocos comprimidos, com flush a cada bloco de entrada"""
+    nivel = NIVEIS[encoding][0]
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=nivel)
+        comprimir_bloco = lambda dados: compressor.process(dados) + compressor.flush()
+        finalizar = compressor.finish
+    elif encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=nivel).compressobj()
+        comprimir_bloco = lambda dados: compressor.compress(dados) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        finalizar = compressor.flush
+    else:
+        compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+        comprimir_bloco = lambda dados: compressor.compress(dados) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        finalizar = compressor.flush
+    try:
+        for bloco in blocos:
+            if isinstance(bloco, str):
+                bloco = bloco.encode('utf-8')
+            if bloco:
+                yield comprimir_bloco(bloco)
+        yield finalizar()
+    finally:
+        fechar = getattr(blocos, 'close', None)
+        if fechar is not None:
+            fechar()
@@ -1,4 +1,6 @@
 """Helper para compatibilidade entre SQLite e PostgreSQL"""
+import base64
+import json
 from models import DATABASE_TYPE
 
 def get_placeholder():
@@ -12,3 +14,31 @@ def get_cursor(conn):
         return conn.cursor(cursor_factory=RealDictCursor)
     return conn.cursor()
 
+def get_cursor_tuplas(conn):
+    """Cursor que retorna tuplas (para os mapeadores de linhas de models.py)"""
+    cursor = conn.cursor()
+    if DATABASE_TYPE != 'postgresql':
+        # get_db() configura o SQLite para devolver dicts; neste cursor, tuplas
+        cursor.row_factory = None
+    return cursor
+
+
+def codificar_cursor(*valores):
+    """Gera um cursor de paginação opaco (base64 url-safe) a partir das chaves de ordenação"""
+    valores = [v.isoformat() if hasattr(v, 'isoformat') else v for v in valores]
+    texto = json.dumps(valores, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor, quantidade):
+    """
+    Decodifica um cursor gerado por codificar_cursor.
+    Levanta ValueError se o cursor for inválido ou não tiver a quantidade de chaves esperada.
+    """
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento).decode('utf-8'))
+    except Exception:
+        raise ValueError('Cursor inválido')
+    if not isinstance(valores, list) or len(valores) != quantidade:
+        raise ValueError('Cursor inválido')
+    return valores
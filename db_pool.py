@@ -0,0 +1,249 @@
+"""
+Pool de conexões PostgreSQL compartilhado pelo processo
+
+No Vercel (e no gunicorn) o módulo continua carregado entre invocações "quentes",
+então o pool global evita refazer o handshake SSL com o Supabase a cada requisição.
+Compatível com PgBouncer em modo transaction: nenhuma conexão guarda estado de sessão
+entre checkouts (sempre é feito rollback ao devolver) e não usamos prepared statements.
+"""
+import os
+import time
+import threading
+
+import psycopg2
+
+# Configurações do pool via variáveis de ambiente
+POOL_MAX_CONEXOES = int(os.getenv('DB_POOL_MAX', '5'))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # Segundos esperando uma conexão livre
+POOL_RECICLAR_APOS = float(os.getenv('DB_POOL_RECYCLE', '1800'))  # Idade máxima da conexão (segundos)
+POOL_VERIFICAR_APOS = float(os.getenv('DB_POOL_PRE_PING', '30'))  # Testar conexões ociosas há mais tempo que isso
+
+
+class PoolEsgotado(Exception):
+    """Nenhuma conexão ficou livre dentro do timeout de checkout"""
+    pass
+
+
+class _ConexaoPool:
+    """Metadados de uma conexão física mantida pelo pool"""
+    __slots__ = ('conn', 'criada_em', 'devolvida_em')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.criada_em = time.monotonic()
+        self.devolvida_em = self.criada_em
+
+
+class ConexaoEmprestada:
+    """
+    Conexão entregue por get_db().
+    Delega tudo para a conexão psycopg2, mas close() devolve ao pool em vez de fechar.
+    Como no psycopg2, o bloco `with conn:` só encerra a transação (commit ou rollback);
+    a conexão continua emprestada até close().
+    """
+
+    def __init__(self, pool, item):
+        self._pool = pool
+        self._item = item
+
+    def close(self):
+        if self._item is not None:
+            item, self._item = self._item, None
+            self._pool.devolver(item)
+
+    @property
+    def closed(self):
+        return self._item is None or self._item.conn.closed
+
+    def __getattr__(self, nome):
+        if self._item is None:
+            raise psycopg2.InterfaceError('conexão já devolvida ao pool')
+        return getattr(self._item.conn, nome)
+
+    def __enter__(self):
+        if self._item is None:
+            raise psycopg2.InterfaceError('conexão já devolvida ao pool')
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        if self._item is None:
+            raise psycopg2.InterfaceError('conexão já devolvida ao pool')
+        if tipo is None:
+            self._item.conn.commit()
+        else:
+            self._item.conn.rollback()
+
+    def __del__(self):
+        # Conexão esquecida aberta por alguma rota: devolver em vez de vazar o slot
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class PoolConexoes:
+    """Pool limitado e thread-safe de conexões psycopg2"""
+
+    def __init__(self, config, max_conexoes=POOL_MAX_CONEXOES, timeout=POOL_TIMEOUT,
+                 reciclar_apos=POOL_RECICLAR_APOS, verificar_apos=POOL_VERIFICAR_APOS):
+        self.config = config
+        self.max_conexoes = max(1, max_conexoes)
+        self.timeout = timeout
+        self.reciclar_apos = reciclar_apos
+        self.verificar_apos = verificar_apos
+
+        self._livres = []  # Pilha LIFO: a conexão usada mais recentemente é a mais provável de estar viva
+        self._total = 0  # Conexões abertas (livres + em uso)
+        self._cond = threading.Condition(threading.Lock())
+        self._aguardando = 0
+        self._criadas = 0
+        self._recicladas = 0
+
+    def _conectar(self):
+        if isinstance(self.config, str):
+            return psycopg2.connect(self.config)
+        return psycopg2.connect(**self.config)
+
+    def _descartar(self, item):
+        try:
+            item.conn.close()
+        except Exception:
+            pass
+
+    def _precisa_reciclar(self, item):
+        if item.conn.closed:
+            return True
+        if self.reciclar_apos and time.monotonic() - item.criada_em > self.reciclar_apos:
+            return True
+        return False
+
+    def _esta_viva(self, item):
+        """Health check barato (SELECT 1) para conexões ociosas há algum tempo"""
+        if time.monotonic() - item.devolvida_em < self.verificar_apos:
+            return True
+        try:
+            cursor = item.conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+            item.conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def obter(self):
+        """Retira uma conexão do pool, criando uma nova se houver vaga"""
+        limite = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                while self._livres:
+                    item = self._livres.pop()
+                    if self._precisa_reciclar(item):
+                        self._total -= 1
+                        self._recicladas += 1
+                        self._descartar(item)
+                        continue
+                    break
+                else:
+                    item = None
+
+                if item is not None:
+                    break
+
+                if self._total < self.max_conexoes:
+                    # Reservar a vaga antes de conectar (fora do lock)
+                    self._total += 1
+                    break
+
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise PoolEsgotado(
+                        f'Nenhuma conexão livre após {self.timeout:g}s '
+                        f'({self.max_conexoes} em uso)'
+                    )
+                self._aguardando += 1
+                try:
+                    self._cond.wait(restante)
+                finally:
+                    self._aguardando -= 1
+
+        if item is not None:
+            # Health check fora do lock para não bloquear outras threads
+            if self._esta_viva(item):
+                return ConexaoEmprestada(self, item)
+            self._descartar(item)
+            with self._cond:
+                self._recicladas += 1
+                # A vaga continua reservada para a conexão nova abaixo
+
+        try:
+            conn = self._conectar()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._criadas += 1
+        return ConexaoEmprestada(self, _ConexaoPool(conn))
+
+    def devolver(self, item):
+        """Devolve a conexão ao pool, limpando qualquer transação pendente"""
+        reutilizavel = not item.conn.closed
+        if reutilizavel:
+            try:
+                # Rollback garante que nenhuma transação (ou lock) atravesse checkouts,
+                # requisito do PgBouncer em modo transaction
+                item.conn.rollback()
+            except Exception:
+                reutilizavel = False
+
+        with self._cond:
+            if reutilizavel and not self._precisa_reciclar(item):
+                item.devolvida_em = time.monotonic()
+                self._livres.append(item)
+            else:
+                self._total -= 1
+                self._recicladas += 1
+                self._descartar(item)
+            self._cond.notify()
+
+    def fechar(self):
+        """Fecha todas as conexões livres (as em uso são fechadas ao serem devolvidas)"""
+        with self._cond:
+            livres, self._livres = self._livres, []
+            self._total -= len(livres)
+        for item in livres:
+            self._descartar(item)
+
+    def estatisticas(self):
+        """Retorna contadores do pool"""
+        with self._cond:
+            return {
+                'max': self.max_conexoes,
+                'abertas': self._total,
+                'livres': len(self._livres),
+                'em_uso': self._total - len(self._livres),
+                'aguardando': self._aguardando,
+                'criadas': self._criadas,
+                'recicladas': self._recicladas,
+            }
+
+
+# Pool global do processo (sobrevive entre invocações quentes do serverless)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(config):
+    """Retorna o pool global, criando-o na primeira chamada"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexoes(config)
+    return _pool
+
+
+def estatisticas_pool():
+    """Contadores do pool global (None se o pool ainda não foi criado)"""
+    return _pool.estatisticas() if _pool is not None else None
@@ -0,0 +1,70 @@
+"""
+Barramento de eventos em memória para GET /api/eventos (Server-Sent Events)
+
+As rotas de escrita publicam um evento depois do commit; cada conexão SSE espera na
+condição e envia o que chegou, sem consultar o banco. Os últimos eventos ficam em um
+buffer circular para o cliente retomar com Last-Event-ID depois de uma reconexão.
+
+Os ids têm o formato "<instância>-<número>": a instância muda a cada processo, então um
+Last-Event-ID de outro processo (reinício, outra instância serverless) é reconhecido como
+não retomável e o cliente recebe um evento "recarregar".
+"""
+import uuid
+import threading
+from collections import deque, namedtuple
+
+TAMANHO_BUFFER_EVENTOS = 1000
+
+Evento = namedtuple('Evento', ['numero', 'tipo', 'dados'])
+
+
+class BarramentoEventos:
+    """Publicação e espera de eventos entre threads do mesmo processo"""
+
+    def __init__(self, tamanho_buffer=TAMANHO_BUFFER_EVENTOS):
+        self.instancia = uuid.uuid4().hex[:8]
+        self._buffer = deque(maxlen=tamanho_buffer)
+        self._ultimo_numero = 0
+        self._condicao = threading.Condition()
+
+    @property
+    def ultimo_numero(self):
+        return self._ultimo_numero
+
+    def id_evento(self, numero):
+        """Id enviado no campo id: do SSE"""
+        return f'{self.instancia}-{numero}'
+
+    def numero_do_id(self, id_evento):
+        """Número do evento a partir do Last-Event-ID (None se inválido ou de outra instância)"""
+        instancia, _, numero = (id_evento or '').strip().partition('-')
+        if instancia != self.instancia or not numero.isdigit():
+            return None
+        return int(numero)
+
+    def publicar(self, tipo, dados):
+        """Registra o evento e acorda as conexões que estão esperando"""
+        with self._condicao:
+            self._ultimo_numero += 1
+            self._buffer.append(Evento(self._ultimo_numero, tipo, dados))
+            self._condicao.notify_all()
+            return self._ultimo_numero
+
+    def eventos_apos(self, numero):
+        """
+        Eventos com número maior que `numero`, em ordem.
+        Retorna None se algum deles já saiu do buffer (o cliente precisa recarregar tudo).
+        """
+        with self._condicao:
+            if numero > self._ultimo_numero:
+                return None
+            if numero == self._ultimo_numero:
+                return []
+            if self._buffer[0].numero > numero + 1:
+                return None
+            return [evento for evento in self._buffer if evento.numero > numero]
+
+    def aguardar(self, numero, timeout):
+        """Espera até existir evento depois de `numero`; False se o tempo acabou"""
+        with self._condicao:
+            return self._condicao.wait_for(lambda: self._ultimo_numero > numero, timeout)
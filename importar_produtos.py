@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Importação em lote de produtos a partir de CSV ou NDJSON (um objeto JSON por linha)
+Usado por POST /api/produtos/importar e pela linha de comando.
+
+O arquivo é lido em streaming e gravado em lotes (cada lote em uma transação):
+- PostgreSQL: COPY FROM STDIN para uma tabela temporária e upsert a partir dela
+- SQLite: executemany
+
+A chave natural é o título: produto com o mesmo título é atualizado, senão é criado.
+Colunas/campos: titulo (obrigatório), descricao, quantidade, valor_compra, imagem, especificacoes
+(objeto JSON; no CSV, o JSON em uma coluna). Campos vazios ou ausentes mantêm o valor atual
+do produto (ou o padrão, se o produto for novo).
+
+Uso:
+    python3 importar_produtos.py catalogo.csv
+    python3 importar_produtos.py catalogo.ndjson --formato ndjson
+"""
+
+import io
+import csv
+import sys
+import json
+import codecs
+from datetime import datetime
+
+from models import get_db, indexar_produtos_busca, DATABASE_TYPE
+
+TAMANHO_LOTE = 500
+LIMITE_ERROS_DETALHADOS = 100  # Erros além disso só entram na contagem
+
+COLUNAS_IMPORTACAO = ('titulo', 'descricao', 'quantidade', 'valor_compra', 'imagem', 'especificacoes')
+
+# Limites das colunas de produtos no PostgreSQL (VARCHAR(255), VARCHAR(500), INTEGER, DECIMAL(10, 2)):
+# um valor fora deles derrubaria o COPY do lote inteiro, então a linha é rejeitada antes
+TAMANHO_MAXIMO_TITULO = 255
+TAMANHO_MAXIMO_IMAGEM = 500
+QUANTIDADE_MAXIMA = 2147483647
+VALOR_COMPRA_MAXIMO = 99999999.99
+
+
+def detectar_formato(nome_arquivo='', tipo_conteudo=''):
+    """Retorna 'csv' ou 'ndjson' a partir da extensão ou do Content-Type (padrão: csv)"""
+    nome_arquivo = (nome_arquivo or '').lower()
+    tipo_conteudo = (tipo_conteudo or '').lower()
+    if nome_arquivo.endswith(('.ndjson', '.jsonl', '.json')) or 'json' in tipo_conteudo:
+        return 'ndjson'
+    return 'csv'
+
+
+def ler_registros(arquivo, formato):
+    """
+    Lê o arquivo (binário) linha a linha, sem carregá-lo inteiro na memória.
+    Gera (numero_linha, registro, erro); registro é um dict ou None quando a linha não pôde ser lida.
+    """
+    texto = codecs.getreader('utf-8-sig')(arquivo, errors='replace')
+    if formato == 'ndjson':
+        for numero, linha in enumerate(texto, start=1):
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                yield numero, None, 'JSON inválido'
+                continue
+            if not isinstance(registro, dict):
+                yield numero, None, 'Cada linha deve ser um objeto JSON'
+                continue
+            yield numero, registro, None
+    else:
+        leitor = csv.DictReader(texto)
+        for registro in leitor:
+            # Linha 1 é o cabeçalho
+            yield leitor.line_num, registro, None
+
+
+def normalizar_especificacoes(especificacoes):
+    """
+    Valida e normaliza as especificações: objeto JSON com chaves/valores sem espaços nas pontas
+    e sem valores vazios. Retorna a string JSON; levanta ValueError se não for um objeto.
+    """
+    if isinstance(especificacoes, str):
+        try:
+            especificacoes = json.loads(especificacoes)
+        except ValueError:
+            raise ValueError('Especificações devem ser um objeto JSON')
+    if not isinstance(especificacoes, dict):
+        raise ValueError('Especificações devem ser um objeto JSON')
+    normalizadas = {}
+    for chave, valor in especificacoes.items():
+        chave = str(chave).strip()
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if chave and valor not in (None, ''):
+            normalizadas[chave] = valor
+    return json.dumps(normalizadas, ensure_ascii=False)
+
+
+def _vazio(valor):
+    return valor is None or (isinstance(valor, str) and not valor.strip())
+
+
+def _numero(valor, tipo, campo, maximo):
+    if isinstance(valor, str):
+        # Aceitar decimal com vírgula (planilhas em português)
+        valor = valor.strip().replace(',', '.')
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'{campo} deve ser um número')
+    if tipo is int:
+        if not numero.is_integer():
+            raise ValueError(f'{campo} deve ser um número inteiro')
+        numero = int(numero)
+    if numero < 0:
+        raise ValueError(f'{campo} não pode ser negativo')
+    if numero > maximo:
+        raise ValueError(f'{campo} deve ser no máximo {maximo}')
+    return numero
+
+
+def normalizar_produto(registro):
+    """
+    Valida um registro do arquivo e retorna a tupla na ordem de COLUNAS_IMPORTACAO.
+    Campos vazios ou ausentes viram None (mantêm o valor atual no upsert).
+    """
+    titulo = str(registro.get('titulo') or '').strip()
+    if not titulo:
+        raise ValueError('Título é obrigatório')
+    if len(titulo) > TAMANHO_MAXIMO_TITULO:
+        raise ValueError(f'Título deve ter no máximo {TAMANHO_MAXIMO_TITULO} caracteres')
+    descricao, quantidade, valor_compra, imagem, especificacoes = (
+        registro.get(coluna) for coluna in COLUNAS_IMPORTACAO[1:]
+    )
+    imagem = None if _vazio(imagem) else str(imagem).strip()
+    if imagem is not None and len(imagem) > TAMANHO_MAXIMO_IMAGEM:
+        raise ValueError(f'Imagem deve ter no máximo {TAMANHO_MAXIMO_IMAGEM} caracteres')
+    return (
+        titulo,
+        None if _vazio(descricao) else str(descricao).strip(),
+        None if _vazio(quantidade) else _numero(quantidade, int, 'Quantidade', QUANTIDADE_MAXIMA),
+        None if _vazio(valor_compra) else round(_numero(valor_compra, float, 'Valor de compra', VALOR_COMPRA_MAXIMO), 2),
+        imagem,
+        None if _vazio(especificacoes) else normalizar_especificacoes(especificacoes),
+    )
+
+
+def _gravar_lote_postgresql(cursor, lote, data_atual):
+    """COPY para a tabela temporária e upsert pelo título. Retorna (inseridos, atualizados)."""
+    # Uma importação por vez, para duas importações simultâneas não criarem o mesmo título duas vezes
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext('importar_produtos'))")
+    # ON COMMIT DROP: nada sobrevive à transação (compatível com PgBouncer em modo transaction)
+    # Mesmos tipos das colunas de produtos (sem NOT NULL: vazio mantém o valor atual)
+    cursor.execute('''
+        CREATE TEMP TABLE importacao_produtos (
+            titulo VARCHAR(255),
+            descricao TEXT,
+            quantidade INTEGER,
+            valor_compra DECIMAL(10, 2),
+            imagem VARCHAR(500),
+            especificacoes TEXT
+        ) ON COMMIT DROP
+    ''')
+    # No COPY em CSV, campo vazio sem aspas é NULL (None no csv.writer)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(lote)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY importacao_produtos ({', '.join(COLUNAS_IMPORTACAO)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+    cursor.execute('''
+        UPDATE produtos p
+        SET descricao = COALESCE(s.descricao, p.descricao),
+            quantidade = COALESCE(s.quantidade, p.quantidade),
+            valor_compra = COALESCE(s.valor_compra, p.valor_compra),
+            imagem = COALESCE(s.imagem, p.imagem),
+            especificacoes = COALESCE(s.especificacoes, p.especificacoes),
+            data_atualizacao = %s
+        FROM importacao_produtos s
+        WHERE p.titulo = s.titulo
+        RETURNING p.id, p.titulo, p.descricao, p.especificacoes
+    ''', (data_atual,))
+    atualizados = cursor.fetchall()
+    cursor.execute('''
+        INSERT INTO produtos (titulo, descricao, quantidade, valor_compra, imagem, especificacoes, data_criacao, data_atualizacao)
+        SELECT s.titulo, COALESCE(s.descricao, ''), COALESCE(s.quantidade, 0), COALESCE(s.valor_compra, 0),
+               COALESCE(s.imagem, ''), COALESCE(s.especificacoes, '{}'), %s, %s
+        FROM importacao_produtos s
+        WHERE NOT EXISTS (SELECT 1 FROM produtos p WHERE p.titulo = s.titulo)
+        RETURNING id, titulo, descricao, especificacoes
+    ''', (data_atual, data_atual))
+    inseridos = cursor.fetchall()
+    indexar_produtos_busca(cursor, [tuple(row) for row in atualizados + inseridos])
+    return len(inseridos), len(atualizados)
+
+
+def sql_produtos_por_titulo(quantidade):
+    """SELECT (SQLite) dos produtos com um dos `quantidade` títulos (usa idx_produtos_titulo)"""
+    return f"""
+        SELECT id, titulo, descricao, especificacoes FROM produtos
+        WHERE titulo IN ({', '.join('?' * quantidade)})
+    """
+
+
+def _gravar_lote_sqlite(cursor, lote, data_atual):
+    """executemany de UPDATE (títulos existentes) e INSERT (novos). Retorna (inseridos, atualizados)."""
+    def ler_produtos(titulos):
+        cursor.execute(sql_produtos_por_titulo(len(titulos)), titulos)
+        return [list(row.values()) if isinstance(row, dict) else list(row) for row in cursor.fetchall()]
+
+    titulos_existentes = {row[1] for row in ler_produtos([linha[0] for linha in lote])}
+    existentes = [linha for linha in lote if linha[0] in titulos_existentes]
+    novos = [linha for linha in lote if linha[0] not in titulos_existentes]
+    indexar = []
+
+    if existentes:
+        cursor.executemany('''
+            UPDATE produtos
+            SET descricao = COALESCE(?, descricao), quantidade = COALESCE(?, quantidade),
+                valor_compra = COALESCE(?, valor_compra), imagem = COALESCE(?, imagem),
+                especificacoes = COALESCE(?, especificacoes), data_atualizacao = ?
+            WHERE titulo = ?
+        ''', [linha[1:] + (data_atual, linha[0]) for linha in existentes])
+        # Reindexar com os valores finais (campos vazios mantiveram o valor anterior)
+        indexar.extend(ler_produtos([linha[0] for linha in existentes]))
+
+    if novos:
+        cursor.executemany('''
+            INSERT INTO produtos (titulo, descricao, quantidade, valor_compra, imagem, especificacoes, data_criacao, data_atualizacao)
+            VALUES (?, COALESCE(?, ''), COALESCE(?, 0), COALESCE(?, 0), COALESCE(?, ''), COALESCE(?, '{}'), ?, ?)
+        ''', [linha + (data_atual, data_atual) for linha in novos])
+        # A transação segura o lock de escrita durante o executemany, então os ids são sequenciais
+        cursor.execute('SELECT last_insert_rowid()')
+        row = cursor.fetchone()
+        ultimo_id = list(row.values())[0] if isinstance(row, dict) else row[0]
+        for produto_id, linha in zip(range(ultimo_id - len(novos) + 1, ultimo_id + 1), novos):
+            indexar.append((produto_id, linha[0], linha[1], linha[5]))
+
+    indexar_produtos_busca(cursor, indexar)
+    return len(novos), len(existentes)
+
+
+def _gravar_lote(lote):
+    """Grava um lote (dict titulo -> linha) em uma transação. Retorna (inseridos, atualizados)."""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        if DATABASE_TYPE == 'postgresql':
+            resultado = _gravar_lote_postgresql(cursor, list(lote.values()), datetime.now())
+        else:
+            resultado = _gravar_lote_sqlite(cursor, list(lote.values()), datetime.now().isoformat())
+        conn.commit()
+        return resultado
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def importar_produtos(arquivo, formato='csv', tamanho_lote=TAMANHO_LOTE):
+    """
+    Importa os produtos de um arquivo binário aberto (CSV ou NDJSON).
+    Linhas inválidas são puladas e relatadas; as válidas são gravadas em lotes de tamanho_lote.
+    Um lote que falha no banco é desfeito e relatado em lotes_com_erro, e a importação segue
+    com os próximos (os lotes anteriores já estão gravados).
+    Retorna o resumo: linhas, inseridos, atualizados, total_erros, erros (linha e motivo) e
+    lotes_com_erro (primeira_linha, ultima_linha, produtos e motivo).
+    """
+    resumo = {'linhas': 0, 'inseridos': 0, 'atualizados': 0, 'total_erros': 0, 'erros': [], 'lotes_com_erro': []}
+
+    def registrar_erro(numero, erro):
+        resumo['total_erros'] += 1
+        if len(resumo['erros']) < LIMITE_ERROS_DETALHADOS:
+            resumo['erros'].append({'linha': numero, 'erro': erro})
+
+    def gravar(lote, primeira_linha, ultima_linha):
+        try:
+            inseridos, atualizados = _gravar_lote(lote)
+        except Exception as e:
+            print(f"❌ Erro ao gravar o lote das linhas {primeira_linha}-{ultima_linha}: {e}")
+            resumo['total_erros'] += len(lote)
+            resumo['lotes_com_erro'].append({
+                'primeira_linha': primeira_linha, 'ultima_linha': ultima_linha,
+                'produtos': len(lote), 'erro': str(e)
+            })
+            return
+        resumo['inseridos'] += inseridos
+        resumo['atualizados'] += atualizados
+
+    # Título repetido dentro do mesmo lote: vale a última linha
+    lote = {}
+    primeira_linha = None
+    for numero, registro, erro in ler_registros(arquivo, formato):
+        resumo['linhas'] += 1
+        if erro:
+            registrar_erro(numero, erro)
+            continue
+        try:
+            linha = normalizar_produto(registro)
+        except ValueError as e:
+            registrar_erro(numero, str(e))
+            continue
+        lote[linha[0]] = linha
+        if primeira_linha is None:
+            primeira_linha = numero
+        ultima_linha = numero
+        if len(lote) >= tamanho_lote:
+            gravar(lote, primeira_linha, ultima_linha)
+            lote = {}
+            primeira_linha = None
+    if lote:
+        gravar(lote, primeira_linha, ultima_linha)
+    return resumo
+
+
+if __name__ == '__main__':
+    import argparse
+    from models import init_db
+
+    parser = argparse.ArgumentParser(description='Importa produtos de um arquivo CSV ou NDJSON')
+    parser.add_argument('arquivo')
+    parser.add_argument('--formato', choices=['csv', 'ndjson'], help='padrão: pela extensão do arquivo')
+    parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='linhas por transação')
+    args = parser.parse_args()
+
+    print(f"📊 Tipo de banco: {DATABASE_TYPE}")
+    init_db()
+    formato = args.formato or detectar_formato(args.arquivo)
+    with open(args.arquivo, 'rb') as arquivo:
+        resumo = importar_produtos(arquivo, formato, max(1, args.lote))
+
+    print(f"📄 {resumo['linhas']} linha(s) lida(s)")
+    print(f"✅ {resumo['inseridos']} produto(s) criado(s), {resumo['atualizados']} atualizado(s)")
+    if resumo['total_erros']:
+        print(f"❌ {resumo['total_erros']} linha(s) com erro:")
+        for erro in resumo['erros']:
+            print(f"   linha {erro['linha']}: {erro['erro']}")
+        for lote in resumo['lotes_com_erro']:
+            print(f"   linhas {lote['primeira_linha']}-{lote['ultima_linha']} ({lote['produtos']} produto(s) não gravado(s)): {lote['erro']}")
+        omitidos = resumo['total_erros'] - len(resumo['erros']) - sum(lote['produtos'] for lote in resumo['lotes_com_erro'])
+        if omitidos > 0:
+            print(f"   ... e mais {omitidos}")
+        sys.exit(1)
@@ -0,0 +1,152 @@
+"""
+Invalidação do cache de respostas entre workers (gunicorn) e instâncias
+
+PostgreSQL: as rotas de escrita mandam NOTIFY estoque_changes na própria transação (só é
+entregue se o commit acontecer), com as tags alteradas e o evento SSE. Uma thread por
+processo fica em LISTEN e repassa cada aviso para o cache e para o barramento de eventos.
+O LISTEN precisa de conexão direta (sessão): atrás do PgBouncer em modo transaction,
+configure DATABASE_URL_LISTEN com a URL direta do banco.
+
+SQLite: PRAGMA data_version, lido numa conexão fixa do processo, muda quando outra conexão
+faz commit no arquivo. Custa microssegundos, então é conferido a cada leitura do cache; se
+mudou, versoes_tabelas diz quais tabelas foram alteradas.
+"""
+import os
+import json
+import time
+import socket
+import select
+import threading
+
+CANAL_ALTERACOES = 'estoque_changes'
+LIMITE_PAYLOAD_NOTIFY = 7900  # O PostgreSQL aceita até 8000 bytes por NOTIFY
+
+# Tags que cobrem tudo o que depende de cada tabela (quando não se sabe o id alterado)
+TAGS_POR_TABELA = {
+    'produtos': ('produtos', 'produto:*'),
+    'vendas': ('vendas', 'venda:*'),
+}
+
+
+def origem_processo():
+    """Identifica o processo que fez a escrita (ele já invalidou o próprio cache)"""
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def _tags_resumidas(tags):
+    """'produto:12' -> 'produto:*', para caber no limite do NOTIFY"""
+    return sorted({tag.split(':')[0] + ':*' if ':' in tag else tag for tag in tags})
+
+
+def notificar_alteracao(cursor, tags, evento=None):
+    """
+    PostgreSQL: avisa os outros processos das tags alteradas (chamar antes do commit).
+    `evento` é o par (tipo, dados) publicado em /api/eventos.
+    """
+    payload = json.dumps({'origem': origem_processo(), 'tags': list(tags), 'evento': evento},
+                         separators=(',', ':'), default=str)
+    if len(payload.encode('utf-8')) > LIMITE_PAYLOAD_NOTIFY:
+        # Lote grande: invalidar pelas tags gerais e mandar o evento sem os ids
+        payload = json.dumps({'origem': origem_processo(), 'tags': _tags_resumidas(tags),
+                              'evento': [evento[0], {}] if evento else None}, separators=(',', ':'))
+    cursor.execute('SELECT pg_notify(%s, %s)', (CANAL_ALTERACOES, payload))
+
+
+class OuvinteAlteracoes:
+    """Thread de LISTEN do PostgreSQL, uma por processo (reconecta sozinha)"""
+
+    def __init__(self, config, ao_receber, ao_reconectar):
+        self._config = os.getenv('DATABASE_URL_LISTEN') or config
+        self._ao_receber = ao_receber
+        self._ao_reconectar = ao_reconectar
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        """Inicia a thread se ainda não existe neste processo (seguro chamar a cada requisição)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Depois de um fork (gunicorn --preload) a thread do processo pai não existe mais
+            self._pid = os.getpid()
+            threading.Thread(target=self._rodar, name='ouvinte-alteracoes', daemon=True).start()
+
+    def _conectar(self):
+        import psycopg2
+        if isinstance(self._config, str):
+            conn = psycopg2.connect(self._config)
+        else:
+            conn = psycopg2.connect(**self._config)
+        conn.autocommit = True
+        return conn
+
+    def _rodar(self):
+        espera = 1
+        while True:
+            conn = None
+            try:
+                conn = self._conectar()
+                conn.cursor().execute(f'LISTEN {CANAL_ALTERACOES}')
+                espera = 1
+                # Avisos enviados enquanto estava desconectado foram perdidos
+                self._ao_reconectar()
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        # Nada em 30s: confirmar que a conexão continua viva
+                        conn.cursor().execute('SELECT 1')
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notificacao = conn.notifies.pop(0)
+                        try:
+                            self._ao_receber(json.loads(notificacao.payload))
+                        except (ValueError, KeyError, TypeError) as e:
+                            print(f"⚠️  Aviso de alteração inválido: {e}")
+            except Exception as e:
+                print(f"⚠️  Ouvinte de alterações desconectado: {e}")
+                time.sleep(espera)
+                espera = min(espera * 2, 60)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+class VerificadorSQLite:
+    """Detecta commits de outras conexões no arquivo SQLite via PRAGMA data_version"""
+
+    def __init__(self, caminho, ao_mudar):
+        self._caminho = caminho
+        self._ao_mudar = ao_mudar
+        self._conn = None
+        self._pid = None
+        self._data_version = None
+        self._versoes = None
+        self._lock = threading.Lock()
+
+    def verificar(self):
+        """Chama ao_mudar(tabelas) se outra conexão alterou alguma tabela desde a última verificação"""
+        import sqlite3
+        with self._lock:
+            try:
+                if self._conn is None or self._pid != os.getpid():
+                    self._conn = sqlite3.connect(self._caminho, check_same_thread=False)
+                    self._pid = os.getpid()
+                data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+                if data_version == self._data_version:
+                    return
+                versoes = dict(self._conn.execute('SELECT tabela, versao FROM versoes_tabelas').fetchall())
+            except sqlite3.OperationalError:
+                # Banco ainda sem migrações: nada em cache depende dele
+                return
+            self._data_version = data_version
+            anteriores, self._versoes = self._versoes, versoes
+        if anteriores is None:
+            return
+        mudaram = [tabela for tabela, versao in versoes.items() if anteriores.get(tabela) != versao]
+        if mudaram:
+            self._ao_mudar(mudaram)
@@ -1,21 +1,24 @@
 #!/usr/bin/env python3
 """
 Script para executar migrações do banco de dados
-Adiciona a coluna valor_compra se não existir
+Aplica as migrações numeradas de models.py que ainda não constam em schema_version
 """
 
-import os
-from models import init_db, DATABASE_TYPE
+import sys
+from models import aplicar_migracoes, versao_schema_alvo, MIGRACOES, DATABASE_TYPE
 
 def executar_migracao():
-    """Executa a migração do banco de dados"""
-    print("🔄 Executando migração do banco de dados...")
+    """Executa as migrações pendentes do banco de dados"""
+    print("🔄 Executando migrações do banco de dados...")
     print(f"📊 Tipo de banco: {DATABASE_TYPE}")
     
     try:
-        init_db()
-        print("✅ Migração executada com sucesso!")
-        print("✅ Coluna 'valor_compra' adicionada (se não existia)")
+        aplicadas = aplicar_migracoes()
+        if aplicadas:
+            print(f"✅ {len(aplicadas)} migração(ões) aplicada(s)")
+        else:
+            print("ℹ️  Nenhuma migração pendente")
+        print(f"📌 Versão do schema: {versao_schema_alvo()}")
         return True
     except Exception as e:
         print(f"❌ Erro ao executar migração: {e}")
@@ -28,12 +31,15 @@ if __name__ == '__main__':
     else:
         print("🗄️  Usando SQLite local...")
     
+    if '--listar' in sys.argv:
+        for versao, descricao, _ in MIGRACOES:
+            print(f"  {versao:>3}  {descricao}")
+        exit(0)
+    
     sucesso = executar_migracao()
     
     if sucesso:
         print("\n✅ Banco de dados atualizado!")
-        print("💡 A coluna 'valor_compra' está disponível para uso.")
     else:
         print("\n❌ Falha na migração. Verifique as configurações do banco de dados.")
         exit(1)
-
@@ -1,5 +1,8 @@
 import os
-from datetime import datetime
+import re
+import json
+import unicodedata
+from datetime import datetime, date
 
 # Detectar qual banco de dados usar baseado em variável de ambiente
 # Prioriza DATABASE_URL (Supabase) se disponível, senão usa SQLite
@@ -18,6 +21,7 @@ else:
 if DATABASE_TYPE == 'postgresql':
     import psycopg2
     from psycopg2.extras import RealDictCursor
+    from db_pool import get_pool
     
     if DATABASE_URL:
         # Usar connection string se disponível (mais confiável)
@@ -34,21 +38,45 @@ if DATABASE_TYPE == 'postgresql':
             'sslmode': 'require'  # Requer SSL para Supabase
         }
     DATABASE = None  # Não usado para PostgreSQL
+    SUPORTA_RETURNING = True
+    ErroIntegridade = psycopg2.IntegrityError
 else:
     import sqlite3
     DATABASE = os.getenv('DATABASE_PATH', 'database.db')
+    # UPDATE/DELETE ... RETURNING só existe a partir do SQLite 3.35; nas versões antigas as
+    # rotas fazem o mesmo comando sem RETURNING e leem a linha na mesma transação
+    SUPORTA_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+    ErroIntegridade = sqlite3.IntegrityError
 
-def init_db():
-    """Inicializa o banco de dados criando as tabelas necessárias"""
+# ==================== MIGRAÇÕES DE SCHEMA ====================
+# Cada migração roda uma única vez, em ordem, e registra sua versão em schema_version.
+# Na inicialização basta um SELECT na tabela schema_version: o trabalho pesado
+# (information_schema, ALTER TABLE) só acontece quando o banco está desatualizado.
+MIGRACOES = []
+
+def migracao(versao, descricao):
+    """Registra uma função como migração numerada (recebe o cursor da transação)"""
+    def registrar(funcao):
+        MIGRACOES.append((versao, descricao, funcao))
+        MIGRACOES.sort(key=lambda m: m[0])
+        return funcao
+    return registrar
+
+def _colunas_tabela(cursor, tabela):
+    """Lista as colunas existentes de uma tabela"""
+    if DATABASE_TYPE == 'postgresql':
+        cursor.execute("""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_name = %s
+        """, (tabela,))
+        return [row[0] for row in cursor.fetchall()]
+    cursor.execute(f"PRAGMA table_info({tabela})")
+    return [coluna[1] for coluna in cursor.fetchall()]
+
+@migracao(1, 'Tabelas produtos e vendas')
+def _migracao_tabelas_iniciais(cursor):
     if DATABASE_TYPE == 'postgresql':
-        # Se DATABASE_CONFIG é string (connection string), usar diretamente
-        if isinstance(DATABASE_CONFIG, str):
-            conn = psycopg2.connect(DATABASE_CONFIG)
-        else:
-            conn = psycopg2.connect(**DATABASE_CONFIG)
-        cursor = conn.cursor()
-        
-        # Criar tabela se não existir
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS produtos (
                 id SERIAL PRIMARY KEY,
@@ -62,35 +90,7 @@ def init_db():
                 data_atualizacao TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        
-        # Verificar e adicionar colunas se não existirem
-        cursor.execute("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name='produtos'
-        """)
-        colunas_existentes = [row[0] for row in cursor.fetchall()]
-        
-        if 'valor_compra' not in colunas_existentes:
-            cursor.execute('ALTER TABLE produtos ADD COLUMN valor_compra DECIMAL(10, 2)')
-        
-        if 'quantidade' not in colunas_existentes:
-            cursor.execute('ALTER TABLE produtos ADD COLUMN quantidade INTEGER NOT NULL DEFAULT 0')
-        
-        # Remover colunas antigas se existirem (migração)
-        if 'quantidade_mercado_livre' in colunas_existentes:
-            try:
-                cursor.execute('ALTER TABLE produtos DROP COLUMN quantidade_mercado_livre')
-            except:
-                pass  # Ignorar se não conseguir remover
-        
-        if 'quantidade_shopee' in colunas_existentes:
-            try:
-                cursor.execute('ALTER TABLE produtos DROP COLUMN quantidade_shopee')
-            except:
-                pass  # Ignorar se não conseguir remover
-        
-        # Criar tabela de vendas (sem foreign key para preservar vendas mesmo se produto for deletado)
+        # Tabela de vendas sem foreign key para preservar vendas mesmo se produto for deletado
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS vendas (
                 id SERIAL PRIMARY KEY,
@@ -104,71 +104,7 @@ def init_db():
                 data_criacao TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        
-        # Remover foreign key se existir (para garantir que vendas não sejam deletadas)
-        try:
-            cursor.execute("""
-                SELECT constraint_name
-                FROM information_schema.table_constraints
-                WHERE table_name = 'vendas'
-                AND constraint_type = 'FOREIGN KEY'
-            """)
-            constraints = cursor.fetchall()
-            for constraint in constraints:
-                constraint_name = constraint[0] if isinstance(constraint, tuple) else constraint.get('constraint_name', '')
-                if constraint_name:
-                    try:
-                        cursor.execute(f'ALTER TABLE vendas DROP CONSTRAINT {constraint_name}')
-                        print(f"✅ Foreign key {constraint_name} removida (vendas serão preservadas)")
-                    except Exception as e:
-                        print(f"⚠️  Erro ao remover foreign key: {e}")
-        except Exception as e:
-            print(f"⚠️  Erro ao verificar foreign keys: {e}")
-        
-        # Adicionar coluna produto_titulo se não existir (migração)
-        cursor.execute("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name='vendas' AND column_name='produto_titulo'
-        """)
-        if not cursor.fetchone():
-            cursor.execute('ALTER TABLE vendas ADD COLUMN produto_titulo VARCHAR(255)')
-            # Preencher produto_titulo com dados existentes
-            cursor.execute('''
-                UPDATE vendas v
-                SET produto_titulo = p.titulo
-                FROM produtos p
-                WHERE v.produto_id = p.id AND v.produto_titulo IS NULL
-            ''')
-        
-        # Remover foreign key se existir (para garantir que vendas não sejam deletadas)
-        try:
-            cursor.execute("""
-                SELECT constraint_name
-                FROM information_schema.table_constraints
-                WHERE table_name = 'vendas'
-                AND constraint_type = 'FOREIGN KEY'
-            """)
-            constraints = cursor.fetchall()
-            for constraint in constraints:
-                constraint_name = constraint[0] if isinstance(constraint, tuple) else constraint.get('constraint_name', '')
-                if constraint_name:
-                    try:
-                        cursor.execute(f'ALTER TABLE vendas DROP CONSTRAINT {constraint_name}')
-                        print(f"✅ Foreign key {constraint_name} removida (vendas serão preservadas)")
-                    except Exception as e:
-                        print(f"⚠️  Erro ao remover foreign key: {e}")
-        except Exception as e:
-            print(f"⚠️  Erro ao verificar foreign keys: {e}")
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
     else:
-        # SQLite (desenvolvimento)
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS produtos (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -182,27 +118,6 @@ def init_db():
                 data_atualizacao TEXT NOT NULL
             )
         ''')
-        
-        # Verificar colunas existentes
-        cursor.execute("PRAGMA table_info(produtos)")
-        colunas = [coluna[1] for coluna in cursor.fetchall()]
-        
-        if 'valor_compra' not in colunas:
-            try:
-                cursor.execute('ALTER TABLE produtos ADD COLUMN valor_compra REAL')
-            except sqlite3.OperationalError:
-                pass
-        
-        if 'quantidade' not in colunas:
-            try:
-                cursor.execute('ALTER TABLE produtos ADD COLUMN quantidade INTEGER NOT NULL DEFAULT 0')
-            except sqlite3.OperationalError:
-                pass
-        
-        # SQLite não suporta DROP COLUMN diretamente, então apenas ignoramos as colunas antigas
-        # Elas não serão usadas e podem ser removidas manualmente se necessário
-        
-        # Criar tabela de vendas (sem foreign key para preservar vendas mesmo se produto for deletado)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS vendas (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -216,132 +131,880 @@ def init_db():
                 data_criacao TEXT NOT NULL
             )
         ''')
-        
-        # Adicionar coluna produto_titulo se não existir (migração)
-        cursor.execute("PRAGMA table_info(vendas)")
-        colunas = [coluna[1] for coluna in cursor.fetchall()]
-        if 'produto_titulo' not in colunas:
+
+@migracao(2, 'Colunas valor_compra e quantidade em produtos')
+def _migracao_colunas_produtos(cursor):
+    colunas = _colunas_tabela(cursor, 'produtos')
+    tipo_valor = 'DECIMAL(10, 2)' if DATABASE_TYPE == 'postgresql' else 'REAL'
+    if 'valor_compra' not in colunas:
+        cursor.execute(f'ALTER TABLE produtos ADD COLUMN valor_compra {tipo_valor}')
+    if 'quantidade' not in colunas:
+        cursor.execute('ALTER TABLE produtos ADD COLUMN quantidade INTEGER NOT NULL DEFAULT 0')
+
+@migracao(3, 'Remover colunas quantidade_mercado_livre e quantidade_shopee')
+def _migracao_remover_colunas_antigas(cursor):
+    # Antes feito por migrar_remover_colunas_antigas.py
+    colunas = _colunas_tabela(cursor, 'produtos')
+    for coluna in ('quantidade_mercado_livre', 'quantidade_shopee'):
+        if coluna not in colunas:
+            continue
+        if DATABASE_TYPE == 'postgresql':
+            cursor.execute(f'ALTER TABLE produtos DROP COLUMN {coluna}')
+        else:
+            # SQLite só suporta DROP COLUMN a partir da 3.35; em versões antigas a coluna é ignorada
             try:
-                cursor.execute('ALTER TABLE vendas ADD COLUMN produto_titulo TEXT')
-                # Preencher produto_titulo com dados existentes
-                cursor.execute('''
-                    UPDATE vendas 
-                    SET produto_titulo = (SELECT titulo FROM produtos WHERE produtos.id = vendas.produto_id)
-                    WHERE produto_titulo IS NULL AND produto_id IS NOT NULL
-                ''')
+                cursor.execute(f'ALTER TABLE produtos DROP COLUMN {coluna}')
             except sqlite3.OperationalError:
                 pass
-        
-        conn.commit()
+
+@migracao(4, 'Coluna produto_titulo em vendas')
+def _migracao_produto_titulo(cursor):
+    if 'produto_titulo' in _colunas_tabela(cursor, 'vendas'):
+        return
+    if DATABASE_TYPE == 'postgresql':
+        cursor.execute('ALTER TABLE vendas ADD COLUMN produto_titulo VARCHAR(255)')
+        # Preencher produto_titulo com dados existentes
+        cursor.execute('''
+            UPDATE vendas v
+            SET produto_titulo = p.titulo
+            FROM produtos p
+            WHERE v.produto_id = p.id AND v.produto_titulo IS NULL
+        ''')
+    else:
+        cursor.execute('ALTER TABLE vendas ADD COLUMN produto_titulo TEXT')
+        cursor.execute('''
+            UPDATE vendas 
+            SET produto_titulo = (SELECT titulo FROM produtos WHERE produtos.id = vendas.produto_id)
+            WHERE produto_titulo IS NULL AND produto_id IS NOT NULL
+        ''')
+
+@migracao(5, 'Remover foreign key de vendas (vendas preservadas ao deletar produto)')
+def _migracao_remover_foreign_key_vendas(cursor):
+    # Antes feito por migrar_foreign_key_vendas.py / remover_foreign_key_vendas.py
+    if DATABASE_TYPE == 'postgresql':
+        cursor.execute("""
+            SELECT constraint_name
+            FROM information_schema.table_constraints
+            WHERE table_name = 'vendas'
+            AND constraint_type = 'FOREIGN KEY'
+        """)
+        for (constraint_name,) in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE vendas DROP CONSTRAINT "{constraint_name}"')
+            print(f"✅ Foreign key {constraint_name} removida (vendas serão preservadas)")
+        return
+
+    # SQLite não suporta DROP CONSTRAINT: recriar a tabela sem a foreign key
+    cursor.execute('PRAGMA foreign_key_list(vendas)')
+    if not cursor.fetchall():
+        return
+    cursor.execute('ALTER TABLE vendas RENAME TO vendas_antiga')
+    cursor.execute('''
+        CREATE TABLE vendas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER,
+            produto_titulo TEXT,
+            valor_venda REAL NOT NULL,
+            valor_compra REAL NOT NULL,
+            data_venda TEXT NOT NULL,
+            onde_vendeu TEXT NOT NULL CHECK (onde_vendeu IN ('mercado_livre', 'shopee')),
+            observacoes TEXT,
+            data_criacao TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO vendas (id, produto_id, produto_titulo, valor_venda, valor_compra,
+                            data_venda, onde_vendeu, observacoes, data_criacao)
+        SELECT id, produto_id, produto_titulo, valor_venda, valor_compra,
+               data_venda, onde_vendeu, observacoes, data_criacao
+        FROM vendas_antiga
+    ''')
+    cursor.execute('DROP TABLE vendas_antiga')
+    print("✅ Tabela vendas recriada sem foreign key")
+
+# Índices das consultas críticas (mesma sintaxe no SQLite e no PostgreSQL).
+# Verificados por verificar_planos.py: nenhuma dessas consultas pode cair em scan sequencial.
+INDICES = [
+    # listar_produtos: ORDER BY data_atualizacao DESC (id desempata)
+    ('idx_produtos_data_atualizacao', 'produtos', 'data_atualizacao DESC, id DESC'),
+    # atualizar_produto/deletar_produto: COUNT(*) ... WHERE imagem = ?
+    ('idx_produtos_imagem', 'produtos', 'imagem'),
+    # listar_vendas: ORDER BY data_venda DESC, data_criacao DESC (id desempata)
+    ('idx_vendas_data_venda', 'vendas', 'data_venda DESC, data_criacao DESC, id DESC'),
+    # deletar_produto e vendas por produto: WHERE produto_id = ?
+    ('idx_vendas_produto_id', 'vendas', 'produto_id'),
+    # listar_vendas filtrando por canal (?onde_vendeu=), mantendo a ordenação da listagem
+    ('idx_vendas_onde_vendeu', 'vendas', 'onde_vendeu, data_venda DESC, data_criacao DESC, id DESC'),
+    # listar_produtos com ?ordem=nome / nome-desc / quantidade / quantidade-asc (id desempata)
+    ('idx_produtos_titulo_ordem', 'produtos', 'LOWER(titulo), id'),
+    ('idx_produtos_quantidade', 'produtos', 'quantidade, id'),
+]
+
+def _criar_indices(cursor):
+    """Cria os índices declarados em INDICES que ainda não existem"""
+    for nome, tabela, colunas in INDICES:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({colunas})')
+
+@migracao(6, 'Índices das consultas de produtos e vendas')
+def _migracao_indices(cursor):
+    _criar_indices(cursor)
+
+# ==================== BUSCA TEXTUAL DE PRODUTOS ====================
+# SQLite: tabela virtual FTS5 (rowid = id do produto)
+# PostgreSQL: tsvector com índice GIN
+# O texto é normalizado (minúsculas, sem acentos) no Python, igual nos dois bancos,
+# então "cafe" encontra "Café". Mantido em sincronia pelas rotas de produtos.
+
+def normalizar_texto_busca(texto):
+    """Remove acentos e converte para minúsculas"""
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+def termos_busca(consulta):
+    """Extrai os termos (palavras) de uma consulta, já normalizados"""
+    return re.findall(r'\w+', normalizar_texto_busca(consulta))
+
+def texto_especificacoes(especificacoes):
+    """Concatena os valores do JSON de especificações para indexação"""
+    if not especificacoes:
+        return ''
+    try:
+        dados = json.loads(especificacoes) if isinstance(especificacoes, str) else especificacoes
+    except (ValueError, TypeError):
+        return ''
+    if not isinstance(dados, dict):
+        return ''
+    return ' '.join(str(valor) for valor in dados.values() if valor is not None)
+
+def indexar_produto_busca(cursor, produto_id, titulo, descricao, especificacoes):
+    """Insere ou atualiza o produto no índice de busca (na mesma transação da escrita)"""
+    indexar_produtos_busca(cursor, [(produto_id, titulo, descricao, especificacoes)])
+
+def indexar_produtos_busca(cursor, produtos):
+    """Versão em lote de indexar_produto_busca: produtos é uma lista de (id, titulo, descricao, especificacoes)"""
+    linhas = [
+        (produto_id, normalizar_texto_busca(titulo), normalizar_texto_busca(descricao),
+         normalizar_texto_busca(texto_especificacoes(especificacoes)))
+        for produto_id, titulo, descricao, especificacoes in produtos
+    ]
+    if DATABASE_TYPE == 'postgresql':
+        cursor.executemany('''
+            INSERT INTO produtos_busca (produto_id, documento)
+            VALUES (%s,
+                    setweight(to_tsvector('simple', %s), 'A') ||
+                    setweight(to_tsvector('simple', %s), 'B') ||
+                    setweight(to_tsvector('simple', %s), 'C'))
+            ON CONFLICT (produto_id) DO UPDATE SET documento = EXCLUDED.documento
+        ''', linhas)
+    else:
+        cursor.executemany('DELETE FROM produtos_busca WHERE rowid = ?', [(linha[0],) for linha in linhas])
+        cursor.executemany('''
+            INSERT INTO produtos_busca (rowid, titulo, descricao, especificacoes)
+            VALUES (?, ?, ?, ?)
+        ''', linhas)
+
+def remover_produto_busca(cursor, produto_id):
+    """Remove o produto do índice de busca"""
+    if DATABASE_TYPE == 'postgresql':
+        cursor.execute('DELETE FROM produtos_busca WHERE produto_id = %s', (produto_id,))
+    else:
+        cursor.execute('DELETE FROM produtos_busca WHERE rowid = ?', (produto_id,))
+
+def _consulta_texto(termos):
+    """Consulta no formato do motor de busca: todos os termos, cada um por prefixo"""
+    if DATABASE_TYPE == 'postgresql':
+        return ' & '.join(f'{termo}:*' for termo in termos)
+    return ' '.join(f'"{termo}"*' for termo in termos)
+
+def sql_busca_produtos(termos, limite):
+    """
+    Monta a consulta de busca ranqueada (título pesa mais que descrição, que pesa mais que especificações).
+    Cada termo casa por prefixo e todos precisam estar presentes.
+    Retorna (sql, params).
+    """
+    consulta = _consulta_texto(termos)
+    if DATABASE_TYPE == 'postgresql':
+        return '''
+            SELECT p.*
+            FROM produtos_busca b
+            JOIN produtos p ON p.id = b.produto_id
+            WHERE b.documento @@ to_tsquery('simple', %s)
+            ORDER BY ts_rank(b.documento, to_tsquery('simple', %s)) DESC, p.data_atualizacao DESC
+            LIMIT %s
+        ''', (consulta, consulta, limite)
+    return '''
+        SELECT p.*
+        FROM produtos_busca b
+        JOIN produtos p ON p.id = b.rowid
+        WHERE produtos_busca MATCH ?
+        ORDER BY bm25(produtos_busca, 10.0, 5.0, 1.0), p.data_atualizacao DESC
+        LIMIT ?
+    ''', (consulta, limite)
+
+@migracao(7, 'Índice de busca textual de produtos')
+def _migracao_busca_produtos(cursor):
+    if DATABASE_TYPE == 'postgresql':
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS produtos_busca (
+                produto_id INTEGER PRIMARY KEY,
+                documento TSVECTOR NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_produtos_busca_documento ON produtos_busca USING GIN (documento)')
+    else:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS produtos_busca USING fts5(
+                titulo, descricao, especificacoes,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        ''')
+    # Indexar os produtos já existentes
+    cursor.execute('SELECT id, titulo, descricao, especificacoes FROM produtos')
+    for produto_id, titulo, descricao, especificacoes in cursor.fetchall():
+        indexar_produto_busca(cursor, produto_id, titulo, descricao, especificacoes)
+
+def indexar_venda_busca(cursor, venda_id, produto_titulo, observacoes):
+    """Insere ou atualiza a venda no índice de busca (produto_titulo e observações)"""
+    indexar_vendas_busca(cursor, [(venda_id, produto_titulo, observacoes)])
+
+def indexar_vendas_busca(cursor, vendas):
+    """Versão em lote de indexar_venda_busca: vendas é uma lista de (venda_id, produto_titulo, observacoes)"""
+    linhas = [(venda_id, normalizar_texto_busca(titulo), normalizar_texto_busca(observacoes))
+              for venda_id, titulo, observacoes in vendas]
+    if DATABASE_TYPE == 'postgresql':
+        cursor.executemany('''
+            INSERT INTO vendas_busca (venda_id, documento)
+            VALUES (%s,
+                    setweight(to_tsvector('simple', %s), 'A') ||
+                    setweight(to_tsvector('simple', %s), 'B'))
+            ON CONFLICT (venda_id) DO UPDATE SET documento = EXCLUDED.documento
+        ''', linhas)
+    else:
+        cursor.executemany('DELETE FROM vendas_busca WHERE rowid = ?', [(linha[0],) for linha in linhas])
+        cursor.executemany('''
+            INSERT INTO vendas_busca (rowid, produto_titulo, observacoes)
+            VALUES (?, ?, ?)
+        ''', linhas)
+
+def remover_venda_busca(cursor, venda_id):
+    """Remove a venda do índice de busca"""
+    if DATABASE_TYPE == 'postgresql':
+        cursor.execute('DELETE FROM vendas_busca WHERE venda_id = %s', (venda_id,))
+    else:
+        cursor.execute('DELETE FROM vendas_busca WHERE rowid = ?', (venda_id,))
+
+def sql_filtro_busca_vendas(termos, alias='v'):
+    """Condição WHERE que restringe as vendas às que casam com os termos. Retorna (sql, params)."""
+    consulta = _consulta_texto(termos)
+    if DATABASE_TYPE == 'postgresql':
+        return (f"{alias}.id IN (SELECT venda_id FROM vendas_busca WHERE documento @@ to_tsquery('simple', %s))",
+                [consulta])
+    return f'{alias}.id IN (SELECT rowid FROM vendas_busca WHERE vendas_busca MATCH ?)', [consulta]
+
+@migracao(8, 'Índice de busca textual e índice por canal em vendas')
+def _migracao_busca_vendas(cursor):
+    if DATABASE_TYPE == 'postgresql':
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS vendas_busca (
+                venda_id INTEGER PRIMARY KEY,
+                documento TSVECTOR NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_vendas_busca_documento ON vendas_busca USING GIN (documento)')
+    else:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS vendas_busca USING fts5(
+                produto_titulo, observacoes,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        ''')
+    cursor.execute('SELECT id, produto_titulo, observacoes FROM vendas')
+    for venda_id, produto_titulo, observacoes in cursor.fetchall():
+        indexar_venda_busca(cursor, venda_id, produto_titulo, observacoes)
+    _criar_indices(cursor)
+
+# ==================== RESUMO MENSAL DE VENDAS ====================
+# vendas_resumo_mensal guarda quantidade, receita e custo por mês × canal × produto.
+# É atualizada na mesma transação de cada escrita em vendas, então o resumo
+# é lido em O(meses) em vez de reagregar todo o histórico.
+# produto_id = 0 representa vendas sem produto (produto_id NULL).
+
+def expressao_mes_venda(alias='v'):
+    """Expressão SQL do mês ('AAAA-MM') de data_venda (DATE no PostgreSQL, TEXT no SQLite)"""
+    if DATABASE_TYPE == 'postgresql':
+        return f"to_char({alias}.data_venda, 'YYYY-MM')"
+    return f'substr({alias}.data_venda, 1, 7)'
+
+def mes_da_data(data_venda):
+    """Mês ('AAAA-MM') de uma data de venda (date, datetime ou string ISO)"""
+    if hasattr(data_venda, 'strftime'):
+        return data_venda.strftime('%Y-%m')
+    return str(data_venda)[:7]
+
+def acumular_resumo_venda(cursor, data_venda, onde_vendeu, produto_id, valor_venda, valor_compra, sinal=1, quantidade=1):
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) uma venda do resumo mensal.
+    Com quantidade > 1, valor_venda/valor_compra são os totais de várias vendas da mesma chave.
+    Deve ser chamada na mesma transação que insere/altera/remove a venda.
+    """
+    placeholder = '%s' if DATABASE_TYPE == 'postgresql' else '?'
+    chave = (mes_da_data(data_venda), onde_vendeu, produto_id or 0)
+    # Upsert: mesma sintaxe no PostgreSQL e no SQLite (3.24+)
+    cursor.execute(f'''
+        INSERT INTO vendas_resumo_mensal (mes, onde_vendeu, produto_id, quantidade, receita, custo)
+        VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
+        ON CONFLICT (mes, onde_vendeu, produto_id) DO UPDATE SET
+            quantidade = vendas_resumo_mensal.quantidade + EXCLUDED.quantidade,
+            receita = vendas_resumo_mensal.receita + EXCLUDED.receita,
+            custo = vendas_resumo_mensal.custo + EXCLUDED.custo
+    ''', chave + (sinal * quantidade, sinal * float(valor_venda or 0), sinal * float(valor_compra or 0)))
+    if sinal < 0:
+        cursor.execute(f'''
+            DELETE FROM vendas_resumo_mensal
+            WHERE mes = {placeholder} AND onde_vendeu = {placeholder} AND produto_id = {placeholder}
+            AND quantidade <= 0
+        ''', chave)
+
+def _sql_agregar_vendas():
+    """SELECT que agrega a tabela vendas no formato de vendas_resumo_mensal"""
+    mes = expressao_mes_venda('v')
+    return f'''
+        SELECT {mes} AS mes, v.onde_vendeu, COALESCE(v.produto_id, 0) AS produto_id,
+               COUNT(*) AS quantidade, SUM(v.valor_venda) AS receita, SUM(v.valor_compra) AS custo
+        FROM vendas v
+        GROUP BY {mes}, v.onde_vendeu, COALESCE(v.produto_id, 0)
+    '''
+
+def recalcular_resumo_vendas(cursor):
+    """Reconstrói vendas_resumo_mensal do zero a partir da tabela vendas"""
+    cursor.execute('DELETE FROM vendas_resumo_mensal')
+    cursor.execute(f'''
+        INSERT INTO vendas_resumo_mensal (mes, onde_vendeu, produto_id, quantidade, receita, custo)
+        {_sql_agregar_vendas()}
+    ''')
+
+def divergencias_resumo_vendas(cursor, tolerancia=0.005):
+    """
+    Compara vendas_resumo_mensal com a agregação da tabela vendas.
+    Retorna uma lista de (chave, esperado, atual); vazia se estiverem iguais.
+    """
+    def carregar(sql):
+        cursor.execute(sql)
+        resultado = {}
+        for row in cursor.fetchall():
+            if isinstance(row, dict):
+                row = list(row.values())
+            resultado[(row[0], row[1], int(row[2]))] = (int(row[3]), float(row[4] or 0), float(row[5] or 0))
+        return resultado
+    esperado = carregar(_sql_agregar_vendas())
+    atual = carregar('SELECT mes, onde_vendeu, produto_id, quantidade, receita, custo FROM vendas_resumo_mensal')
+    divergencias = []
+    for chave in sorted(set(esperado) | set(atual)):
+        e = esperado.get(chave, (0, 0.0, 0.0))
+        a = atual.get(chave, (0, 0.0, 0.0))
+        if e[0] != a[0] or abs(e[1] - a[1]) > tolerancia or abs(e[2] - a[2]) > tolerancia:
+            divergencias.append((chave, e, a))
+    return divergencias
+
+@migracao(9, 'Tabela agregada vendas_resumo_mensal')
+def _migracao_resumo_mensal(cursor):
+    tipo_valor = 'DECIMAL(12, 2)' if DATABASE_TYPE == 'postgresql' else 'REAL'
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS vendas_resumo_mensal (
+            mes CHAR(7) NOT NULL,
+            onde_vendeu VARCHAR(20) NOT NULL,
+            produto_id INTEGER NOT NULL DEFAULT 0,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            receita {tipo_valor} NOT NULL DEFAULT 0,
+            custo {tipo_valor} NOT NULL DEFAULT 0,
+            PRIMARY KEY (mes, onde_vendeu, produto_id)
+        )
+    ''')
+    recalcular_resumo_vendas(cursor)
+
+@migracao(10, 'Índice por título de produto (importação em lote)')
+def _migracao_indice_titulo(cursor):
+    _criar_indices(cursor)
+
+# ==================== VERSÃO DAS TABELAS ====================
+# Contador por tabela incrementado por trigger em toda escrita (rotas, importação, scripts).
+# Barato de ler: é o marcador de mudança usado nos ETags das listagens.
+TABELAS_VERSIONADAS = ('produtos', 'vendas')
+
+@migracao(11, 'Contador de versão por tabela (versoes_tabelas) mantido por triggers')
+def _migracao_versoes_tabelas(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS versoes_tabelas (
+            tabela VARCHAR(50) PRIMARY KEY,
+            versao BIGINT NOT NULL DEFAULT 0
+        )
+    ''')
+    placeholder = '%s' if DATABASE_TYPE == 'postgresql' else '?'
+    for tabela in TABELAS_VERSIONADAS:
+        cursor.execute(f'''
+            INSERT INTO versoes_tabelas (tabela, versao) VALUES ({placeholder}, 1)
+            ON CONFLICT (tabela) DO NOTHING
+        ''', (tabela,))
+    
+    if DATABASE_TYPE == 'postgresql':
+        cursor.execute('''
+            CREATE OR REPLACE FUNCTION incrementar_versao_tabela() RETURNS trigger AS $$
+            BEGIN
+                UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela = TG_TABLE_NAME;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        for tabela in TABELAS_VERSIONADAS:
+            # FOR EACH STATEMENT: um incremento por comando, mesmo em escritas em lote
+            cursor.execute(f'DROP TRIGGER IF EXISTS trg_versao_{tabela} ON {tabela}')
+            cursor.execute(f'''
+                CREATE TRIGGER trg_versao_{tabela}
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabela}
+                FOR EACH STATEMENT EXECUTE FUNCTION incrementar_versao_tabela()
+            ''')
+    else:
+        # SQLite só tem triggers por linha
+        for tabela in TABELAS_VERSIONADAS:
+            for evento in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_versao_{tabela}_{evento.lower()}
+                    AFTER {evento} ON {tabela}
+                    BEGIN
+                        UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela = '{tabela}';
+                    END
+                ''')
+
+def ler_versoes_tabelas(tabelas, conn=None):
+    """
+    Versões atuais das tabelas pedidas, na mesma ordem (uma consulta só).
+    Com `conn`, usa essa conexão e não a fecha (a transação de leitura é encerrada).
+    """
+    placeholder = '%s' if DATABASE_TYPE == 'postgresql' else '?'
+    propria = conn is None
+    if propria:
+        conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT tabela, versao FROM versoes_tabelas WHERE tabela IN ({', '.join([placeholder] * len(tabelas))})",
+            tuple(tabelas)
+        )
+        versoes = {}
+        for row in cursor.fetchall():
+            row = list(row.values()) if isinstance(row, dict) else row
+            versoes[row[0]] = row[1]
+        if DATABASE_TYPE == 'postgresql':
+            conn.rollback()
+        return tuple(versoes.get(tabela, 0) for tabela in tabelas)
+    finally:
+        cursor.close()
+        if propria:
+            conn.close()
+
+# ==================== SINCRONIZAÇÃO INCREMENTAL ====================
+# GET /api/produtos?since= e GET /api/vendas?since= devolvem só o que mudou depois da marca
+# (data_atualizacao) e os ids excluídos desde então, registrados em `exclusoes`.
+
+@migracao(12, 'Coluna data_atualizacao em vendas e tabela exclusoes (sincronização incremental)')
+def _migracao_sincronizacao(cursor):
+    if DATABASE_TYPE == 'postgresql':
+        cursor.execute('ALTER TABLE vendas ADD COLUMN IF NOT EXISTS data_atualizacao TIMESTAMP')
+        cursor.execute('UPDATE vendas SET data_atualizacao = data_criacao WHERE data_atualizacao IS NULL')
+        cursor.execute('ALTER TABLE vendas ALTER COLUMN data_atualizacao SET DEFAULT CURRENT_TIMESTAMP')
+        cursor.execute('ALTER TABLE vendas ALTER COLUMN data_atualizacao SET NOT NULL')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS exclusoes (
+                id SERIAL PRIMARY KEY,
+                tabela VARCHAR(50) NOT NULL,
+                registro_id INTEGER NOT NULL,
+                data_exclusao TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    else:
+        # ALTER TABLE do SQLite não aceita NOT NULL sem default constante; as rotas sempre preenchem
+        cursor.execute('PRAGMA table_info(vendas)')
+        if 'data_atualizacao' not in [coluna[1] for coluna in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE vendas ADD COLUMN data_atualizacao TEXT')
+        cursor.execute('UPDATE vendas SET data_atualizacao = data_criacao WHERE data_atualizacao IS NULL')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS exclusoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tabela TEXT NOT NULL,
+                registro_id INTEGER NOT NULL,
+                data_exclusao TEXT NOT NULL
+            )
+        ''')
+    # Fora de INDICES: a migração 6 roda antes de a coluna existir em bancos novos
+    # (produtos já tem idx_produtos_data_atualizacao)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_vendas_data_atualizacao ON vendas (data_atualizacao, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_exclusoes_tabela_data ON exclusoes (tabela, data_exclusao)')
+
+def registrar_exclusao(cursor, tabela, registro_id, data_exclusao):
+    """Grava o tombstone de um registro excluído (na mesma transação do DELETE)"""
+    placeholder = '%s' if DATABASE_TYPE == 'postgresql' else '?'
+    cursor.execute(f'''
+        INSERT INTO exclusoes (tabela, registro_id, data_exclusao)
+        VALUES ({placeholder}, {placeholder}, {placeholder})
+    ''', (tabela, registro_id, data_exclusao))
+
+@migracao(13, 'Índices das ordenações da listagem de produtos (nome e quantidade)')
+def _migracao_indices_ordenacao(cursor):
+    _criar_indices(cursor)
+
+@migracao(14, 'Título de produto único (chave natural da importação)')
+def _migracao_titulo_unico(cursor):
+    # Títulos repetidos: o produto mais antigo (menor id) fica com o título e os outros
+    # ganham o sufixo " (#id)". Nada é mesclado: estoque e vendas continuam em cada produto.
+    placeholder = '%s' if DATABASE_TYPE == 'postgresql' else '?'
+    cursor.execute('''
+        SELECT id FROM produtos p
+        WHERE EXISTS (SELECT 1 FROM produtos o WHERE o.titulo = p.titulo AND o.id < p.id)
+    ''')
+    duplicados = [row[0] for row in cursor.fetchall()]
+    if duplicados:
+        data_atual = datetime.now() if DATABASE_TYPE == 'postgresql' else datetime.now().isoformat()
+        cursor.executemany(f'''
+            UPDATE produtos SET titulo = SUBSTR(titulo, 1, 230) || ' (#' || id || ')', data_atualizacao = {placeholder}
+            WHERE id = {placeholder}
+        ''', [(data_atual, produto_id) for produto_id in duplicados])
+        cursor.execute(f'''
+            SELECT id, titulo, descricao, especificacoes FROM produtos
+            WHERE id IN ({', '.join([placeholder] * len(duplicados))})
+        ''', duplicados)
+        indexar_produtos_busca(cursor, cursor.fetchall())
+        print(f"ℹ️  {len(duplicados)} produto(s) com título repetido renomeado(s) com o sufixo (#id)")
+    # Fora de INDICES (que só cria índices comuns): o índice da migração 10 vira UNIQUE
+    cursor.execute('DROP INDEX IF EXISTS idx_produtos_titulo')
+    cursor.execute('CREATE UNIQUE INDEX idx_produtos_titulo ON produtos (titulo)')
+
+def versao_schema_alvo():
+    """Versão mais recente registrada"""
+    return MIGRACOES[-1][0] if MIGRACOES else 0
+
+def _conexao_migracao():
+    """Conexão com cursor de tuplas para as migrações"""
+    if DATABASE_TYPE == 'postgresql':
+        return get_db()
+    # isolation_level=None: controlamos BEGIN/COMMIT manualmente (DDL também é transacional no SQLite)
+    return sqlite3.connect(DATABASE, isolation_level=None)
+
+def _ler_versao_schema(conn):
+    """Retorna a versão atual do schema, ou None se schema_version ainda não existe"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT version FROM schema_version ORDER BY version DESC LIMIT 1')
+        row = cursor.fetchone()
+        if DATABASE_TYPE == 'postgresql':
+            conn.rollback()  # Não deixar a conexão "idle in transaction"
+        return row[0] if row else 0
+    except Exception:
+        # Tabela ainda não existe (banco anterior ao controle de versão)
+        if DATABASE_TYPE == 'postgresql':
+            conn.rollback()
+        return None
+    finally:
+        cursor.close()
+
+def aplicar_migracoes(conn=None):
+    """
+    Aplica as migrações pendentes, cada uma em sua própria transação.
+    Retorna a lista de (versao, descricao) aplicadas.
+    """
+    fechar = conn is None
+    if conn is None:
+        conn = _conexao_migracao()
+    aplicadas = []
+    cursor = conn.cursor()
+    try:
+        if DATABASE_TYPE == 'postgresql':
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    descricao VARCHAR(255),
+                    aplicada_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+        else:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    descricao TEXT,
+                    aplicada_em TEXT NOT NULL
+                )
+            ''')
+
+        versao_atual = _ler_versao_schema(conn) or 0
+        placeholder = '%s' if DATABASE_TYPE == 'postgresql' else '?'
+        for versao, descricao, funcao in MIGRACOES:
+            if versao <= versao_atual:
+                continue
+            if DATABASE_TYPE == 'postgresql':
+                # Lock transacional: outra instância (cold start paralelo) espera aqui
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext('schema_version'))")
+            else:
+                cursor.execute('BEGIN IMMEDIATE')
+            try:
+                # Reverificar dentro do lock: outra instância pode ter aplicado enquanto esperávamos
+                cursor.execute(f'SELECT 1 FROM schema_version WHERE version = {placeholder}', (versao,))
+                ja_aplicada = cursor.fetchone() is not None
+                if not ja_aplicada:
+                    funcao(cursor)
+                    cursor.execute(
+                        f'INSERT INTO schema_version (version, descricao, aplicada_em) '
+                        f'VALUES ({placeholder}, {placeholder}, {placeholder})',
+                        (versao, descricao, datetime.now() if DATABASE_TYPE == 'postgresql' else datetime.now().isoformat())
+                    )
+                if DATABASE_TYPE == 'postgresql':
+                    conn.commit()
+                else:
+                    cursor.execute('COMMIT')
+            except Exception:
+                if DATABASE_TYPE == 'postgresql':
+                    conn.rollback()
+                else:
+                    cursor.execute('ROLLBACK')
+                raise
+            if not ja_aplicada:
+                aplicadas.append((versao, descricao))
+                print(f"✅ Migração {versao} aplicada: {descricao}")
+    finally:
+        cursor.close()
+        if fechar:
+            conn.close()
+    return aplicadas
+
+def init_db():
+    """
+    Garante que o schema está atualizado.
+    Caminho rápido: um único SELECT em schema_version; migrações só rodam se o banco estiver atrás.
+    """
+    conn = _conexao_migracao()
+    try:
+        versao = _ler_versao_schema(conn)
+        if versao is not None and versao >= versao_schema_alvo():
+            return
+        aplicar_migracoes(conn)
+    finally:
         conn.close()
 
+def _dict_factory(cursor, row):
+    """Row factory do SQLite que retorna dict (suporta .get() como o RealDictCursor)"""
+    return {coluna[0]: row[i] for i, coluna in enumerate(cursor.description)}
+
 def get_db():
-    """Retorna uma conexão com o banco de dados"""
+    """
+    Retorna uma conexão com o banco de dados.
+    No PostgreSQL a conexão vem do pool global; conn.close() a devolve ao pool.
+    """
     if DATABASE_TYPE == 'postgresql':
-        # Se DATABASE_CONFIG é string (connection string), usar diretamente
-        if isinstance(DATABASE_CONFIG, str):
-            conn = psycopg2.connect(DATABASE_CONFIG)
-        else:
-            conn = psycopg2.connect(**DATABASE_CONFIG)
-        return conn
+        return get_pool(DATABASE_CONFIG).obter()
     else:
         conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
+        conn.row_factory = _dict_factory
         return conn
 
-def produto_para_dict(produto):
-    """Converte um produto (Row/Dict) em dicionário"""
+# ==================== MAPEADORES DE LINHAS ====================
+# Convertem as linhas (tuplas) das consultas de produtos/vendas nos dicts da API.
+# São montados uma vez por consulta a partir de cursor.description: os índices das colunas
+# e o ramo do banco (PostgreSQL devolve Decimal/date/datetime, SQLite devolve float/str)
+# ficam resolvidos fora do laço, e cada linha custa só as conversões necessárias.
+
+def _indices_colunas(description):
+    return {coluna[0]: i for i, coluna in enumerate(description)}
+
+def _float_sqlite(valor):
+    """float() tolerante: NULL ou texto inválido gravado no SQLite vira 0.0"""
+    if valor is None:
+        return 0.0
+    try:
+        return float(valor)
+    except (ValueError, TypeError):
+        return 0.0
+
+def _int_sqlite(valor):
+    if valor is None:
+        return 0
+    try:
+        return int(valor)
+    except (ValueError, TypeError):
+        return 0
+
+def _data_venda_texto(valor):
+    """Só a parte da data ('AAAA-MM-DD') de uma data de venda em texto"""
+    if type(valor) is not str:
+        valor = str(valor)
+    return valor.partition('T')[0].partition(' ')[0]
+
+def mapeador_produtos(description):
+    """Retorna uma função que converte uma linha (tupla) de produtos no dict da API"""
+    indice = _indices_colunas(description)
+    i_id, i_titulo, i_descricao = indice['id'], indice['titulo'], indice['descricao']
+    i_quantidade, i_valor_compra = indice['quantidade'], indice['valor_compra']
+    i_imagem, i_especificacoes = indice['imagem'], indice['especificacoes']
+    i_criacao, i_atualizacao = indice['data_criacao'], indice['data_atualizacao']
+    
     if DATABASE_TYPE == 'postgresql':
-        # PostgreSQL retorna dict-like object
-        quantidade = int(produto.get('quantidade', 0) or 0)
-        return {
-            'id': produto['id'],
-            'titulo': produto['titulo'],
-            'descricao': produto['descricao'],
-            'quantidade': quantidade,
-            'valor_compra': float(produto.get('valor_compra', 0) or 0),
-            'imagem': produto['imagem'],
-            'especificacoes': produto['especificacoes'],
-            'data_criacao': produto['data_criacao'].isoformat() if produto['data_criacao'] else '',
-            'data_atualizacao': produto['data_atualizacao'].isoformat() if produto['data_atualizacao'] else ''
-        }
+        def mapear(linha):
+            data_criacao = linha[i_criacao]
+            data_atualizacao = linha[i_atualizacao]
+            return {
+                'id': linha[i_id],
+                'titulo': linha[i_titulo],
+                'descricao': linha[i_descricao],
+                'quantidade': int(linha[i_quantidade] or 0),
+                'valor_compra': float(linha[i_valor_compra] or 0),
+                'imagem': linha[i_imagem],
+                'especificacoes': linha[i_especificacoes],
+                'data_criacao': data_criacao.isoformat() if data_criacao else '',
+                'data_atualizacao': data_atualizacao.isoformat() if data_atualizacao else ''
+            }
     else:
-        # SQLite
-        try:
-            quantidade = int(produto['quantidade'] if produto['quantidade'] is not None else 0)
-        except (KeyError, ValueError, TypeError):
-            quantidade = 0
-        
-        # Obter valor_compra de forma segura (SQLite Row não tem .get())
-        try:
-            valor_compra = float(produto['valor_compra'] if produto['valor_compra'] is not None else 0)
-        except (KeyError, ValueError, TypeError):
-            valor_compra = 0.0
-        
-        return {
-            'id': produto['id'],
-            'titulo': produto['titulo'],
-            'descricao': produto['descricao'],
-            'quantidade': quantidade,
-            'valor_compra': valor_compra,
-            'imagem': produto['imagem'],
-            'especificacoes': produto['especificacoes'],
-            'data_criacao': produto['data_criacao'],
-            'data_atualizacao': produto['data_atualizacao']
-        }
+        def mapear(linha):
+            return {
+                'id': linha[i_id],
+                'titulo': linha[i_titulo],
+                'descricao': linha[i_descricao],
+                'quantidade': _int_sqlite(linha[i_quantidade]),
+                'valor_compra': _float_sqlite(linha[i_valor_compra]),
+                'imagem': linha[i_imagem],
+                'especificacoes': linha[i_especificacoes],
+                'data_criacao': linha[i_criacao],
+                'data_atualizacao': linha[i_atualizacao]
+            }
+    return mapear
+
+def mapeador_vendas(description):
+    """
+    Retorna uma função que converte uma linha (tupla) de vendas no dict da API.
+    Se a consulta trouxer produto_titulo_final (JOIN com produtos), ele é usado quando a venda
+    não tem produto_titulo; sem nenhum dos dois, o título é 'Produto Deletado'.
+    """
+    indice = _indices_colunas(description)
+    i_id, i_produto_id, i_titulo = indice['id'], indice['produto_id'], indice['produto_titulo']
+    i_titulo_final = indice.get('produto_titulo_final')
+    i_valor_venda, i_valor_compra = indice['valor_venda'], indice['valor_compra']
+    i_data_venda, i_onde_vendeu = indice['data_venda'], indice['onde_vendeu']
+    i_observacoes, i_criacao = indice['observacoes'], indice['data_criacao']
+    def titulo(linha):
+        return linha[i_titulo] or (linha[i_titulo_final] if i_titulo_final is not None else None) or 'Produto Deletado'
+    
+    if DATABASE_TYPE == 'postgresql':
+        def mapear(linha):
+            valor_venda = float(linha[i_valor_venda] or 0)
+            valor_compra = float(linha[i_valor_compra] or 0)
+            lucro = valor_venda - valor_compra
+            data_venda = linha[i_data_venda]
+            data_criacao = linha[i_criacao]
+            return {
+                'id': linha[i_id],
+                'produto_id': linha[i_produto_id],  # Pode ser NULL se produto foi deletado
+                'produto_titulo': titulo(linha),
+                'valor_venda': valor_venda,
+                'valor_compra': valor_compra,
+                'lucro': lucro,
+                'porcentagem_lucro': round((lucro / valor_compra * 100) if valor_compra > 0 else 0, 2),
+                'data_venda': data_venda.isoformat() if type(data_venda) is date else (
+                    data_venda.strftime('%Y-%m-%d') if hasattr(data_venda, 'strftime') else _data_venda_texto(data_venda)
+                ),
+                'onde_vendeu': linha[i_onde_vendeu],
+                'observacoes': linha[i_observacoes],
+                'data_criacao': data_criacao.isoformat() if hasattr(data_criacao, 'isoformat') else str(data_criacao)
+            }
+    else:
+        def mapear(linha):
+            valor_venda = _float_sqlite(linha[i_valor_venda])
+            valor_compra = _float_sqlite(linha[i_valor_compra])
+            lucro = valor_venda - valor_compra
+            return {
+                'id': linha[i_id],
+                'produto_id': linha[i_produto_id],  # Pode ser NULL se produto foi deletado
+                'produto_titulo': titulo(linha),
+                'valor_venda': valor_venda,
+                'valor_compra': valor_compra,
+                'lucro': lucro,
+                'porcentagem_lucro': round((lucro / valor_compra * 100) if valor_compra > 0 else 0, 2),
+                'data_venda': _data_venda_texto(linha[i_data_venda]),
+                'onde_vendeu': linha[i_onde_vendeu],
+                'observacoes': linha[i_observacoes] or '',
+                'data_criacao': linha[i_criacao]
+            }
+    return mapear
 
-def venda_para_dict(venda, produto_titulo=None):
-    """Converte uma venda (Row/Dict) em dicionário"""
+# Formato colunar das listagens: {campo: [valores]} com os mesmos valores dos mapeadores acima,
+# convertidos coluna a coluna a partir das tuplas do cursor, sem montar um dict por linha
+def _transpor(description, linhas):
+    """Tuplas de linhas -> dict nome da coluna: tupla de valores"""
+    nomes = [coluna[0] for coluna in description]
+    if not linhas:
+        return {nome: () for nome in nomes}
+    return dict(zip(nomes, zip(*linhas)))
+
+def colunas_produtos(description, linhas):
+    """Colunas da API de produtos (mesmos campos e valores de mapeador_produtos)"""
+    c = _transpor(description, linhas)
     if DATABASE_TYPE == 'postgresql':
-        valor_venda = float(venda.get('valor_venda', 0) or 0)
-        valor_compra = float(venda.get('valor_compra', 0) or 0)
-        lucro = valor_venda - valor_compra
-        porcentagem_lucro = (lucro / valor_compra * 100) if valor_compra > 0 else 0
-        
-        # Usar produto_titulo da tabela vendas se disponível, senão usar o passado como parâmetro
-        titulo_final = venda.get('produto_titulo') or produto_titulo or 'Produto Deletado'
-        
-        return {
-            'id': venda['id'],
-            'produto_id': venda.get('produto_id'),  # Pode ser NULL se produto foi deletado
-            'produto_titulo': titulo_final,
-            'valor_venda': valor_venda,
-            'valor_compra': valor_compra,
-            'lucro': lucro,
-            'porcentagem_lucro': round(porcentagem_lucro, 2),
-            'data_venda': venda['data_venda'].strftime('%Y-%m-%d') if hasattr(venda['data_venda'], 'strftime') else str(venda['data_venda']).split('T')[0].split(' ')[0],
-            'onde_vendeu': venda['onde_vendeu'],
-            'observacoes': venda.get('observacoes', ''),
-            'data_criacao': venda['data_criacao'].isoformat() if hasattr(venda['data_criacao'], 'isoformat') else str(venda['data_criacao'])
-        }
+        quantidade = [int(v or 0) for v in c['quantidade']]
+        valor_compra = [float(v or 0) for v in c['valor_compra']]
+        data_criacao = [v.isoformat() if v else '' for v in c['data_criacao']]
+        data_atualizacao = [v.isoformat() if v else '' for v in c['data_atualizacao']]
     else:
-        # SQLite
-        try:
-            valor_venda = float(venda['valor_venda'] if venda['valor_venda'] is not None else 0)
-        except (KeyError, ValueError, TypeError):
-            valor_venda = 0.0
-        
-        try:
-            valor_compra = float(venda['valor_compra'] if venda['valor_compra'] is not None else 0)
-        except (KeyError, ValueError, TypeError):
-            valor_compra = 0.0
-        
-        lucro = valor_venda - valor_compra
-        porcentagem_lucro = (lucro / valor_compra * 100) if valor_compra > 0 else 0
-        
-        # Usar produto_titulo da tabela vendas se disponível, senão usar o passado como parâmetro
-        titulo_final = venda.get('produto_titulo') or produto_titulo or 'Produto Deletado'
-        
-        return {
-            'id': venda['id'],
-            'produto_id': venda.get('produto_id'),  # Pode ser NULL se produto foi deletado
-            'produto_titulo': titulo_final,
-            'valor_venda': valor_venda,
-            'valor_compra': valor_compra,
-            'lucro': lucro,
-            'porcentagem_lucro': round(porcentagem_lucro, 2),
-            'data_venda': venda['data_venda'].split('T')[0].split(' ')[0] if isinstance(venda['data_venda'], str) else str(venda['data_venda']).split('T')[0].split(' ')[0],
-            'onde_vendeu': venda['onde_vendeu'],
-            'observacoes': venda.get('observacoes', '') or '',
-            'data_criacao': venda['data_criacao']
-        }
+        quantidade = [_int_sqlite(v) for v in c['quantidade']]
+        valor_compra = [_float_sqlite(v) for v in c['valor_compra']]
+        data_criacao = list(c['data_criacao'])
+        data_atualizacao = list(c['data_atualizacao'])
+    return {
+        'id': list(c['id']),
+        'titulo': list(c['titulo']),
+        'descricao': list(c['descricao']),
+        'quantidade': quantidade,
+        'valor_compra': valor_compra,
+        'imagem': list(c['imagem']),
+        'especificacoes': list(c['especificacoes']),
+        'data_criacao': data_criacao,
+        'data_atualizacao': data_atualizacao
+    }
+
+def colunas_vendas(description, linhas):
+    """Colunas da API de vendas (mesmos campos e valores de mapeador_vendas)"""
+    c = _transpor(description, linhas)
+    titulos_finais = c.get('produto_titulo_final') or [None] * len(linhas)
+    produto_titulo = [t or tf or 'Produto Deletado' for t, tf in zip(c['produto_titulo'], titulos_finais)]
+    if DATABASE_TYPE == 'postgresql':
+        valor_venda = [float(v or 0) for v in c['valor_venda']]
+        valor_compra = [float(v or 0) for v in c['valor_compra']]
+        data_venda = [
+            v.isoformat() if type(v) is date else (v.strftime('%Y-%m-%d') if hasattr(v, 'strftime') else _data_venda_texto(v))
+            for v in c['data_venda']
+        ]
+        observacoes = list(c['observacoes'])
+        data_criacao = [v.isoformat() if hasattr(v, 'isoformat') else str(v) for v in c['data_criacao']]
+    else:
+        valor_venda = [_float_sqlite(v) for v in c['valor_venda']]
+        valor_compra = [_float_sqlite(v) for v in c['valor_compra']]
+        data_venda = [_data_venda_texto(v) for v in c['data_venda']]
+        observacoes = [v or '' for v in c['observacoes']]
+        data_criacao = list(c['data_criacao'])
+    lucro = [venda - compra for venda, compra in zip(valor_venda, valor_compra)]
+    return {
+        'id': list(c['id']),
+        'produto_id': list(c['produto_id']),
+        'produto_titulo': produto_titulo,
+        'valor_venda': valor_venda,
+        'valor_compra': valor_compra,
+        'lucro': lucro,
+        'porcentagem_lucro': [round((l / compra * 100) if compra > 0 else 0, 2) for l, compra in zip(lucro, valor_compra)],
+        'data_venda': data_venda,
+        'onde_vendeu': list(c['onde_vendeu']),
+        'observacoes': observacoes,
+        'data_criacao': data_criacao
+    }
+
+def mapear_linhas(cursor, criar_mapeador, linhas):
+    """Converte as linhas já lidas de `cursor` com o mapeador montado a partir de cursor.description"""
+    if not linhas:
+        return []
+    mapear = criar_mapeador(cursor.description)
+    return [mapear(linha) for linha in linhas]
@@ -0,0 +1,73 @@
+"""
+Provedor JSON do Flask (app.json) com orjson opcional
+
+Com o orjson instalado, jsonify/request.get_json usam orjson, várias vezes mais rápido que o
+json da biblioteca padrão nas listas grandes de produtos e vendas. Sem ele, cai para o json
+padrão com as mesmas opções, então o JSON tem o mesmo conteúdo nos dois casos:
+- chaves ordenadas e separadores compactos (como o jsonify padrão fora do modo debug)
+- UTF-8 sem escapes \\uXXXX (o orjson não tem ensure_ascii)
+- datetime/date em ISO 8601 e Decimal como número
+
+Diferenças aceitas entre os dois:
+- expoente de floats muito grandes ou pequenos (mesmo valor decodificado): 1e16 e 1.5e-7 no
+  orjson, 1e+16 e 1.5e-07 no json
+- NaN/Infinity viram null no orjson (o json escreve NaN, que não é JSON válido)
+- inteiros fora de 64 bits: o orjson recusa (TypeError); ids e quantidades nunca chegam lá
+Nos valores das respostas da API (preços com 2 casas, datas, textos) a saída é a mesma
+byte a byte; benchmark_json.py confere isso.
+"""
+import json
+import decimal
+from datetime import date, datetime, time
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_DISPONIVEL = True
+except ImportError:
+    orjson = None
+    ORJSON_DISPONIVEL = False
+
+
+def _converter(valor):
+    """Tipos que nenhum dos dois serializadores conhece nativamente (Decimal, e date/datetime no json)"""
+    if isinstance(valor, decimal.Decimal):
+        return float(valor)
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    if hasattr(valor, '__html__'):
+        return str(valor.__html__())
+    raise TypeError(f'Objeto do tipo {type(valor).__name__} não é serializável em JSON')
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    """DefaultJSONProvider que usa orjson quando disponível"""
+
+    ensure_ascii = False
+    sort_keys = True
+    usar_orjson = ORJSON_DISPONIVEL
+
+    def dumps(self, obj, **kwargs):
+        if self.usar_orjson:
+            opcoes = orjson.OPT_NON_STR_KEYS
+            if kwargs.get('sort_keys', self.sort_keys):
+                opcoes |= orjson.OPT_SORT_KEYS
+            if kwargs.get('indent'):
+                opcoes |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=_converter, option=opcoes).decode('utf-8')
+        kwargs.setdefault('default', _converter)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        # O orjson é sempre compacto; usar o mesmo formato para a saída não depender da biblioteca
+        if not kwargs.get('indent'):
+            kwargs['separators'] = (',', ':')
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.usar_orjson and not kwargs:
+            # orjson.JSONDecodeError herda de ValueError, tratado pelo Flask como JSON inválido (400)
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Confere e reconstrói a tabela agregada vendas_resumo_mensal
+As rotas de vendas mantêm o resumo atualizado na mesma transação; este script serve para
+conferir se ele bate com a tabela vendas e reconstruí-lo se alguém alterou vendas direto no banco.
+
+Uso:
+    python3 recalcular_resumo_vendas.py --verificar   # só compara (sai com código 1 se divergir)
+    python3 recalcular_resumo_vendas.py               # reconstrói do zero
+"""
+
+import sys
+from models import init_db, get_db, recalcular_resumo_vendas, divergencias_resumo_vendas, DATABASE_TYPE
+
+def verificar():
+    """Retorna True se o resumo mensal bate com a tabela vendas"""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        divergencias = divergencias_resumo_vendas(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+    for (mes, onde_vendeu, produto_id), esperado, atual in divergencias[:20]:
+        print(f"  {mes} {onde_vendeu} produto {produto_id}: esperado {esperado}, no resumo {atual}")
+    if len(divergencias) > 20:
+        print(f"  ... e mais {len(divergencias) - 20}")
+    return not divergencias
+
+def recalcular():
+    """Reconstrói o resumo mensal em uma única transação"""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        recalcular_resumo_vendas(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    print(f"📊 Tipo de banco: {DATABASE_TYPE}")
+    init_db()
+    
+    if '--verificar' in sys.argv:
+        if verificar():
+            print("✅ Resumo mensal confere com a tabela vendas")
+        else:
+            print("❌ Resumo mensal divergente. Rode sem --verificar para reconstruir.")
+            exit(1)
+    else:
+        recalcular()
+        print("✅ Resumo mensal reconstruído")
@@ -8,6 +8,15 @@ let vendas = [];
 let vendasFiltradas = [];
 let observacoesCount = 0;
 
+// Paginação por cursor: as listas são carregadas aos poucos conforme o usuário rola
+const TAMANHO_PAGINA = 50;
+let proximoCursorProdutos = null;
+let proximoCursorVendas = null;
+let resumoVendasPorMes = {};
+// Um por lista: uma página de produtos ainda chegando não bloqueia a rolagem das vendas
+let carregandoPaginaProdutos = false;
+let carregandoPaginaVendas = false;
+
 // Imagem placeholder padrão (caixa de papelão com "Sem Foto")
 const IMAGEM_PLACEHOLDER = `data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMjAwIiBoZWlnaHQ9IjIwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KICA8cmVjdCB3aWR0aD0iMjAwIiBoZWlnaHQ9IjIwMCIgZmlsbD0iI2Y1ZjVmNSIvPgogIDxnIHRyYW5zZm9ybT0idHJhbnNsYXRlKDUwLCA0MCkiPgogICAgPHBhdGggZD0iTSAyMCAzMCBMIDYwIDEwIEwgMTAwIDMwIEwgNjAgNTAgWiIgZmlsbD0iIzhCNDUxMyIgc3Ryb2tlPSIjNjU0MzIxIiBzdHJva2Utd2lkdGg9IjEiLz4KICAgIDxwYXRoIGQ9Ik0gMjAgMzAgTCA2MCA1MCBMIDYwIDkwIEwgMjAgNzAgWiIgZmlsbD0iI0EwNTIyRCIgc3Ryb2tlPSIjNjU0MzIxIiBzdHJva2Utd2lkdGg9IjEiLz4KICAgIDxwYXRoIGQ9Ik0gNjAgNTAgTCAxMDAgMzAgTCAxMDAgNzAgTCA2MCA5MCBaIiBmaWxsPSIjQ0Q4NTNGIiBzdHJva2U9IiM2NTQzMjEiIHN0cm9rZS13aWR0aD0iMSIvPgogICAgPGxpbmUgeDE9IjYwIiB5MT0iMTAiIHgyPSI2MCIgeTI9IjkwIiBzdHJva2U9IiM2NTQzMjEiIHN0cm9rZS13aWR0aD0iMS41Ii8+CiAgICA8cmVjdCB4PSIyNSIgeT0iNDUiIHdpZHRoPSIyMCIgaGVpZ2h0PSIxNSIgZmlsbD0iI2ZmZiIgb3BhY2l0eT0iMC45IiByeD0iMiIvPgogICAgPGcgdHJhbnNmb3JtPSJ0cmFuc2xhdGUoNzUsIDM1KSI+CiAgICAgIDxlbGxpcHNlIGN4PSIwIiBjeT0iOCIgcng9IjQiIHJ5PSI2IiBmaWxsPSIjMzMzIiBvcGFjaXR5PSIwLjciLz4KICAgICAgPGxpbmUgeDE9Ii0zIiB5MT0iNSIgeDI9IjMiIHkyPSI1IiBzdHJva2U9IiMzMzMiIHN0cm9rZS13aWR0aD0iMSIvPgogICAgPC9nPgogICAgPGcgdHJhbnNmb3JtPSJ0cmFuc2xhdGUoODUsIDUwKSI+CiAgICAgIDxwYXRoIGQ9Ik0gMCAwIEwgNSA1IEwgLTUgNSBaIiBmaWxsPSIjMzMzIiBvcGFjaXR5PSIwLjciLz4KICAgICAgPHBhdGggZD0iTSAwIDUgTCA1IDEwIEwgLTUgMTAgWiIgZmlsbD0iIzMzMyIgb3BhY2l0eT0iMC43Ii8+CiAgICA8L2c+CiAgPC9nPgogIDx0ZXh0IHg9IjUwJSIgeT0iMTYwIiBmb250LWZhbWlseT0iQXJpYWwsIHNhbnMtc2VyaWYiIGZvbnQtc2l6ZT0iMTQiIGZpbGw9IiM5OTk5OTkiIHRleHQtYW5jaG9yPSJtaWRkbGUiIGZvbnQtd2VpZ2h0PSI1MDAiPlNlbSBGb3RvPC90ZXh0Pgo8L3N2Zz4=`;
 
@@ -51,8 +60,24 @@ document.addEventListener('DOMContentLoaded', () => {
     // Configurar campos de quantidade quando a página carregar
     setTimeout(() => configurarCamposQuantidade(), 100);
     
+    // Receber alterações feitas em outras abas/aparelhos
+    conectarEventos();
+    
     const produtosContainer = document.getElementById('produtos-container');
     
+    // Carregar a próxima página quando o fim da lista aparecer na tela
+    if ('IntersectionObserver' in window) {
+        const observer = new IntersectionObserver((entries) => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                carregarMaisSeVisivel();
+            }
+        }, { rootMargin: '200px' });
+        observer.observe(document.getElementById('produtos-sentinela'));
+        observer.observe(document.getElementById('vendas-sentinela'));
+    } else {
+        window.addEventListener('scroll', carregarMaisSeVisivel, { passive: true });
+    }
+    
     // Função para verificar se está no topo da página
     function estaNoTopo() {
         const scrollTop = window.pageYOffset || document.documentElement.scrollTop;
@@ -151,18 +176,126 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 });
 
-// Carregar produtos do servidor
+// Buscar uma página de uma listagem (/api/produtos ou /api/vendas)
+// O cursor da próxima página vem no header X-Proximo-Cursor (ausente na última página)
+// Respostas GET já recebidas, por URL. O servidor manda um ETag; na próxima vez enviamos
+// If-None-Match e, se nada mudou (304), reaproveitamos os dados sem baixar a lista de novo
+const respostasComEtag = new Map();
+const LIMITE_RESPOSTAS_COM_ETAG = 50;
+
+async function buscarComEtag(url) {
+    const anterior = respostasComEtag.get(url);
+    const response = await fetch(url, {
+        cache: 'no-store',
+        headers: anterior ? { 'If-None-Match': anterior.etag } : {}
+    });
+    if (response.status === 304 && anterior) {
+        return { ok: true, status: 200, headers: anterior.headers, json: async () => anterior.dados };
+    }
+    const etag = response.headers.get('ETag');
+    if (!response.ok || !etag) {
+        return response;
+    }
+    const dados = await response.json();
+    respostasComEtag.delete(url);
+    respostasComEtag.set(url, { etag, dados, headers: response.headers });
+    if (respostasComEtag.size > LIMITE_RESPOSTAS_COM_ETAG) {
+        // Map mantém a ordem de inserção: descartar a resposta mais antiga
+        respostasComEtag.delete(respostasComEtag.keys().next().value);
+    }
+    return { ok: true, status: response.status, headers: response.headers, json: async () => dados };
+}
+
+// Formato colunar ({total, colunas: {campo: [valores]}}): cada nome de campo vem uma vez por
+// página em vez de uma vez por item, então o JSON é menor e mais rápido de interpretar
+function itensDeColunas({ total, colunas }) {
+    const campos = Object.keys(colunas);
+    const itens = new Array(total);
+    for (let i = 0; i < total; i++) {
+        const item = {};
+        for (const campo of campos) {
+            item[campo] = colunas[campo][i];
+        }
+        itens[i] = item;
+    }
+    return itens;
+}
+
+function urlPagina(url, cursor = null, filtros = {}) {
+    const params = new URLSearchParams({ ...filtros, limit: TAMANHO_PAGINA, formato: 'colunar' });
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    return `${url}?${params}`;
+}
+
+async function buscarPagina(url, cursor = null, filtros = {}) {
+    const response = await buscarComEtag(urlPagina(url, cursor, filtros));
+    if (!response.ok) {
+        throw new Error('Erro ao carregar ' + url);
+    }
+    return {
+        itens: itensDeColunas(await response.json()),
+        proximoCursor: response.headers.get('X-Proximo-Cursor')
+    };
+}
+
+// Verificar se o fim da lista está visível (para carregar a próxima página)
+function sentinelaVisivel(id) {
+    const sentinela = document.getElementById(id);
+    if (!sentinela || sentinela.offsetParent === null) return false;
+    return sentinela.getBoundingClientRect().top < window.innerHeight + 200;
+}
+
+// Carregar produtos do servidor (primeira página, na ordenação escolhida)
 async function carregarProdutos() {
+    const ordem = ordenacaoAtual;
     try {
-        const response = await fetch('/api/produtos');
-        produtos = await response.json();
-        produtosFiltrados = [...produtos];
-        ordenarProdutos();
+        const pagina = await buscarPagina('/api/produtos', null, { ordem });
+        // A ordenação mudou enquanto a página chegava: vale a resposta da nova
+        if (ordem !== ordenacaoAtual) return;
+        produtos = pagina.itens;
+        proximoCursorProdutos = pagina.proximoCursor;
+        filtrarProdutos();
+        carregarMaisSeVisivel();
     } catch (error) {
         mostrarMensagem('Erro ao carregar produtos: ' + error.message, 'erro');
     }
 }
 
+// Carregar a próxima página de produtos
+async function carregarMaisProdutos() {
+    if (!proximoCursorProdutos || carregandoPaginaProdutos) return;
+    carregandoPaginaProdutos = true;
+    const ordem = ordenacaoAtual;
+    try {
+        const pagina = await buscarPagina('/api/produtos', proximoCursorProdutos, { ordem });
+        if (ordem !== ordenacaoAtual) return;
+        produtos = produtos.concat(pagina.itens);
+        proximoCursorProdutos = pagina.proximoCursor;
+        if (!buscaProdutosAtiva()) {
+            produtosFiltrados = [...produtos];
+            ordenarProdutos();
+        }
+    } catch (error) {
+        mostrarMensagem('Erro ao carregar produtos: ' + error.message, 'erro');
+    } finally {
+        carregandoPaginaProdutos = false;
+    }
+    carregarMaisSeVisivel();
+}
+
+// Se o fim da lista continua visível depois de renderizar, buscar mais uma página
+function carregarMaisSeVisivel() {
+    if (abaAtual === 'vendas') {
+        if (proximoCursorVendas && sentinelaVisivel('vendas-sentinela')) {
+            carregarMaisVendas();
+        }
+    } else if (proximoCursorProdutos && !buscaProdutosAtiva() && sentinelaVisivel('produtos-sentinela')) {
+        carregarMaisProdutos();
+    }
+}
+
 // Atualizar produtos (com loading overlay)
 async function atualizarProdutos(silencioso = false) {
     const btnRefresh = document.getElementById('btn-refresh');
@@ -175,14 +308,10 @@ async function atualizarProdutos(silencioso = false) {
     }
     
     try {
-        const response = await fetch('/api/produtos');
-        produtos = await response.json();
+        const pagina = await buscarPagina('/api/produtos', null, { ordem: ordenacaoAtual });
+        produtos = pagina.itens;
+        proximoCursorProdutos = pagina.proximoCursor;
         produtosFiltrados = [...produtos];
-        
-        // Manter ordenação atual
-        const ordenacaoAtual = document.getElementById('ordenacao').value;
-        ordenarProdutos();
-        document.getElementById('ordenacao').value = ordenacaoAtual;
         ordenarProdutos();
         
         if (!silencioso) {
@@ -271,28 +400,66 @@ function renderizarEspecificacoes(especificacoesStr) {
     }
 }
 
-// Filtrar produtos
+// Filtrar produtos (busca feita no servidor, com atraso para não disparar a cada tecla)
+let buscaProdutosTimeout = null;
+let buscaProdutosSequencia = 0;
+
+function buscaProdutosAtiva() {
+    const busca = document.getElementById('busca');
+    return busca && busca.value.trim() !== '';
+}
+
 function filtrarProdutos() {
-    const busca = document.getElementById('busca').value.toLowerCase();
-    if (busca === '') {
+    clearTimeout(buscaProdutosTimeout);
+    if (!buscaProdutosAtiva()) {
         produtosFiltrados = [...produtos];
+        ordenarProdutos();
+        return;
+    }
+    buscaProdutosTimeout = setTimeout(buscarProdutosServidor, 250);
+}
+
+async function buscarProdutosServidor() {
+    const termo = document.getElementById('busca').value.trim();
+    // Descartar respostas de buscas antigas que cheguem fora de ordem
+    const sequencia = ++buscaProdutosSequencia;
+    try {
+        const response = await buscarComEtag(`/api/produtos/busca?q=${encodeURIComponent(termo)}`);
+        if (!response.ok) {
+            throw new Error('Erro na busca');
+        }
+        const resultados = await response.json();
+        if (sequencia !== buscaProdutosSequencia || !buscaProdutosAtiva()) return;
+        produtosFiltrados = resultados;
+        ordenarProdutos();
+    } catch (error) {
+        mostrarMensagem('Erro ao buscar produtos: ' + error.message, 'erro');
+    }
+}
+
+// Trocar a ordenação: a lista paginada vem ordenada do servidor (?ordem=), então recomeça
+// da primeira página; ordenar só as páginas já carregadas deixaria itens fora de ordem
+function mudarOrdenacao() {
+    ordenacaoAtual = document.getElementById('ordenacao').value;
+    if (buscaProdutosAtiva()) {
+        ordenarProdutos();
     } else {
-        produtosFiltrados = produtos.filter(produto => 
-            produto.titulo.toLowerCase().includes(busca) ||
-            (produto.descricao && produto.descricao.toLowerCase().includes(busca))
-        );
+        carregarProdutos();
     }
-    ordenarProdutos();
 }
 
-// Ordenar produtos
+// Renderizar produtos na ordenação atual
 function ordenarProdutos() {
-    const ordenacao = document.getElementById('ordenacao').value;
-    ordenacaoAtual = ordenacao;
+    // Sem busca, as páginas já estão na ordem do servidor
+    if (!buscaProdutosAtiva()) {
+        renderizarProdutos(produtosFiltrados);
+        return;
+    }
     
+    // Resultados da busca não são paginados: ordenar aqui
     const produtosParaOrdenar = [...produtosFiltrados];
     
-    switch(ordenacao) {
+    switch(ordenacaoAtual) {
         case 'nome':
             produtosParaOrdenar.sort((a, b) => 
                 a.titulo.localeCompare(b.titulo, 'pt-BR', { sensitivity: 'base' })
@@ -408,7 +575,7 @@ async function editarProduto(id) {
     document.getElementById('modal-produto').style.display = 'block';
     
     try {
-        const response = await fetch(`/api/produtos/${id}`);
+        const response = await buscarComEtag(`/api/produtos/${id}`);
         const produto = await response.json();
         
         // Preencher campos
@@ -632,9 +799,6 @@ async function salvarProduto(event) {
             mostrarMensagem(data.mensagem || 'Produto salvo com sucesso!', 'sucesso');
             fecharModal();
             await carregarProdutos();
-            // Restaurar ordenação após recarregar
-            document.getElementById('ordenacao').value = ordenacaoAtual;
-            ordenarProdutos();
         } else {
             mostrarMensagem(data.erro || 'Erro ao salvar produto', 'erro');
             // Reabilitar botões em caso de erro
@@ -675,9 +839,6 @@ async function deletarProduto(id) {
         if (response.ok) {
             mostrarMensagem(data.mensagem || 'Produto excluído com sucesso!', 'sucesso');
             await carregarProdutos();
-            // Restaurar ordenação após recarregar
-            document.getElementById('ordenacao').value = ordenacaoAtual;
-            ordenarProdutos();
         } else {
             mostrarMensagem(data.erro || 'Erro ao excluir produto', 'erro');
         }
@@ -738,11 +899,14 @@ function mostrarAba(aba) {
     
     // Carregar conteúdo da aba
     if (aba === 'vendas') {
-        // Limpar busca ao trocar para aba de vendas
-        const buscaVendas = document.getElementById('busca-vendas');
-        if (buscaVendas) {
-            buscaVendas.value = '';
-        }
+        // Limpar busca e filtros ao trocar para aba de vendas
+        ['busca-vendas', 'filtro-vendas-de', 'filtro-vendas-ate', 'filtro-vendas-onde', 'filtro-vendas-valor-min',
+         'filtro-vendas-valor-max', 'filtro-vendas-lucro-min', 'filtro-vendas-lucro-max'].forEach(id => {
+            const campo = document.getElementById(id);
+            if (campo) {
+                campo.value = '';
+            }
+        });
         carregarVendas();
     } else {
         carregarProdutos();
@@ -760,133 +924,132 @@ function atualizarConteudo() {
 // ==================== FUNÇÕES DE VENDAS ====================
 async function carregarVendas() {
     try {
-        const response = await fetch('/api/vendas');
-        if (!response.ok) {
-            throw new Error('Erro ao carregar vendas');
-        }
-        vendas = await response.json();
-        vendasFiltradas = [...vendas];
-        filtrarVendas();
+        const filtros = filtrosVendas();
+        // O total de cada mês vem do resumo calculado no servidor: não depende de
+        // todas as vendas do mês já terem sido carregadas
+        const [pagina, resumo] = await Promise.all([
+            buscarPagina('/api/vendas', null, filtros),
+            carregarResumoVendas(filtros)
+        ]);
+        vendas = pagina.itens;
+        proximoCursorVendas = pagina.proximoCursor;
+        resumoVendasPorMes = resumo;
+        vendasFiltradas = vendas;
+        renderizarVendas();
+        carregarMaisSeVisivel();
     } catch (error) {
         mostrarMensagem('Erro ao carregar vendas: ' + error.message, 'erro');
     }
 }
 
-function filtrarVendas() {
-    const busca = document.getElementById('busca-vendas');
-    if (!busca) {
+// Resumo mensal (GET /api/vendas/resumo), indexado por 'AAAA-MM'
+async function carregarResumoVendas(filtros = {}) {
+    try {
+        const response = await buscarComEtag(`/api/vendas/resumo?${new URLSearchParams(filtros)}`);
+        if (!response.ok) return {};
+        const meses = await response.json();
+        return Object.fromEntries(meses.map(mes => [mes.mes, mes]));
+    } catch (error) {
+        return {};
+    }
+}
+
+// Carregar a próxima página de vendas
+async function carregarMaisVendas() {
+    if (!proximoCursorVendas || carregandoPaginaVendas) return;
+    carregandoPaginaVendas = true;
+    try {
+        const pagina = await buscarPagina('/api/vendas', proximoCursorVendas, filtrosVendas());
+        vendas = vendas.concat(pagina.itens);
+        proximoCursorVendas = pagina.proximoCursor;
+        vendasFiltradas = vendas;
         renderizarVendas();
-        return;
+    } catch (error) {
+        mostrarMensagem('Erro ao carregar vendas: ' + error.message, 'erro');
+    } finally {
+        carregandoPaginaVendas = false;
     }
-    
-    const termoBusca = busca.value.toLowerCase().trim();
-    
-    if (termoBusca === '') {
-        vendasFiltradas = [...vendas];
-    } else {
-        vendasFiltradas = vendas.filter(venda => {
-            // Buscar por nome do produto
-            const produtoMatch = venda.produto_titulo && 
-                venda.produto_titulo.toLowerCase().includes(termoBusca);
-            
-            // Buscar por data (formato brasileiro)
-            let dataMatch = false;
-            if (venda.data_venda) {
-                const partesData = venda.data_venda.split('T')[0].split('-');
-                if (partesData.length === 3) {
-                    const dataLocal = new Date(parseInt(partesData[0]), parseInt(partesData[1]) - 1, parseInt(partesData[2]));
-                    const dataFormatada = dataLocal.toLocaleDateString('pt-BR');
-                    dataMatch = dataFormatada.includes(termoBusca);
-                }
-            }
-            
-            // Buscar por onde vendeu
-            const ondeVendeu = venda.onde_vendeu === 'mercado_livre' ? 'mercado livre' : 'shopee';
-            const ondeMatch = ondeVendeu.includes(termoBusca);
-            
-            // Buscar por observações
-            const obsMatch = venda.observacoes && 
-                venda.observacoes.toLowerCase().includes(termoBusca);
-            
-            // Buscar por valores (R$ 100, 100.00, 100,50, etc)
-            // Normalizar termo de busca: aceitar tanto ponto quanto vírgula
-            const termoNormalizado = termoBusca.replace(',', '.');
-            const termoSemSeparador = termoBusca.replace(/[,.]/g, '');
-            
-            // Função auxiliar para normalizar valores para comparação
-            const normalizarValor = (valor) => {
-                if (!valor) return '';
-                // Converter para string e normalizar para ponto
-                const str = valor.toString();
-                // Se for número, formatar com 2 casas decimais
-                const num = parseFloat(str);
-                if (!isNaN(num)) {
-                    return num.toFixed(2).replace('.', '');
-                }
-                return str.replace(/[,.]/g, '');
-            };
-            
-            // Valor de venda: buscar tanto com ponto quanto com vírgula
-            let valorVendaMatch = false;
-            if (venda.valor_venda) {
-                const valorNormalizado = normalizarValor(venda.valor_venda);
-                const valorPonto = venda.valor_venda.toFixed(2);
-                const valorVirgula = valorPonto.replace('.', ',');
-                valorVendaMatch = valorNormalizado.includes(termoSemSeparador) ||
-                                 valorPonto.includes(termoNormalizado) || 
-                                 valorVirgula.includes(termoBusca) ||
-                                 valorPonto.includes(termoBusca.replace(',', '.'));
-            }
-            
-            // Valor de compra: buscar tanto com ponto quanto com vírgula
-            let valorCompraMatch = false;
-            if (venda.valor_compra) {
-                const valorNormalizado = normalizarValor(venda.valor_compra);
-                const valorPonto = venda.valor_compra.toFixed(2);
-                const valorVirgula = valorPonto.replace('.', ',');
-                valorCompraMatch = valorNormalizado.includes(termoSemSeparador) ||
-                                  valorPonto.includes(termoNormalizado) || 
-                                  valorVirgula.includes(termoBusca) ||
-                                  valorPonto.includes(termoBusca.replace(',', '.'));
-            }
-            
-            // Buscar por lucro (valor em reais)
-            const lucro = venda.lucro || 0;
-            const lucroNormalizado = normalizarValor(lucro);
-            const lucroPonto = lucro.toFixed(2);
-            const lucroVirgula = lucroPonto.replace('.', ',');
-            const lucroMatch = lucroNormalizado.includes(termoSemSeparador) ||
-                              lucroPonto.includes(termoNormalizado) || 
-                              lucroVirgula.includes(termoBusca) ||
-                              lucroPonto.includes(termoBusca.replace(',', '.'));
-            
-            // Buscar por porcentagem de lucro
-            const porcentagemLucro = venda.porcentagem_lucro || 0;
-            const porcentagemNormalizada = normalizarValor(porcentagemLucro);
-            const porcentagemPonto = porcentagemLucro.toFixed(2);
-            const porcentagemVirgula = porcentagemPonto.replace('.', ',');
-            const porcentagemMatch = porcentagemNormalizada.includes(termoSemSeparador) ||
-                                    porcentagemPonto.includes(termoNormalizado) || 
-                                    porcentagemVirgula.includes(termoBusca) ||
-                                    porcentagemPonto.includes(termoBusca.replace(',', '.')) ||
-                                    (`${porcentagemLucro >= 0 ? '+' : ''}${porcentagemVirgula}%`).toLowerCase().includes(termoBusca);
-            
-            return produtoMatch || dataMatch || ondeMatch || obsMatch || 
-                   valorVendaMatch || valorCompraMatch || lucroMatch || porcentagemMatch;
-        });
+    carregarMaisSeVisivel();
+}
+
+// Filtros de vendas aplicados no servidor
+// (GET /api/vendas?q=&de=&ate=&onde_vendeu=&valor_min=&valor_max=&lucro_min=&lucro_max=)
+let filtrarVendasTimeout = null;
+
+// A caixa de busca aceita, além de texto (produto/observação), um valor ("R$ 100,50"),
+// um canal ("shopee", "mercado livre") ou uma data ("15/03/2024", "03/2024"),
+// convertidos nos filtros correspondentes do servidor
+function interpretarBuscaVendas(texto) {
+    const termo = texto.toLowerCase().trim();
+    if (termo === '') return {};
+
+    const valor = termo.match(/^(?:r\$\s*)?(\d+)(?:[.,](\d{1,2}))?$/);
+    if (valor) {
+        const numero = `${valor[1]}.${valor[2] || '0'}`;
+        return { valor_min: numero, valor_max: numero };
     }
-    
-    renderizarVendas();
+
+    const canal = termo.replace(/[_\s]+/g, ' ');
+    if (canal === 'shopee') return { onde_vendeu: 'shopee' };
+    if (canal === 'mercado livre' || canal === 'mercadolivre') return { onde_vendeu: 'mercado_livre' };
+
+    const dia = termo.match(/^(\d{1,2})\/(\d{1,2})\/(\d{4})$/);
+    if (dia) {
+        const data = `${dia[3]}-${dia[2].padStart(2, '0')}-${dia[1].padStart(2, '0')}`;
+        return { de: data, ate: data };
+    }
+    const mes = termo.match(/^(\d{1,2})\/(\d{4})$/);
+    if (mes) {
+        const ultimoDia = new Date(parseInt(mes[2]), parseInt(mes[1]), 0).getDate();
+        const prefixo = `${mes[2]}-${mes[1].padStart(2, '0')}`;
+        return { de: `${prefixo}-01`, ate: `${prefixo}-${ultimoDia}` };
+    }
+
+    return { q: texto.trim() };
+}
+
+function filtrosVendas() {
+    const busca = document.getElementById('busca-vendas');
+    // Os campos específicos prevalecem sobre o que foi deduzido da busca
+    const filtros = interpretarBuscaVendas(busca ? busca.value : '');
+    const campos = {
+        de: 'filtro-vendas-de',
+        ate: 'filtro-vendas-ate',
+        onde_vendeu: 'filtro-vendas-onde',
+        valor_min: 'filtro-vendas-valor-min',
+        valor_max: 'filtro-vendas-valor-max',
+        lucro_min: 'filtro-vendas-lucro-min',
+        lucro_max: 'filtro-vendas-lucro-max'
+    };
+    Object.entries(campos).forEach(([parametro, id]) => {
+        const campo = document.getElementById(id);
+        if (campo && campo.value.trim() !== '') {
+            filtros[parametro] = campo.value.trim();
+        }
+    });
+    return filtros;
+}
+
+function exportarVendas() {
+    // Download direto: o servidor gera o arquivo em streaming com os mesmos filtros da lista
+    const parametros = new URLSearchParams({ ...filtrosVendas(), formato: 'csv' });
+    window.location.href = `/api/vendas/export?${parametros.toString()}`;
+}
+
+function filtrarVendas() {
+    // Esperar o usuário parar de digitar antes de consultar o servidor
+    clearTimeout(filtrarVendasTimeout);
+    filtrarVendasTimeout = setTimeout(carregarVendas, 250);
 }
 
 function renderizarVendas() {
     const container = document.getElementById('vendas-container');
     
     if (vendasFiltradas.length === 0) {
-        if (vendas.length === 0) {
+        if (Object.keys(filtrosVendas()).length === 0) {
             container.innerHTML = '<div class="vazio">Nenhuma venda registrada ainda</div>';
         } else {
-            container.innerHTML = '<div class="vazio">Nenhuma venda encontrada com o termo buscado</div>';
+            container.innerHTML = '<div class="vazio">Nenhuma venda encontrada com os filtros aplicados</div>';
         }
         return;
     }
@@ -932,6 +1095,11 @@ function renderizarVendas() {
     mesesOrdenados.forEach(mesAnoKey => {
         const grupo = vendasPorMes[mesAnoKey];
         
+        // Usar o total do resumo do servidor (se indisponível, somar as vendas carregadas)
+        if (resumoVendasPorMes[mesAnoKey]) {
+            grupo.lucroTotal = resumoVendasPorMes[mesAnoKey].lucro;
+        }
+        
         // Formatar lucro total
         const lucroTotalFormatado = grupo.lucroTotal.toFixed(2).replace('.', ',');
         const corLucroTotal = grupo.lucroTotal >= 0 ? '#4ade80' : '#f87171';
@@ -1071,7 +1239,7 @@ function fecharModalVenda() {
 
 async function editarVenda(vendaId) {
     try {
-        const response = await fetch(`/api/vendas/${vendaId}`);
+        const response = await buscarComEtag(`/api/vendas/${vendaId}`);
         if (!response.ok) {
             throw new Error('Erro ao carregar venda');
         }
@@ -1325,3 +1493,130 @@ async function salvarVenda(event) {
     }
 }
 
+
+// ==================== EVENTOS EM TEMPO REAL (SSE) ====================
+// Alterações feitas em outras abas/aparelhos chegam por /api/eventos: o produto alterado
+// é buscado de novo (ETag) e a lista de vendas é recarregada, sem polling.
+// Sem SSE (navegador antigo ou servidor com EVENTOS_SSE=0), a primeira página da aba
+// aberta é consultada por ETag a cada INTERVALO_POLLING_MS (304 vazio quando nada mudou).
+const INTERVALO_POLLING_MS = 30000;
+let recargaVendasTimeout = null;
+let pollingAlteracoes = null;
+
+function conectarEventos() {
+    if (!('EventSource' in window)) {
+        iniciarPollingAlteracoes();
+        return;
+    }
+    const fonte = new EventSource('/api/eventos');
+    // Queda normal reconecta sozinha (CONNECTING); CLOSED é resposta de erro, como o 503
+    fonte.onerror = () => {
+        if (fonte.readyState === EventSource.CLOSED) {
+            iniciarPollingAlteracoes();
+        }
+    };
+    const dadosEvento = (e) => JSON.parse(e.data || '{}');
+    
+    ['produto_criado', 'produto_atualizado'].forEach(tipo => {
+        fonte.addEventListener(tipo, e => atualizarProdutoLocal(dadosEvento(e).id));
+    });
+    fonte.addEventListener('produto_excluido', e => removerProdutoLocal(dadosEvento(e).id));
+    fonte.addEventListener('produtos_importados', () => {
+        if (abaAtual === 'produtos') carregarProdutos();
+    });
+    ['venda_criada', 'venda_atualizada', 'venda_excluida', 'vendas_criadas'].forEach(tipo => {
+        fonte.addEventListener(tipo, e => {
+            const dados = dadosEvento(e);
+            // Venda mexe no estoque do produto
+            (dados.produto_ids || [dados.produto_id]).filter(Boolean).forEach(atualizarProdutoLocal);
+            agendarRecargaVendas();
+        });
+    });
+    // O servidor não tem mais os eventos perdidos (reinício ou desconexão longa)
+    fonte.addEventListener('recarregar', () => {
+        if (abaAtual === 'vendas') {
+            carregarVendas();
+        } else {
+            carregarProdutos();
+        }
+    });
+}
+
+function iniciarPollingAlteracoes() {
+    if (pollingAlteracoes) return;
+    pollingAlteracoes = setInterval(verificarAlteracoes, INTERVALO_POLLING_MS);
+    document.addEventListener('visibilitychange', verificarAlteracoes);
+}
+
+async function verificarAlteracoes() {
+    if (document.hidden) return;
+    const [url, filtros, recarregar] = abaAtual === 'vendas'
+        ? ['/api/vendas', filtrosVendas(), carregarVendas]
+        : ['/api/produtos', { ordem: ordenacaoAtual }, carregarProdutos];
+    const endereco = urlPagina(url, null, filtros);
+    const anterior = respostasComEtag.get(endereco);
+    try {
+        const response = await buscarComEtag(endereco);
+        const atual = respostasComEtag.get(endereco);
+        // ETag novo: alguma escrita na tabela desde a última consulta
+        if (response.ok && anterior && atual && atual.etag !== anterior.etag) {
+            recarregar();
+        }
+    } catch (error) {
+        console.error('Erro ao verificar alterações:', error);
+    }
+}
+
+async function atualizarProdutoLocal(id) {
+    try {
+        const response = await buscarComEtag(`/api/produtos/${id}`);
+        if (response.status === 404) {
+            removerProdutoLocal(id);
+            return;
+        }
+        if (!response.ok) return;
+        const produto = await response.json();
+        const indice = produtos.findIndex(p => p.id === produto.id);
+        if (indice >= 0) {
+            produtos.splice(indice, 1);
+        }
+        // Recolocar na posição da ordenação; depois do último item carregado, o produto
+        // pertence a uma página que ainda não veio e aparece quando ela for carregada
+        let posicao = produtos.findIndex(p => vemAntesNaOrdem(produto, p));
+        if (posicao < 0 && !proximoCursorProdutos) {
+            posicao = produtos.length;
+        }
+        if (posicao >= 0) {
+            produtos.splice(posicao, 0, produto);
+        }
+        filtrarProdutos();
+    } catch (error) {
+        console.error('Erro ao atualizar produto:', error);
+    }
+}
+
+// Mesma ordem do ORDER BY de listar_produtos (ORDENACOES_PRODUTOS em app.py), id desempata
+function vemAntesNaOrdem(a, b) {
+    const chave = {
+        'nome': p => p.titulo.toLowerCase(),
+        'nome-desc': p => p.titulo.toLowerCase(),
+        'quantidade': p => p.quantidade,
+        'quantidade-asc': p => p.quantidade
+    }[ordenacaoAtual] || (p => new Date(p.data_atualizacao).getTime());
+    const crescente = ordenacaoAtual === 'nome' || ordenacaoAtual === 'quantidade-asc';
+    const [x, y] = crescente ? [a, b] : [b, a];
+    return chave(x) < chave(y) || (chave(x) === chave(y) && x.id < y.id);
+}
+
+function removerProdutoLocal(id) {
+    const restantes = produtos.filter(p => p.id !== id);
+    if (restantes.length === produtos.length) return;
+    produtos = restantes;
+    filtrarProdutos();
+}
+
+function agendarRecargaVendas() {
+    if (abaAtual !== 'vendas') return;  // mostrarAba recarrega ao trocar de aba
+    clearTimeout(recargaVendasTimeout);
+    recargaVendasTimeout = setTimeout(carregarVendas, 500);
+}
@@ -1,7 +1,9 @@
 // Service Worker para forçar atualização e quebrar cache do navegador mobile
 // Versão: 2026-01-22-v1
 
-const CACHE_NAME = 'controle-estoque-v1';
+const CACHE_NAME = 'controle-estoque-v2';
+// Arquivos com hash do conteúdo no nome (assets.py): o conteúdo de uma URL nunca muda
+const ASSET_COM_HASH = /^\/static\/.+\.[0-9a-f]{12}\.[^./]+$/;
 const FORCE_UPDATE_INTERVAL = 300000; // 5 minutos
 
 // Instalar Service Worker
@@ -32,18 +34,12 @@ self.addEventListener('activate', (event) => {
 self.addEventListener('fetch', (event) => {
     const url = new URL(event.request.url);
     
-    // Para HTML, sempre buscar do servidor (nunca cachear)
+    // Para HTML, sempre revalidar no servidor (304 enquanto o deploy não mudar)
     if (event.request.destination === 'document' || 
         url.pathname === '/' || 
         event.request.headers.get('accept')?.includes('text/html')) {
         event.respondWith(
-            fetch(event.request, {
-                cache: 'no-store',
-                headers: {
-                    'Cache-Control': 'no-cache',
-                    'Pragma': 'no-cache'
-                }
-            }).catch(() => {
+            fetch(event.request, { cache: 'no-cache' }).catch(() => {
                 // Se falhar, tentar buscar do cache como fallback
                 return caches.match(event.request);
             })
@@ -51,14 +47,22 @@ self.addEventListener('fetch', (event) => {
         return;
     }
     
-    // Para outros recursos, usar estratégia network-first
-    event.respondWith(
-        fetch(event.request, {
-            cache: 'no-store'
-        }).catch(() => {
-            return caches.match(event.request);
-        })
-    );
+    // Assets com hash: cache-first (um deploy novo muda a URL)
+    if (event.request.method === 'GET' && ASSET_COM_HASH.test(url.pathname)) {
+        event.respondWith(
+            caches.open(CACHE_NAME).then((cache) =>
+                cache.match(event.request).then((emCache) => emCache || fetch(event.request).then((response) => {
+                    if (response.ok) {
+                        cache.put(event.request, response.clone());
+                    }
+                    return response;
+                }))
+            )
+        );
+        return;
+    }
+    
+    // Demais recursos (API, arquivos sem hash): seguir os cabeçalhos HTTP de cache do servidor
 });
 
 // Verificar atualizações periodicamente
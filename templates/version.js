@@ -0,0 +1,38 @@
+(function() {
+    // Versão com que a página foi carregada (o HTML pode ser mais antigo que este script)
+    const meta = document.querySelector('meta[name="app-version"]');
+    const versaoPagina = (meta && meta.content) || {{ versao_app|tojson }};
+
+    function mostrarAvisoAtualizacao() {
+        if (document.getElementById('version-update-banner')) return;
+        const banner = document.createElement('div');
+        banner.id = 'version-update-banner';
+        banner.style.cssText = 'position: fixed; top: 0; left: 0; right: 0; background: #ff9800; color: white; padding: 12px; text-align: center; z-index: 10000; box-shadow: 0 2px 4px rgba(0,0,0,0.2);';
+        banner.innerHTML = `
+            <span>🔄 Nova versão disponível!</span>
+            <button onclick="location.reload()" style="margin-left: 15px; padding: 6px 12px; background: white; color: #ff9800; border: none; border-radius: 4px; cursor: pointer; font-weight: bold;">Atualizar Agora</button>
+            <button onclick="this.parentElement.remove()" style="margin-left: 10px; background: transparent; color: white; border: 1px solid white; padding: 6px 12px; border-radius: 4px; cursor: pointer;">✕</button>
+        `;
+        document.body.insertBefore(banner, document.body.firstChild);
+    }
+
+    function verificarVersao() {
+        // Aba em segundo plano não consulta; confere quando voltar a ficar visível
+        if (document.hidden) return;
+        // cache: 'no-cache' manda If-None-Match: sem deploy novo o servidor responde 304 vazio
+        fetch('/api/versao', { cache: 'no-cache' })
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                if (data && data.versao && data.versao !== versaoPagina) {
+                    mostrarAvisoAtualizacao();
+                }
+            })
+            .catch(() => {});
+    }
+
+    if (versaoPagina !== {{ versao_app|tojson }}) {
+        mostrarAvisoAtualizacao();
+    }
+    setInterval(verificarVersao, 60000);
+    document.addEventListener('visibilitychange', verificarVersao);
+})();
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Teste de concorrência das vendas
+Dispara vendas simultâneas de um mesmo produto pelas rotas da aplicação (POST /api/vendas,
+com app.test_client() em várias threads) e confere que o estoque nunca fica negativo nem é
+vendido além do disponível (overselling). Depois exclui as mesmas vendas em dobro, ao mesmo
+tempo (DELETE /api/vendas/<id>), e confere que cada exclusão devolve o estoque uma única vez.
+
+Com --sem-returning as rotas usam o caminho do SQLite anterior à 3.35 (sem RETURNING).
+
+SQLite: usa um banco temporário (o database.db local não é tocado)
+PostgreSQL: usa o banco configurado e remove os produtos/vendas de teste no final
+
+Uso:
+    python3 testar_concorrencia_vendas.py [--threads 8] [--estoque 200] [--tentativas 400] [--sem-returning]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+# Com SQLite, apontar para um banco temporário ANTES de importar models
+if not (os.getenv('DATABASE_URL') or os.getenv('DATABASE_TYPE', '').lower() == 'postgresql' or os.getenv('DB_HOST')):
+    _tmp = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    _tmp.close()
+    os.environ['DATABASE_PATH'] = _tmp.name
+
+import app as aplicacao
+from models import DATABASE_TYPE
+
+
+def _em_paralelo(requisicoes, threads):
+    """
+    Executa as funções de `requisicoes` (cada uma recebe um test_client) em `threads` threads.
+    Retorna (respostas na ordem das requisições, segundos).
+    """
+    respostas = [None] * len(requisicoes)
+    proxima = [0]
+    erros = []
+    lock = threading.Lock()
+    largada = threading.Barrier(threads)
+
+    def trabalhador():
+        cliente = aplicacao.app.test_client()
+        try:
+            largada.wait()
+            while True:
+                with lock:
+                    indice = proxima[0]
+                    if indice >= len(requisicoes):
+                        return
+                    proxima[0] += 1
+                respostas[indice] = requisicoes[indice](cliente)
+        except Exception as e:
+            erros.append(e)
+
+    workers = [threading.Thread(target=trabalhador) for _ in range(threads)]
+    inicio = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    segundos = time.perf_counter() - inicio
+    if erros:
+        raise erros[0]
+    return respostas, segundos
+
+
+def _estoque(cliente, produto_id):
+    return cliente.get(f'/api/produtos/{produto_id}').get_json()['quantidade']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--estoque', type=int, default=200)
+    parser.add_argument('--tentativas', type=int, default=400, help='vendas tentadas (acima do estoque)')
+    parser.add_argument('--sem-returning', action='store_true', help='caminho do SQLite < 3.35')
+    args = parser.parse_args()
+
+    if args.sem_returning:
+        if DATABASE_TYPE == 'postgresql':
+            parser.error('--sem-returning só se aplica ao SQLite')
+        aplicacao.SUPORTA_RETURNING = False
+
+    print(f"📊 Tipo de banco: {DATABASE_TYPE}"
+          f"{'' if aplicacao.SUPORTA_RETURNING else ' (sem RETURNING)'}")
+    print(f"🧵 {args.threads} threads, estoque {args.estoque}, {args.tentativas} tentativas de venda\n")
+
+    cliente = aplicacao.app.test_client()
+    resposta = cliente.post('/api/produtos', json={
+        'titulo': f'Teste concorrência {datetime.now().isoformat()}', 'quantidade': args.estoque, 'valor_compra': 10
+    })
+    if resposta.status_code != 201:
+        print(f"❌ Não foi possível criar o produto de teste: {resposta.get_json()}")
+        sys.exit(1)
+    produto_id = resposta.get_json()['id']
+    venda = {'produto_id': produto_id, 'valor_venda': 20, 'data_venda': datetime.now().strftime('%Y-%m-%d'),
+             'onde_vendeu': 'shopee'}
+
+    ok = True
+    venda_ids = []
+    try:
+        respostas, segundos = _em_paralelo(
+            [lambda c: c.post('/api/vendas', json=venda)] * args.tentativas, args.threads)
+        venda_ids = [r.get_json()['id'] for r in respostas if r.status_code == 201]
+        recusadas = sum(1 for r in respostas if r.status_code == 400)
+        outras = [r for r in respostas if r.status_code not in (201, 400)]
+        estoque = _estoque(cliente, produto_id)
+        print(f"  vendas: {len(venda_ids)} registradas, {recusadas} sem estoque, estoque final {estoque}, "
+              f"{args.tentativas / segundos:.0f} req/s ({segundos:.2f}s)")
+        if len(venda_ids) != args.estoque or estoque != 0 or outras:
+            print(f"   ❌ Overselling, venda perdida ou erro ({[r.get_json() for r in outras[:3]]})")
+            ok = False
+
+        # Cada venda excluída duas vezes ao mesmo tempo: só uma das exclusões devolve o estoque
+        exclusoes = [lambda c, i=venda_id: c.delete(f'/api/vendas/{i}') for venda_id in venda_ids for _ in range(2)]
+        respostas, segundos = _em_paralelo(exclusoes, args.threads)
+        excluidas = sum(1 for r in respostas if r.status_code == 200)
+        nao_encontradas = sum(1 for r in respostas if r.status_code == 404)
+        estoque = _estoque(cliente, produto_id)
+        print(f"  exclusões: {excluidas} excluídas, {nao_encontradas} já excluídas, estoque final {estoque}, "
+              f"{len(exclusoes) / segundos:.0f} req/s ({segundos:.2f}s)")
+        if excluidas != len(venda_ids) or nao_encontradas != len(venda_ids) or estoque != args.estoque:
+            print("   ❌ Estoque devolvido mais de uma vez, ou exclusão com erro")
+            ok = False
+        else:
+            venda_ids = []
+    finally:
+        if DATABASE_TYPE == 'postgresql':
+            for venda_id in venda_ids:
+                cliente.delete(f'/api/vendas/{venda_id}')
+            cliente.delete(f'/api/produtos/{produto_id}')
+        else:
+            os.unlink(os.environ['DATABASE_PATH'])
+
+    if ok:
+        print("\n✅ Nenhuma venda além do estoque e nenhuma devolução em dobro")
+    else:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
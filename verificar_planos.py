@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Verifica os planos de execução das consultas críticas de produtos e vendas
+Popula um banco com dados de teste, roda EXPLAIN (PostgreSQL) / EXPLAIN QUERY PLAN (SQLite)
+e falha se alguma consulta cair em scan sequencial ou ordenação em memória.
+
+As consultas são montadas pelas mesmas funções que as rotas de app.py usam (sql_listar_produtos,
+filtros_vendas, sql_resumo_vendas, ...), então a verificação acompanha as mudanças nas rotas.
+
+SQLite: usa um banco temporário (o database.db local não é tocado)
+PostgreSQL: os dados de teste são desfeitos no final, mas enquanto roda a verificação trava
+linhas e tabelas e dispara os triggers de versoes_tabelas. Por isso só roda com
+--database-url apontando para um banco separado, ou com --confirmar para usar o banco
+configurado (DATABASE_URL / DB_HOST) mesmo assim.
+
+Uso:
+    python3 verificar_planos.py
+    python3 verificar_planos.py --database-url postgresql://.../banco_de_teste
+    python3 verificar_planos.py --confirmar
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+parser = argparse.ArgumentParser(description='Verifica os planos de execução das consultas críticas')
+parser.add_argument('--database-url', help='banco PostgreSQL separado para a verificação')
+parser.add_argument('--confirmar', action='store_true',
+                    help='usar o PostgreSQL configurado (DATABASE_URL / DB_HOST), mesmo que seja o de produção')
+ARGUMENTOS = parser.parse_args()
+
+if ARGUMENTOS.database_url:
+    os.environ['DATABASE_URL'] = ARGUMENTOS.database_url
+elif os.getenv('DATABASE_URL') or os.getenv('DATABASE_TYPE', '').lower() == 'postgresql' or os.getenv('DB_HOST'):
+    if not ARGUMENTOS.confirmar:
+        print("❌ O PostgreSQL configurado pode ser o de produção: a verificação trava tabelas e")
+        print("   dispara triggers enquanto roda. Use --database-url com um banco separado, ou")
+        print("   --confirmar para rodar no banco configurado.")
+        sys.exit(2)
+else:
+    # Com SQLite, apontar para um banco temporário ANTES de importar models
+    _tmp = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    _tmp.close()
+    os.environ['DATABASE_PATH'] = _tmp.name
+
+from datetime import datetime, timedelta
+from models import init_db, get_db, DATABASE_TYPE, indexar_produtos_busca, indexar_vendas_busca
+from models import recalcular_resumo_vendas, sql_busca_produtos, termos_busca
+from app import app, filtros_vendas, sql_listar_produtos, sql_listar_vendas, sql_exportar_vendas
+from app import sql_sincronizacao, sql_exclusoes, sql_resumo_vendas, sql_imagem_em_uso, sql_titulo_em_uso
+from app import sql_preencher_titulo_vendas
+from importar_produtos import sql_produtos_por_titulo
+
+TOTAL_PRODUTOS = 2000
+TOTAL_VENDAS = 20000
+LIMITE = 50
+
+# Ordenam só as linhas já encontradas pelo índice (relevância da busca, vendas que casam com o
+# texto, GROUP BY do período): nelas só scan sequencial conta como problema
+ORDENAM_RESULTADOS = {'buscar_produtos', 'listar_vendas_busca', 'resumo_vendas_periodo', 'resumo_vendas_busca'}
+
+def _filtros(**parametros):
+    """Condições de filtros_vendas() para a query string dada"""
+    with app.test_request_context('/api/vendas', query_string=parametros):
+        return filtros_vendas()
+
+def consultas_criticas():
+    """{nome: (sql, params)} das consultas das rotas em app.py, com parâmetros de exemplo"""
+    data = lambda texto: datetime.fromisoformat(texto) if DATABASE_TYPE == 'postgresql' else texto
+    marca = data('2024-06-01T00:00:00')
+    periodo = _filtros(de='2024-01-01', ate='2024-01-31')
+    canal = _filtros(onde_vendeu='shopee')
+    busca = _filtros(q='produto 12')
+
+    consultas = {
+        'listar_produtos': sql_listar_produtos('recente'),
+        'listar_produtos_pagina': sql_listar_produtos('recente', ['2024-01-01T00:00:00', 1000], LIMITE),
+        'listar_produtos_nome_pagina': sql_listar_produtos('nome', ['produto 1000', 1000], LIMITE),
+        'listar_produtos_nome_desc_pagina': sql_listar_produtos('nome-desc', ['produto 1000', 1000], LIMITE),
+        'listar_produtos_quantidade_pagina': sql_listar_produtos('quantidade', [5, 1000], LIMITE),
+        'listar_produtos_quantidade_asc_pagina': sql_listar_produtos('quantidade-asc', [5, 1000], LIMITE),
+        'buscar_produtos': sql_busca_produtos(termos_busca('produto 12'), LIMITE),
+        'listar_vendas': sql_listar_vendas([], []),
+        'listar_vendas_pagina': sql_listar_vendas([], [], ['2024-01-01', '2024-01-01T00:00:00', 1000], LIMITE),
+        'listar_vendas_periodo': sql_listar_vendas(*periodo, limite=LIMITE),
+        'listar_vendas_canal': sql_listar_vendas(*canal, limite=LIMITE),
+        'listar_vendas_busca': sql_listar_vendas(*busca, limite=LIMITE),
+        'exportar_vendas': (sql_exportar_vendas(periodo[0]), periodo[1]),
+        'resumo_vendas': (sql_resumo_vendas([], False, True), []),
+        'resumo_vendas_canal': (sql_resumo_vendas(canal[0], True, True), canal[1]),
+        'resumo_vendas_periodo': (sql_resumo_vendas(periodo[0], False, False), periodo[1]),
+        'resumo_vendas_busca': (sql_resumo_vendas(busca[0], False, False), busca[1]),
+        'sincronizar_produtos': (sql_sincronizacao('produtos'), [marca]),
+        'sincronizar_vendas': (sql_sincronizacao('vendas'), [marca]),
+        'sincronizar_exclusoes': (sql_exclusoes(), ['vendas', marca]),
+        'vendas_por_produto': (sql_preencher_titulo_vendas(), [data('2024-06-01T00:00:00'), 42]),
+        'imagem_em_uso': (sql_imagem_em_uso(), ['imagem_42.jpg', 42]),
+        'titulo_em_uso': (sql_titulo_em_uso(), ['Produto 42', 42]),
+    }
+    if DATABASE_TYPE != 'postgresql':
+        # No PostgreSQL a importação cruza com a tabela temporária (UPDATE ... FROM)
+        consultas['importar_produtos_titulo'] = (sql_produtos_por_titulo(2), ['Produto 1', 'Produto 2'])
+    return consultas
+
+def popular_banco(cursor):
+    """Insere produtos e vendas de teste (com os índices de busca e o resumo mensal)"""
+    p = '%s' if DATABASE_TYPE == 'postgresql' else '?'
+    agora = datetime.now()
+    produtos = []
+    for i in range(TOTAL_PRODUTOS):
+        data = agora - timedelta(minutes=i)
+        data = data if DATABASE_TYPE == 'postgresql' else data.isoformat()
+        produtos.append((f'Produto {i}', 'Descrição', i % 10, 10.0, f'imagem_{i}.jpg', '{}', data, data))
+    cursor.executemany(f'''
+        INSERT INTO produtos (titulo, descricao, quantidade, valor_compra, imagem, especificacoes, data_criacao, data_atualizacao)
+        VALUES ({p}, {p}, {p}, {p}, {p}, {p}, {p}, {p})
+    ''', produtos)
+
+    vendas = []
+    for i in range(TOTAL_VENDAS):
+        data_criacao = agora - timedelta(minutes=i)
+        vendas.append((
+            (i % TOTAL_PRODUTOS) + 1, f'Produto {i % TOTAL_PRODUTOS}', 20.0, 10.0,
+            (agora - timedelta(days=i // 20)).strftime('%Y-%m-%d'),
+            'mercado_livre' if i % 2 else 'shopee', '',
+            data_criacao if DATABASE_TYPE == 'postgresql' else data_criacao.isoformat()
+        ))
+    cursor.executemany(f'''
+        INSERT INTO vendas (produto_id, produto_titulo, valor_venda, valor_compra, data_venda, onde_vendeu, observacoes, data_criacao, data_atualizacao)
+        VALUES ({p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p})
+    ''', [venda + (venda[-1],) for venda in vendas])
+
+    cursor.execute('SELECT id, titulo, descricao, especificacoes FROM produtos')
+    indexar_produtos_busca(cursor, [tuple(row.values()) if isinstance(row, dict) else tuple(row) for row in cursor.fetchall()])
+    cursor.execute('SELECT id, produto_titulo, observacoes FROM vendas')
+    indexar_vendas_busca(cursor, [tuple(row.values()) if isinstance(row, dict) else tuple(row) for row in cursor.fetchall()])
+    recalcular_resumo_vendas(cursor)
+    cursor.execute('ANALYZE')
+
+def _problemas_sqlite(cursor, sql, params, aceita_ordenacao):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    linhas = [row['detail'] if isinstance(row, dict) else row[-1] for row in cursor.fetchall()]
+    problemas = []
+    for detalhe in linhas:
+        # "SCAN tabela" sem índice = leitura completa; "USE TEMP B-TREE" = ordenação em memória.
+        # Tabela FTS5 com MATCH aparece como "SCAN ... VIRTUAL TABLE INDEX 0:M..." (usa o índice de busca)
+        if detalhe.startswith('SCAN') and 'USING' not in detalhe and ':M' not in detalhe:
+            problemas.append(detalhe)
+        elif 'USE TEMP B-TREE' in detalhe and not aceita_ordenacao:
+            problemas.append(detalhe)
+    return linhas, problemas
+
+def _problemas_postgresql(cursor, sql, params, aceita_ordenacao):
+    cursor.execute(f'EXPLAIN {sql}', params)
+    linhas = [row['QUERY PLAN'] if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
+    # "Seq Scan" = leitura completa; nó "Sort" = ordenação em memória em vez de seguir o índice
+    problemas = [linha.strip() for linha in linhas
+                 if 'Seq Scan' in linha or (not aceita_ordenacao and re.match(r'\s*(->\s+)?Sort\s', linha))]
+    return linhas, problemas
+
+def verificar_planos():
+    """Retorna True se nenhuma consulta crítica usa scan sequencial"""
+    init_db()
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        if DATABASE_TYPE == 'postgresql':
+            # Com poucos dados o planner prefere seq scan mesmo havendo índice;
+            # desabilitar força o uso do índice quando ele existe
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        popular_banco(cursor)
+
+        falhas = 0
+        for nome, (sql, params) in consultas_criticas().items():
+            if DATABASE_TYPE == 'postgresql':
+                linhas, problemas = _problemas_postgresql(cursor, sql, params, nome in ORDENAM_RESULTADOS)
+            else:
+                linhas, problemas = _problemas_sqlite(cursor, sql, params, nome in ORDENAM_RESULTADOS)
+            if problemas:
+                falhas += 1
+                print(f"❌ {nome}")
+                for linha in linhas:
+                    print(f"     {linha}")
+            else:
+                print(f"✅ {nome}: {' | '.join(l.strip() for l in linhas)}")
+        return falhas == 0
+    finally:
+        # Nunca persistir os dados de teste
+        conn.rollback()
+        cursor.close()
+        conn.close()
+        if DATABASE_TYPE != 'postgresql':
+            os.unlink(os.environ['DATABASE_PATH'])
+
+if __name__ == '__main__':
+    print(f"📊 Tipo de banco: {DATABASE_TYPE}")
+    print(f"🌱 Populando {TOTAL_PRODUTOS} produtos e {TOTAL_VENDAS} vendas de teste...\n")
+    if verificar_planos():
+        print("\n✅ Todas as consultas críticas usam índices")
+    else:
+        print("\n❌ Há consultas críticas sem índice adequado")
+        sys.exit(1)